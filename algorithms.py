@@ -1,29 +1,154 @@
+import csv
 import random
-from typing import Dict, List
+import zipfile
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from models import Exercise, User
-from datetime import datetime
-from models import UserFitnessData
-import pandas as pd
+from models import User
+from catalog import CatalogSnapshot, exercise_catalog
+from plan_engine import day_rng, plan_engine
+from personalization import UserProfile, allowed_exercise_ids, history_counts, profile_from_user
+from metrics import timed
+from io import BytesIO, StringIO
 
+EXCEL_COLUMNS = ["bolge", "hareket_adi", "set_sayisi", "tekrar_sayisi", "ekipman"]
+ROSTER_COLUMNS = ["user_id", "name", "day"] + EXCEL_COLUMNS
+PARQUET_BATCH_ROWS = 10000
+# Excel sayfa adlarında kullanılamayan karakterler
+SHEET_TITLE_INVALID = str.maketrans("", "", "[]:*?/\\")
 
 
+@timed("save_workout_plan_to_excel")
 def save_workout_plan_to_excel(workout_plan, filename="workout_plan.xlsx"):
     """
     Exports the workout plan to an Excel file.
 
+    Rows are streamed through openpyxl's write-only mode, so no DataFrames are
+    built and the target can be an in-memory buffer instead of a file on disk.
+
     Args:
     - workout_plan (dict): The workout plan dictionary, with days as keys and plans as values.
-    - filename (str): Name of the Excel file to save the plan.
+    - filename (str or file-like): Path of the Excel file, or a binary buffer such as BytesIO.
+    """
+    from openpyxl import Workbook  # Dışa aktarım ilk kullanımda yüklenir; açılışı yavaşlatmasın
+
+    workbook = Workbook(write_only=True)
+    for day, exercises in workout_plan.items():
+        sheet = workbook.create_sheet(title=day)
+        if exercises and not all("Message" in exercise for exercise in exercises):
+            # Sütunlar workout planı yapısıyla aynı sırada yazılıyor
+            sheet.append(EXCEL_COLUMNS)
+            for exercise in exercises:
+                sheet.append([exercise.get(column) for column in EXCEL_COLUMNS])
+        else:  # Handle rest day or no exercises
+            sheet.append(["Message"])
+            sheet.append(["Rest Day"])
+    workbook.save(filename)
+
+
+def workout_plan_rows(workout_plan):
+    """
+    Flattens a workout plan to [day, bolge, hareket_adi, set_sayisi, tekrar_sayisi, ekipman] rows.
+
+    Rest days are kept as a single row with only the day filled in.
+    """
+    for day, exercises in workout_plan.items():
+        if exercises and not all("Message" in exercise for exercise in exercises):
+            for exercise in exercises:
+                yield [day] + [exercise.get(column) for column in EXCEL_COLUMNS]
+        else:
+            yield [day] + [None] * len(EXCEL_COLUMNS)
+
+
+def save_roster_workout_plans_to_excel(plans, filename="workout_plans.xlsx"):
+    """
+    Exports several users' workout plans to one Excel file, one sheet per user.
+
+    Args:
+    - plans (iterable): (user_id, name, workout_plan) tuples, consumed one user at a time.
+    - filename (str or file-like): Path of the Excel file, or a binary buffer such as BytesIO.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for user_id, name, workout_plan in plans:
+        # Excel sayfa adları en fazla 31 karakter olabiliyor ve []:*?/\ içeremiyor
+        sheet = workbook.create_sheet(title=f"{user_id} {str(name).translate(SHEET_TITLE_INVALID)}"[:31])
+        sheet.append(["day"] + EXCEL_COLUMNS)
+        for row in workout_plan_rows(workout_plan):
+            sheet.append(row)
+    workbook.save(filename)
+
+
+def save_roster_workout_plans_to_zip(plans, filename="workout_plans.zip"):
+    """
+    Exports several users' workout plans as a zip of per-user Excel files.
+
+    Args:
+    - plans (iterable): (user_id, name, workout_plan) tuples, consumed one user at a time.
+    - filename (str or file-like): Path of the zip file, or a binary buffer such as BytesIO.
+    """
+    # xlsx dosyaları zaten sıkıştırılmış olduğu için tekrar sıkıştırmıyoruz
+    with zipfile.ZipFile(filename, "w", zipfile.ZIP_STORED) as archive:
+        for user_id, name, workout_plan in plans:
+            buffer = BytesIO()
+            save_workout_plan_to_excel(workout_plan, buffer)
+            archive.writestr(f"workout_plan_user_{user_id}.xlsx", buffer.getvalue())
+
+
+def iter_roster_workout_plans_csv(plans):
+    """
+    Yields several users' workout plans as UTF-8 encoded CSV chunks, one chunk per user.
+
+    Args:
+    - plans (iterable): (user_id, name, workout_plan) tuples, consumed one user at a time.
     """
-    with pd.ExcelWriter(filename) as writer:
-        for day, exercises in workout_plan.items():
-            if exercises:  # If there are exercises for the day
-                # Ensure the DataFrame columns align with the workout plan structure
-                df = pd.DataFrame(exercises, columns=["bolge", "hareket_adi", "set_sayisi", "tekrar_sayisi", "ekipman"])
-                df.to_excel(writer, sheet_name=day, index=False)
-            else:  # Handle rest day or no exercises
-                pd.DataFrame([{"Message": "Rest Day"}]).to_excel(writer, sheet_name=day, index=False)
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ROSTER_COLUMNS)
+    for user_id, name, workout_plan in plans:
+        for row in workout_plan_rows(workout_plan):
+            writer.writerow([user_id, name] + row)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def save_roster_workout_plans_to_parquet(plans, filename="workout_plans.parquet"):
+    """
+    Exports several users' workout plans to one Parquet file (requires pyarrow).
+
+    Rows are written in row groups of PARQUET_BATCH_ROWS, so only one batch
+    is held in memory at a time.
+
+    Args:
+    - plans (iterable): (user_id, name, workout_plan) tuples, consumed one user at a time.
+    - filename (str or file-like): Path of the Parquet file, or a binary buffer such as BytesIO.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("user_id", pa.int64()),
+        ("name", pa.string()),
+        ("day", pa.string()),
+        ("bolge", pa.string()),
+        ("hareket_adi", pa.string()),
+        ("set_sayisi", pa.int64()),
+        ("tekrar_sayisi", pa.int64()),
+        ("ekipman", pa.string()),
+    ])
+
+    with pq.ParquetWriter(filename, schema) as writer:
+        batch = []
+        for user_id, name, workout_plan in plans:
+            batch.extend([user_id, name] + row for row in workout_plan_rows(workout_plan))
+            if len(batch) >= PARQUET_BATCH_ROWS:
+                writer.write_table(pa.Table.from_pylist([dict(zip(ROSTER_COLUMNS, row)) for row in batch], schema=schema))
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist([dict(zip(ROSTER_COLUMNS, row)) for row in batch], schema=schema))
 
 
 
@@ -38,83 +163,86 @@ BELOW IS SAME
 
 
 
-def generate_workout_plan(user_id: int, days: int, db: Session) -> Dict[str, List[Dict[str, str]]]:
+@timed("generate_workout_plan")
+def generate_workout_plan(user_id: int, days: int, db: Session, equipment: Optional[List[str]] = None) -> Dict[str, List[Dict[str, str]]]:
     # Kullanıcıyı veritabanından al
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise ValueError("Kullanıcı bulunamadı.")
     
-    # Egzersiz verilerini al
-    exercises = db.query(Exercise).all()
-    workout_plan = {}
-
-    # Kas grupları
-    regions = ["Gogus", "Omuz", "Biceps", "On Kol", "Arka Kol", "Sirt", "Bacak"]
-
-    def get_random_exercises(region, count):
-        region_exercises = [e for e in exercises if e.body_part == region]
-        return random.sample(region_exercises, min(count, len(region_exercises)))
-
-    # Gün sayısına göre egzersiz planı
-    for day in range(1, days + 1):
-        day_key = f"Day {day}"
-
-        if day == 5 and days == 7:  # Dinlenme günü
-            workout_plan[day_key] = [{"Message": "Dinlenme Günü"}]
-            continue
-
-        if day == 1:
-            day_plan = (
-                get_random_exercises("Gogus", 2) +
-                get_random_exercises("Omuz", 2) +
-                get_random_exercises("Biceps", 1) +
-                get_random_exercises("On Kol", 1) +
-                get_random_exercises("Arka Kol", 1) +
-                get_random_exercises("Sirt", 2) +
-                get_random_exercises("Bacak", 2)
-            )
-        elif day == 2:
-            day_plan = (
-                get_random_exercises("Gogus", 2) +
-                get_random_exercises("Omuz", 2) +
-                get_random_exercises("Biceps", 1) +
-                get_random_exercises("On Kol", 1) +
-                get_random_exercises("Arka Kol", 1) +
-                get_random_exercises("Sirt", 2)
-            )
-        elif day == 3:
-            day_plan = (
-                get_random_exercises("Gogus", 3) +
-                get_random_exercises("Omuz", 3) +
-                get_random_exercises("Arka Kol", 2)
-            )
-        elif day == 4:
-            day_plan = get_random_exercises("Bacak", 5)
-        elif day == 6:
-            day_plan = (
-                get_random_exercises("Arka Kol", 3) +
-                get_random_exercises("Biceps", 3) +
-                get_random_exercises("On Kol", 3)
-            )
-        elif day == 7:
-            day_plan = (
-                get_random_exercises("Bacak", 4) +
-                get_random_exercises("Arka Kol", 3) +
-                get_random_exercises("Biceps", 3)
-            )
-        else:
-            day_plan = []
-
-        # Gün planını uygun formatta düzenle
-        workout_plan[day_key] = [
-            {
-                "bolge": exercise.body_part,
-                "hareket_adi": exercise.exercise_name,
-                "set_sayisi": max(1, exercise.sets),
-                "tekrar_sayisi": max(5, exercise.reps),
-                "ekipman": exercise.equipment or "None"
-            }
-            for exercise in day_plan
-        ]
-
-    return workout_plan
\ No newline at end of file
+    # Seviye, hedef, yaş/BMI, ekipman ve son antrenmanlara göre kişiselleştiriliyor
+    profile = profile_from_user(user, history_counts(db, [user_id]).get(user_id), equipment)
+
+    # Egzersiz verilerini süreç genelindeki katalogdan al (veritabanına gitmez)
+    return build_workout_plan(days, exercise_catalog.get(db), user_id, profile)
+
+
+def build_workout_plan(
+    days: int,
+    catalog: CatalogSnapshot,
+    user_id: Optional[int] = None,
+    profile: Optional[UserProfile] = None,
+) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Builds a workout plan from an already loaded exercise catalog.
+
+    Does not touch the database, so it can be called for many users in a row
+    (e.g. batch generation for a coach's roster). With a user_id the plan is
+    reproducible and memoized by the plan engine; the returned plan must not
+    be mutated. With a profile, exercises and sets/reps are personalized.
+    """
+    if profile is not None and user_id is not None:
+        return plan_engine.build_personalized(days, catalog, {user_id: profile})[user_id]
+    return plan_engine.build(days, catalog, user_id)
+
+
+def build_workout_plans(days: int, catalog: CatalogSnapshot, profiles: Dict[int, UserProfile]) -> Dict[int, Dict[str, List[Dict[str, str]]]]:
+    """Builds personalized plans for many users (user_id -> profile) in one vectorized batch."""
+    return plan_engine.build_personalized(days, catalog, profiles)
+
+
+def is_rest_day(day: int, days: int) -> bool:
+    return plan_engine.is_rest_day(day, days)
+
+
+def rebuild_changed_days(
+    structure: Dict[int, Tuple[bool, List[int]]],
+    days: int,
+    catalog: CatalogSnapshot,
+    user_id: Optional[int] = None,
+    profile: Optional[UserProfile] = None,
+):
+    """
+    Rebuilds only the days of an existing plan that a new `days` count or the
+    current catalog invalidates.
+
+    A day is rebuilt if it is new, if it becomes or stops being the rest day,
+    if one of its exercises is no longer in the catalog or, with a profile,
+    if one of its exercises needs equipment the profile no longer has; days
+    past `days` are dropped.
+
+    Args:
+    - structure (dict): day number -> (is rest day, exercise ids) of the existing plan.
+    - days (int): New number of days.
+    - catalog (CatalogSnapshot): Current exercise catalog.
+    - user_id (int): Seeds the rebuilt days like a full `build_workout_plan` would.
+    - profile (UserProfile): Personalizes the rebuilt days.
+
+    Returns (changed days by key, removed day numbers).
+    """
+    allowed = allowed_exercise_ids(catalog, profile) if profile is not None else catalog.by_id
+    numbers = [
+        day for day in range(1, days + 1)
+        if structure.get(day) is None
+        or structure[day][0] != is_rest_day(day, days)
+        or any(exercise_id not in allowed for exercise_id in structure[day][1])
+    ]
+    if profile is not None and user_id is not None:
+        changed = plan_engine.build_personalized(days, catalog, {user_id: profile}, numbers)[user_id] if numbers else {}
+    else:
+        changed = {
+            f"Day {day}": plan_engine.build_day(day, days, catalog, day_rng(user_id, day) if user_id is not None else random)
+            for day in numbers
+        }
+    removed = [day for day in structure if day > days]
+    return changed, removed
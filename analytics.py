@@ -0,0 +1,234 @@
+from typing import Dict, List, Optional
+from sqlalchemy import Integer, case, cast, func, select, true
+from sqlalchemy.orm import Session
+from models import UserFitnessData
+from fitness_archive import archived_exercise_table
+from fitness_store import logged_workout
+
+WEEKS = 12  # Yanıtta dönen haftalık nokta sayısı
+MONTHS = 12  # Yanıtta dönen aylık nokta sayısı
+WEEKLY_MOVING_AVERAGE = 4
+MONTHLY_MOVING_AVERAGE = 3
+
+reps = cast(UserFitnessData.reps, Integer)  # Eski kayıtlarda reps metin olabiliyor; SQLite bunları 0'a çevirir
+volume = UserFitnessData.weight * UserFitnessData.sets * reps
+estimated_1rm = UserFitnessData.weight * (1 + reps / 30.0)  # Epley formülü
+
+
+def _period(dialect: str, unit: str):
+    if dialect == "postgresql":
+        return func.to_char(func.date_trunc(unit, UserFitnessData.date), "YYYY-MM-DD" if unit == "week" else "YYYY-MM")
+    if unit == "week":
+        # Haftanın başlangıcı olan pazartesi günü
+        return func.date(UserFitnessData.date, "-6 days", "weekday 1")
+    return func.strftime("%Y-%m", UserFitnessData.date)
+
+
+def _volume_series(db: Session, where, unit: str, points: int, window: int):
+    period = _period(db.get_bind().dialect.name, unit).label("period")
+    per_period = (
+        select(period, func.sum(volume).label("volume"), func.sum(UserFitnessData.sets).label("sets"))
+        .where(*where)
+        .group_by(period)
+        .subquery()
+    )
+    moving_average = func.avg(per_period.c.volume).over(
+        order_by=per_period.c.period, rows=(-(window - 1), 0)
+    )
+    stmt = (
+        select(per_period.c.period, per_period.c.volume, per_period.c.sets, moving_average.label("moving_average"))
+        .order_by(per_period.c.period.desc())
+        .limit(points)
+    )
+    rows = db.execute(stmt).all()
+    return [
+        {
+            "period": row.period,
+            "volume": float(row.volume or 0),
+            "sets": int(row.sets or 0),
+            "moving_average": float(row.moving_average or 0),
+        }
+        for row in reversed(rows)
+    ]
+
+
+def _record(db: Session, where, expression) -> Optional[Dict]:
+    stmt = (
+        select(expression.label("value"), UserFitnessData.date)
+        .where(*where)
+        .order_by(expression.desc(), UserFitnessData.date)
+        .limit(1)
+    )
+    row = db.execute(stmt).first()
+    if row is None or not row.value:
+        return None
+    return {"value": float(row.value), "date": row.date}
+
+
+def exercise_progress(db: Session, user_id: int, exercise_name: str) -> Optional[Dict]:
+    """
+    Aggregates a user's history for one exercise inside the database.
+
+    Volume is weight x sets x reps. Only fixed-size results leave SQL (the last
+    WEEKS weekly and MONTHS monthly points, with moving averages computed by
+    window functions, plus personal records), so the response size does not
+    grow with the history. Only logged workouts count (plan placeholder rows
+    are skipped) and `sessions` is the number of distinct workout dates.
+    Archived rows are aggregated from the memory-mapped Arrow table and
+    merged with the SQL partial results. Returns None if the user has no data for the exercise.
+    """
+    where = (UserFitnessData.user_id == user_id, UserFitnessData.exercise_name == exercise_name, logged_workout)
+    archived = archived_exercise_table(user_id, exercise_name, logged_only=True)
+    if archived is not None and archived.num_rows:
+        return _progress_with_archive(db, where, exercise_name, archived)
+
+    summary = db.execute(
+        select(
+            func.count(UserFitnessData.date.distinct()).label("sessions"),
+            func.min(UserFitnessData.date).label("first_date"),
+            func.max(UserFitnessData.date).label("last_date"),
+        ).where(*where)
+    ).one()
+    if not summary.sessions:
+        return None
+
+    return {
+        "exercise_name": exercise_name,
+        "sessions": summary.sessions,
+        "first_date": summary.first_date,
+        "last_date": summary.last_date,
+        "max_weight": _record(db, where, UserFitnessData.weight),
+        "max_volume": _record(db, where, volume),
+        "estimated_1rm": _record(db, where, estimated_1rm),
+        "weekly": _volume_series(db, where, "week", WEEKS, WEEKLY_MOVING_AVERAGE),
+        "monthly": _volume_series(db, where, "month", MONTHS, MONTHLY_MOVING_AVERAGE),
+    }
+
+
+# Arşivi olan kullanıcılar: arşiv pyarrow.compute ile, veritabanındaki satırlar SQL'de toplanır,
+# iki küçük ara sonuç (kayıtlar ve dönem toplamları) birleştirilir
+
+def _period_totals(db: Session, where, unit: str) -> Dict[str, List]:
+    period = _period(db.get_bind().dialect.name, unit).label("period")
+    stmt = (
+        select(period, func.sum(volume).label("volume"), func.sum(UserFitnessData.sets).label("sets"))
+        .where(*where)
+        .group_by(period)
+    )
+    return {row.period: [row.volume, row.sets] for row in db.execute(stmt)}
+
+
+def _archived_period_totals(table, periods) -> Dict[str, List]:
+    import pyarrow as pa
+
+    grouped = (
+        pa.table({"period": periods, "volume": table["volume"], "sets": table["sets"]})
+        .group_by("period")
+        .aggregate([("volume", "sum"), ("sets", "sum")])
+    )
+    return {
+        period: [period_volume, sets]
+        for period, period_volume, sets in zip(*(grouped[column].to_pylist() for column in ("period", "volume_sum", "sets_sum")))
+    }
+
+
+def _merged_volume_series(partials, points: int, window: int):
+    per_period: Dict[str, List] = {}
+    for partial in partials:
+        for period, values in partial.items():
+            totals = per_period.setdefault(period, [None, None])
+            for index, value in enumerate(values):
+                if value is not None:
+                    totals[index] = (totals[index] or 0) + value
+    # Hareketli ortalama için gösterilen ilk noktadan önceki window - 1 dönem de gerekli
+    periods = sorted(per_period)[-(points + window - 1):]
+    series = []
+    for index, key in enumerate(periods):
+        volumes = [per_period[previous][0] for previous in periods[max(0, index - window + 1):index + 1]]
+        volumes = [value for value in volumes if value is not None]
+        series.append({
+            "period": key,
+            "volume": float(per_period[key][0] or 0),
+            "sets": int(per_period[key][1] or 0),
+            "moving_average": float(sum(volumes) / len(volumes)) if volumes else 0.0,
+        })
+    return series[-points:]
+
+
+def _archived_record(table, column: str) -> Optional[Dict]:
+    import pyarrow.compute as pc
+
+    best = pc.max(table[column]).as_py()
+    if not best:
+        return None
+    return {"value": float(best), "date": pc.min(table.filter(pc.equal(table[column], best))["date"]).as_py()}
+
+
+def _best_record(*records) -> Optional[Dict]:
+    # SQL'deki gibi: en yüksek değer, eşitlikte en erken tarih
+    return min((record for record in records if record), key=lambda record: (-record["value"], record["date"]), default=None)
+
+
+def _archived_columns(table):
+    """The archived rows with CAST(reps AS INTEGER) as SQLite does it, volume and estimated_1rm columns."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    # Metnin baştaki tam sayısı, yoksa 0; NULL olduğu gibi kalır
+    leading = pc.struct_field(pc.extract_regex(table["reps"], r"^\s*(?P<reps>[+-]?\d+)"), [0])
+    reps_value = pc.if_else(pc.is_valid(table["reps"]), pc.fill_null(pc.cast(leading, pa.int64()), 0), pa.scalar(None, pa.int64()))
+    weight = table["weight"]
+    return pa.table({
+        "date": table["date"],
+        "weight": weight,
+        "sets": table["sets"],
+        "volume": pc.multiply(pc.multiply(weight, table["sets"]), reps_value),
+        "estimated_1rm": pc.multiply(weight, pc.add(1, pc.divide(reps_value, 30.0))),
+    })
+
+
+def _progress_with_archive(db: Session, where, exercise_name: str, archived) -> Optional[Dict]:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    archived = archived.filter(pc.is_valid(archived["date"]))
+    last_archived = pc.max(archived["date"]).as_py()
+    # Yarıda kalan arşivlemenin kopyaları hem dosyada hem veritabanında: veritabanındaki sayılır
+    early = db.execute(
+        select(UserFitnessData.id, UserFitnessData.date).where(*where, UserFitnessData.date <= last_archived)
+    ).all() if last_archived is not None else []
+    if early:
+        archived = archived.filter(pc.invert(pc.is_in(archived["id"], value_set=pa.array([row.id for row in early], pa.int64()))))
+    archived = _archived_columns(archived)
+
+    later = UserFitnessData.date > last_archived if last_archived is not None else true()
+    live = db.execute(
+        select(
+            func.count(case((later, UserFitnessData.date)).distinct()).label("later_sessions"),
+            func.min(UserFitnessData.date).label("first_date"),
+            func.max(UserFitnessData.date).label("last_date"),
+        ).where(*where)
+    ).one()
+    archived_dates = set(pc.unique(archived["date"]).to_pylist()) | {row.date for row in early}
+    sessions = len(archived_dates) + live.later_sessions
+    if not sessions:
+        return None
+
+    days = pc.cast(archived["date"], pa.int32())
+    weeks = pc.cast(pc.cast(pc.subtract(days, pc.cast(pc.day_of_week(archived["date"]), pa.int32())), pa.date32()), pa.string())
+    months = pc.strftime(archived["date"], "%Y-%m")
+    return {
+        "exercise_name": exercise_name,
+        "sessions": sessions,
+        "first_date": min(day for day in (pc.min(archived["date"]).as_py(), live.first_date) if day),
+        "last_date": max(day for day in (last_archived, live.last_date) if day),
+        "max_weight": _best_record(_record(db, where, UserFitnessData.weight), _archived_record(archived, "weight")),
+        "max_volume": _best_record(_record(db, where, volume), _archived_record(archived, "volume")),
+        "estimated_1rm": _best_record(_record(db, where, estimated_1rm), _archived_record(archived, "estimated_1rm")),
+        "weekly": _merged_volume_series(
+            [_period_totals(db, where, "week"), _archived_period_totals(archived, weeks)], WEEKS, WEEKLY_MOVING_AVERAGE
+        ),
+        "monthly": _merged_volume_series(
+            [_period_totals(db, where, "month"), _archived_period_totals(archived, months)], MONTHS, MONTHLY_MOVING_AVERAGE
+        ),
+    }
@@ -0,0 +1,85 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+from functools import lru_cache
+from typing import Optional
+from cache import LRUCache
+
+# PBKDF2 iterasyon sayısı; artırmak girişi yavaşlatır ama kaba kuvvet saldırılarını zorlaştırır
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "200000"))
+PASSWORD_HASH_ALGORITHM = "pbkdf2_sha256"
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+
+
+def hash_password(password: str, iterations: int = None) -> str:
+    """
+    Hashes `password` as "pbkdf2_sha256$<iterations>$<salt>$<hash>".
+
+    CPU-bound by design; call it through a threadpool from async code.
+    """
+    iterations = iterations or PASSWORD_HASH_ITERATIONS
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return "$".join([
+        PASSWORD_HASH_ALGORITHM,
+        str(iterations),
+        base64.b64encode(salt).decode(),
+        base64.b64encode(digest).decode(),
+    ])
+
+
+def is_password_hash(stored: Optional[str]) -> bool:
+    return bool(stored) and stored.startswith(PASSWORD_HASH_ALGORITHM + "$")
+
+
+def verify_password(password: str, stored: Optional[str]) -> bool:
+    """
+    Checks `password` against a stored hash in constant time.
+
+    Plaintext passwords from before hashing are converted at startup by
+    migrations.hash_plaintext_passwords and never match here.
+    """
+    if not is_password_hash(stored):
+        return False
+    _, iterations, salt, expected = stored.split("$")
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), base64.b64decode(salt), int(iterations))
+    return hmac.compare_digest(digest, base64.b64decode(expected))
+
+
+def needs_rehash(stored: str) -> bool:
+    return int(stored.split("$")[1]) != PASSWORD_HASH_ITERATIONS
+
+
+@lru_cache(maxsize=1)
+def dummy_password_hash() -> str:
+    """Hash verified when no account matches, so misses take as long as hits."""
+    return hash_password(secrets.token_urlsafe(16))
+
+
+class SessionStore:
+    """
+    Short-lived login sessions: opaque bearer token -> {"id", "role"}.
+
+    Backed by LRUCache, so sessions expire after SESSION_TTL seconds and the
+    least recently used ones are dropped beyond SESSION_CACHE_SIZE.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, maxsize: int = SESSION_CACHE_SIZE):
+        self._sessions = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def create(self, account_id: int, role: str) -> str:
+        token = secrets.token_urlsafe(32)
+        self._sessions.set(token, {"id": account_id, "role": role})
+        return token
+
+    def get(self, token: str) -> Optional[dict]:
+        return self._sessions.get(token)
+
+    def revoke(self, token: str):
+        self._sessions.pop(token)
+
+
+sessions = SessionStore()
@@ -0,0 +1,102 @@
+"""
+p50/p99 latency of the async read endpoints in main.py against the same
+handlers written as sync `def` endpoints on the blocking engine (the
+previous implementation), under concurrent in-process load.
+
+    python -m benchmarks.bench_async_endpoints [--requests 2000] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy.orm import Session
+from main import app as async_app
+from database import async_engine, get_db
+from models import Coach, CoachResponse, StudentResponse, User, UserResponse, WorkoutPlan
+from plan_store import load_workout_plans
+
+sync_app = FastAPI()
+
+
+@sync_app.get("/workout_plans/{user_id}")
+def get_workout_plans(user_id: int, db: Session = Depends(get_db)):
+    plan_ids = [plan_id for (plan_id,) in db.query(WorkoutPlan.id).filter(WorkoutPlan.user_id == user_id)]
+    if not plan_ids:
+        raise HTTPException(status_code=404, detail="Workout plans not found")
+    plans = load_workout_plans(db, plan_ids)
+    return [{"id": plan_id, "user_id": user_id, "workout_data": json.dumps(plans[plan_id])} for plan_id in plan_ids]
+
+
+@sync_app.get("/coach/{coach_id}/students", response_model=List[StudentResponse])
+def get_students_by_coach(coach_id: int, db: Session = Depends(get_db)):
+    coach = db.query(Coach).filter(Coach.id == coach_id).first()
+    if not coach:
+        raise HTTPException(status_code=404, detail="Coach not found")
+    return db.query(User).filter(User.coach_id == coach_id).all()
+
+
+@sync_app.get("/user_info/{user_id}", response_model=UserResponse)
+def get_user_info(user_id: int, db: Session = Depends(get_db)):
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+@sync_app.get("/coaches", response_model=List[CoachResponse])
+def get_all_coaches(db: Session = Depends(get_db)):
+    return db.query(Coach).all()
+
+
+PATHS = ["/user_info/1", "/coaches", "/coach/1/students", "/workout_plans/1"]
+
+
+async def load(app, path, requests, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "rps": requests / elapsed,
+    }
+
+
+async def run(requests, concurrency):
+    # The async engine's pool is bound to one event loop, so every run shares this one
+    print(f"{'path':<20} {'impl':<6} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    for path in PATHS:
+        for name, app in (("sync", sync_app), ("async", async_app)):
+            result = await load(app, path, requests, concurrency)
+            print(f"{path:<20} {name:<6} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['rps']:>8.0f}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    # Above ~40 the sync app's threadpool can starve its own session cleanup
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Parallel POST /generate_workout_plan against a scratch copy of fitness.db,
+with and without the SQLite connection tuning in database.py (WAL,
+synchronous=NORMAL, busy_timeout, sized pool).
+
+    python -m benchmarks.bench_concurrent_writes [--requests 400] [--concurrency 16]
+
+Each profile runs in a fresh interpreter because the engine is configured
+from environment variables at import time.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def load(requests, concurrency):
+    import httpx
+    from main import app
+
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            async with semaphore:
+                response = await client.post(
+                    f"/generate_workout_plan/{i % 100 + 1}",
+                    json={"age": 30, "weight": 80, "height": 180, "days": 7}
+                )
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+    return {"plans_per_sec": statuses.get(200, 0) / elapsed, "statuses": statuses}
+
+
+def worker(requests, concurrency):
+    print(json.dumps(asyncio.run(load(requests, concurrency))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker(args.requests, args.concurrency)
+
+    print(f"{'profile':<8} {'plans/s':>8}  statuses")
+    for profile, tuning in (("default", "0"), ("tuned", "1")):
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copy("fitness.db", os.path.join(tmp, "fitness.db"))
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/fitness.db", SQLITE_TUNING=tuning)
+            env.pop("ASYNC_DATABASE_URL", None)
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_concurrent_writes", "--worker",
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{profile:<8} {result['plans_per_sec']:>8.1f}  {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Sustained rows/sec of POST /user_fitness_data/log against a scratch copy of
+fitness.db: many clients posting batches for --duration seconds, with the
+in-process write buffer (202, flushed on size/time) versus a flush per
+request (?wait=true). Rows are counted in the database after the final flush.
+
+    python -m benchmarks.bench_fitness_ingest [--duration 10] [--clients 32] [--batch 50]
+
+Each profile runs in a fresh interpreter on its own copy of the database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+
+def batch_body(rng_key, batch, ndjson):
+    entries = [
+        {"user_id": i % 20 + 1, "date": "2024-03-01", "exercise_name": "Bench Press", "weight": 60 + i % 40,
+         "sets": 3, "reps": 8 + i % 5, "idempotency_key": f"{rng_key}-{i}"}
+        for i in range(batch)
+    ]
+    if ndjson:
+        return "\n".join(json.dumps(entry) for entry in entries), "application/x-ndjson"
+    return json.dumps(entries), "application/json"
+
+
+async def load(duration, clients, batch, wait):
+    import httpx
+    from sqlalchemy import func, select
+    from main import app, SessionLocal
+    from fitness_log import fitness_log
+    from models import UserFitnessData
+    from startup import ensure_started
+
+    ensure_started()
+    with SessionLocal() as db:
+        before = db.scalar(select(func.count()).select_from(UserFitnessData))
+    statuses = {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def device(n):
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                body, content_type = batch_body(uuid.uuid4().hex, batch, ndjson=n % 2 == 1)
+                response = await client.post(
+                    "/user_fitness_data/log", params={"wait": "true"} if wait else None,
+                    content=body, headers={"Content-Type": content_type}
+                )
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(device(n) for n in range(clients)))
+        fitness_log.close()  # Kalan satırlar da süreye dahil
+        elapsed = time.perf_counter() - started
+
+    with SessionLocal() as db:
+        rows = db.scalar(select(func.count()).select_from(UserFitnessData)) - before
+    return {"rows_per_sec": rows / elapsed, "rows": rows, "statuses": statuses, **fitness_log.metrics()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=50, help="rows per request")
+    parser.add_argument("--wait", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(load(args.duration, args.clients, args.batch, args.wait))))
+        return
+
+    print(f"{'profile':<10} {'rows/s':>10} {'rows':>10} {'flushes':>8}  statuses")
+    for profile, wait in (("per-request", True), ("buffered", False)):
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copy("fitness.db", os.path.join(tmp, "fitness.db"))
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/fitness.db")
+            env.pop("ASYNC_DATABASE_URL", None)
+            command = [sys.executable, "-m", "benchmarks.bench_fitness_ingest", "--worker",
+                       "--duration", str(args.duration), "--clients", str(args.clients), "--batch", str(args.batch)]
+            output = subprocess.run(command + (["--wait"] if wait else []), env=env, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{profile:<10} {result['rows_per_sec']:>10.0f} {result['rows']:>10} {result['flushes']:>8}  {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Rows/sec for writing the UserFitnessData rows of a generated plan:
+per-object ORM `db.add` versus the Core executemany in fitness_store.
+
+    python -m benchmarks.bench_fitness_insert [--plans 200]
+"""
+import argparse
+import time
+from algorithms import build_workout_plan
+from catalog import ExerciseCatalog
+from fitness_store import bulk_insert_fitness_data, fitness_data_rows
+from models import UserFitnessData
+from benchmarks.common import memory_sessionmaker
+
+
+def orm_insert(db, rows):
+    for row in rows:
+        db.add(UserFitnessData(**row))
+
+
+def run(writer, SessionLocal, plans):
+    total = 0
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        for rows in plans:
+            writer(db, rows)
+            db.commit()
+            total += len(rows)
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plans", type=int, default=200)
+    args = parser.parse_args()
+
+    SessionLocal = memory_sessionmaker()
+    with SessionLocal() as db:
+        catalog = ExerciseCatalog().get(db)
+
+    print(f"{'days':>4} {'rows/plan':>9} {'orm rows/s':>12} {'bulk rows/s':>12} {'speedup':>8}")
+    for days in (3, 5, 7):
+        plans = [fitness_data_rows(1, build_workout_plan(days, catalog)) for _ in range(args.plans)]
+        orm = run(orm_insert, SessionLocal, plans)
+        bulk = run(bulk_insert_fitness_data, SessionLocal, plans)
+        print(f"{days:>4} {len(plans[0]):>9} {orm:>12.0f} {bulk:>12.0f} {bulk / orm:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+pytest-benchmark comparison of the two ways list endpoints build their JSON:
+ORM objects validated through the response model (default) versus Core
+column rows encoded with orjson (FAST_JSON_LISTS=1, see fast_json.py).
+Each round includes the query.
+
+    python -m pytest benchmarks/bench_json.py --benchmark-json=benchmarks/data/json.json
+
+Compare two runs with `python -m benchmarks.compare old.json new.json`.
+"""
+from datetime import date, timedelta
+from typing import List
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from fast_json import response_columns, rows_to_json
+from models import StudentResponse, User, UserFitnessData, UserFitnessDataResponse
+from benchmarks.common import memory_sessionmaker
+
+ROWS = [10_000, 50_000]
+
+
+@pytest.fixture(scope="module", params=ROWS, ids=lambda rows: f"{rows}rows")
+def db(request):
+    rows = request.param
+    SessionLocal = memory_sessionmaker(users=rows)
+    with SessionLocal() as session:
+        start = date(2020, 1, 1)
+        session.execute(insert(UserFitnessData.__table__), [
+            {"user_id": 1, "date": start + timedelta(days=i // 10), "exercise_name": "Bench Press", "weight": 60.0,
+             "sets": 3, "reps": str(8 + i % 5)}
+            for i in range(rows)
+        ])
+        session.commit()
+        yield session
+
+
+def pydantic_json(db, model, query):
+    adapter = TypeAdapter(List[model])
+    return adapter.dump_json(adapter.validate_python(db.scalars(query).all(), from_attributes=True))
+
+
+def fast_json(db, model, entity, where=()):
+    return rows_to_json(list(model.model_fields), db.execute(select(*response_columns(model, entity)).where(*where)).all())
+
+
+def test_students_pydantic(benchmark, db):
+    benchmark(pydantic_json, db, StudentResponse, select(User))
+
+
+def test_students_fast(benchmark, db):
+    content = benchmark(fast_json, db, StudentResponse, User)
+    assert content == pydantic_json(db, StudentResponse, select(User))
+
+
+def test_fitness_data_pydantic(benchmark, db):
+    benchmark(pydantic_json, db, UserFitnessDataResponse, select(UserFitnessData).where(UserFitnessData.user_id == 1))
+
+
+def test_fitness_data_fast(benchmark, db):
+    content = benchmark(fast_json, db, UserFitnessDataResponse, UserFitnessData, (UserFitnessData.user_id == 1,))
+    assert content == pydantic_json(db, UserFitnessDataResponse, select(UserFitnessData).where(UserFitnessData.user_id == 1))
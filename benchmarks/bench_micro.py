@@ -0,0 +1,48 @@
+"""
+pytest-benchmark microbenchmarks of plan generation and Excel export.
+
+    python -m pytest benchmarks/bench_micro.py --benchmark-json=benchmarks/data/micro.json
+
+Compare two runs with `python -m benchmarks.compare old.json new.json`.
+"""
+from io import BytesIO
+import pytest
+from algorithms import generate_workout_plan, save_workout_plan_to_excel
+from catalog import exercise_catalog
+from plan_engine import plan_engine
+from benchmarks.common import memory_sessionmaker
+
+USERS = 100
+
+
+@pytest.fixture(scope="module")
+def db():
+    SessionLocal = memory_sessionmaker(exercises_per_region=50, users=USERS)
+    with SessionLocal() as session:
+        exercise_catalog.invalidate()
+        yield session
+    exercise_catalog.invalidate()
+
+
+@pytest.mark.parametrize("days", [3, 7])
+def test_generate_workout_plan(benchmark, db, days):
+    # Her turda farklı kullanıcı ve temiz memo: önbelleksiz üretim süresi
+    users = iter(range(10 ** 9))
+
+    def setup():
+        plan_engine._memo.clear()
+        return (next(users) % USERS + 1, days, db), {}
+
+    plan = benchmark.pedantic(generate_workout_plan, setup=setup, rounds=200)
+    assert len(plan) == days
+
+
+def test_generate_workout_plan_memoized(benchmark, db):
+    generate_workout_plan(1, 7, db)
+    benchmark(generate_workout_plan, 1, 7, db)
+
+
+@pytest.mark.parametrize("days", [3, 7])
+def test_save_workout_plan_to_excel(benchmark, db, days):
+    plan = generate_workout_plan(1, days, db)
+    benchmark(lambda: save_workout_plan_to_excel(plan, BytesIO()))
@@ -0,0 +1,71 @@
+"""
+Plans/sec of personalized generation: one vectorized batch for all users
+versus one call per user, against the uniform seeded engine as a baseline.
+
+    python -m benchmarks.bench_personalization [--users 5000] [--days 7] [--exercises-per-region 50]
+"""
+import argparse
+import random
+import time
+from catalog import ExerciseCatalog
+from personalization import UserProfile
+from plan_engine import PlanEngine
+from benchmarks.common import EQUIPMENT, memory_sessionmaker
+
+GOALS = ["Muscle Gain", "Weight Loss", "Endurance"]
+
+
+def random_profiles(users, exercise_names):
+    rng = random.Random(0)
+    return {
+        user_id: UserProfile(
+            fitness_level=rng.randint(1, 3),
+            goal=rng.choice(GOALS),
+            age=rng.randint(18, 70),
+            bmi=round(rng.uniform(18, 38), 1),
+            equipment=frozenset(rng.sample(EQUIPMENT, 3)) if rng.random() < 0.5 else None,
+            history=tuple(sorted((name, rng.randint(1, 3)) for name in rng.sample(exercise_names, 10))),
+        )
+        for user_id in range(users)
+    }
+
+
+def timed(build, users):
+    start = time.perf_counter()
+    build()
+    return users / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--exercises-per-region", type=int, default=50)
+    args = parser.parse_args()
+
+    SessionLocal = memory_sessionmaker(args.exercises_per_region)
+    with SessionLocal() as db:
+        catalog = ExerciseCatalog().get(db)
+    profiles = random_profiles(args.users, [e.exercise_name for e in catalog.exercises])
+
+    def fresh_engine():
+        # Memo'suz ölçüm için her durumda yeni motor
+        engine = PlanEngine(memo_size=1)
+        engine.build(args.days, catalog, user_id=-1)
+        return engine
+
+    uniform, per_user, batch = fresh_engine(), fresh_engine(), fresh_engine()
+    cases = [
+        ("uniform seeded", lambda: [uniform.build(args.days, catalog, user_id) for user_id in profiles]),
+        ("personalized per user", lambda: [
+            per_user.build_personalized(args.days, catalog, {user_id: profile}) for user_id, profile in profiles.items()
+        ]),
+        ("personalized batch", lambda: batch.build_personalized(args.days, catalog, profiles)),
+    ]
+    print(f"{'generator':<24} {'plans/s':>10}")
+    for name, build in cases:
+        print(f"{name:<24} {timed(build, args.users):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Plans/sec of the rule-table plan engine against the previous if/elif
+generator (global `random`, catalog rows formatted on every call), for
+unseeded, per-user seeded and memoized generation.
+
+    python -m benchmarks.bench_plan_engine [--plans 20000] [--days 7] [--exercises-per-region 50]
+"""
+import argparse
+import random
+import time
+from catalog import ExerciseCatalog
+from plan_engine import PlanEngine
+from benchmarks.common import memory_sessionmaker
+
+
+def legacy_build_workout_plan(days, catalog):
+    workout_plan = {}
+
+    def get_random_exercises(region, count):
+        region_exercises = catalog.region(region)
+        return random.sample(region_exercises, min(count, len(region_exercises)))
+
+    for day in range(1, days + 1):
+        day_key = f"Day {day}"
+        if day == 5 and days == 7:
+            workout_plan[day_key] = [{"Message": "Dinlenme Günü"}]
+            continue
+        if day == 1:
+            day_plan = (get_random_exercises("Gogus", 2) + get_random_exercises("Omuz", 2) + get_random_exercises("Biceps", 1)
+                        + get_random_exercises("On Kol", 1) + get_random_exercises("Arka Kol", 1) + get_random_exercises("Sirt", 2)
+                        + get_random_exercises("Bacak", 2))
+        elif day == 2:
+            day_plan = (get_random_exercises("Gogus", 2) + get_random_exercises("Omuz", 2) + get_random_exercises("Biceps", 1)
+                        + get_random_exercises("On Kol", 1) + get_random_exercises("Arka Kol", 1) + get_random_exercises("Sirt", 2))
+        elif day == 3:
+            day_plan = get_random_exercises("Gogus", 3) + get_random_exercises("Omuz", 3) + get_random_exercises("Arka Kol", 2)
+        elif day == 4:
+            day_plan = get_random_exercises("Bacak", 5)
+        elif day == 6:
+            day_plan = get_random_exercises("Arka Kol", 3) + get_random_exercises("Biceps", 3) + get_random_exercises("On Kol", 3)
+        elif day == 7:
+            day_plan = get_random_exercises("Bacak", 4) + get_random_exercises("Arka Kol", 3) + get_random_exercises("Biceps", 3)
+        else:
+            day_plan = []
+        workout_plan[day_key] = [
+            {
+                "bolge": exercise.body_part,
+                "hareket_adi": exercise.exercise_name,
+                "set_sayisi": max(1, exercise.sets),
+                "tekrar_sayisi": max(5, exercise.reps),
+                "ekipman": exercise.equipment or "None"
+            }
+            for exercise in day_plan
+        ]
+    return workout_plan
+
+
+def plans_per_second(build, plans):
+    start = time.perf_counter()
+    for i in range(plans):
+        build(i)
+    return plans / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plans", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--exercises-per-region", type=int, default=50)
+    args = parser.parse_args()
+
+    SessionLocal = memory_sessionmaker(args.exercises_per_region)
+    with SessionLocal() as db:
+        catalog = ExerciseCatalog().get(db)
+
+    engine = PlanEngine(memo_size=args.plans)
+    engine.build(args.days, catalog, user_id=0)  # Bölge dizileri önceden hazırlansın
+
+    cases = [
+        ("legacy if/elif", lambda i: legacy_build_workout_plan(args.days, catalog)),
+        ("engine unseeded", lambda i: engine.build(args.days, catalog)),
+        ("engine seeded (cold)", lambda i: engine.build(args.days, catalog, user_id=i)),
+        ("engine memoized", lambda i: engine.build(args.days, catalog, user_id=i)),
+    ]
+    print(f"{'generator':<22} {'plans/s':>10}")
+    for name, build in cases:
+        print(f"{name:<22} {plans_per_second(build, args.plans):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
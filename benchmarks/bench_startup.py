@@ -0,0 +1,103 @@
+"""
+Cold-start cost of the web process: `import main`, the startup work
+(tables, migrations, catalog warmup) and the first requests, each measured
+in a fresh interpreter on a scratch copy of fitness.db.
+
+    python -m benchmarks.bench_startup [--runs 5] [--output benchmarks/data/startup.json]
+
+Reports the median of every phase plus the slowest modules of
+`python -X importtime -c "import main"`. Compare two runs with
+`python -m benchmarks.compare base.json head.json`.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.report import environment, write_json
+
+# İlk istekler: hafif bir okuma ve dışa aktarım yığınını ilk kez yükleyen Excel çıktısı
+FIRST_REQUESTS = (("first_request_ms", "/coaches"), ("first_export_ms", "/export_workout_plan/1"))
+
+
+def measure():
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    from startup import ensure_started
+    ensure_started()
+    result = {"import_ms": (imported - started) * 1000, "startup_ms": (time.perf_counter() - imported) * 1000}
+
+    from fastapi.testclient import TestClient
+    client = TestClient(main.app)
+    for name, url in FIRST_REQUESTS:
+        start = time.perf_counter()
+        response = client.get(url)
+        result[name] = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200, (url, response.status_code)
+    result["ready_ms"] = result["import_ms"] + result["startup_ms"] + result["first_request_ms"]
+    return result
+
+
+def import_times(env):
+    """{module: cumulative microseconds} from -X importtime."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], env=env, capture_output=True, text=True, check=True
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line.split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--output", default="benchmarks/data/startup.json")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure()))
+        return
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(args.runs):
+            # Her ölçüm taze bir kopyada: migration'lar ve tablo oluşturma da dahil
+            shutil.copy("fitness.db", os.path.join(tmp, "fitness.db"))
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/fitness.db", JOB_WORKERS="0")
+            env.pop("ASYNC_DATABASE_URL", None)
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_startup", "--worker"], env=env, capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        imports = import_times(env)
+
+    results = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+    for name, value in results.items():
+        print(f"{name:<18} {value:>10.1f}")
+    slowest = sorted(((module, micros / 1000) for module, micros in imports.items() if module != "main"), key=lambda item: -item[1])
+    print(f"\n{'module (cumulative)':<40} {'ms':>8}")
+    for module, ms in slowest[:args.top]:
+        print(f"{module:<40} {ms:>8.1f}")
+
+    write_json(args.output, {
+        "kind": "startup",
+        "environment": environment(),
+        "runs": args.runs,
+        "results": results,
+        "slowest_imports": dict(slowest[:args.top]),
+    })
+
+
+if __name__ == "__main__":
+    main()
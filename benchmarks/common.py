@@ -0,0 +1,25 @@
+"""Shared helpers for the scripts in this package (run them from the repo root)."""
+from sqlalchemy.orm import sessionmaker
+from database import create_db_engine
+from models import Base, Exercise, User
+
+REGIONS = ["Gogus", "Omuz", "Biceps", "On Kol", "Arka Kol", "Sirt", "Bacak"]
+EQUIPMENT = ["Barbell", "Dumbbell", "Bodyweight", "Cable", "Machine"]
+
+
+def memory_sessionmaker(exercises_per_region: int = 10, users: int = 1):
+    """Returns a sessionmaker bound to a fresh, seeded in-memory SQLite database."""
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        db.add_all(
+            Exercise(exercise_name=f"{region} {i}", body_part=region, sets=3, reps=10,
+                     equipment=EQUIPMENT[i % len(EQUIPMENT)])
+            for region in REGIONS for i in range(exercises_per_region)
+        )
+        db.add_all(User(name=f"User {i}", age=30, weight=80, height=180, fitness_level=2, bmi=24.7,
+                        coach_id=None, daily_calories=2300, goal="Muscle Gain", password="1234")
+                   for i in range(users))
+        db.commit()
+    return SessionLocal
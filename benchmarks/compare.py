@@ -0,0 +1,56 @@
+"""
+Compares two benchmark result files and exits with status 1 on a regression.
+
+    python -m benchmarks.compare base.json head.json [--threshold 0.10]
+
+Accepts the JSON of benchmarks.load_test (p50/p99 latency and req/s per route),
+the --benchmark-json output of the pytest-benchmark microbenchmarks
+(mean time per benchmark) and benchmarks.bench_startup (median import,
+startup and first request times).
+"""
+import argparse
+import json
+
+
+def metrics(data):
+    """Flattens a result file to {name: (value, higher_is_better)}."""
+    if data.get("kind") == "load_test":
+        flat = {}
+        for result in data["results"]:
+            name = f"{result['method']} {result['route']}"
+            flat[f"{name} p50_ms"] = (result["p50_ms"], False)
+            flat[f"{name} p99_ms"] = (result["p99_ms"], False)
+            flat[f"{name} rps"] = (result["rps"], True)
+        return flat
+    if data.get("kind") == "startup":
+        return {f"startup {name}": (value, False) for name, value in data["results"].items()}
+    return {bench["name"]: (bench["stats"]["mean"], False) for bench in data["benchmarks"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = metrics(json.load(f))
+    with open(args.head, encoding="utf-8") as f:
+        head = metrics(json.load(f))
+
+    regressions = 0
+    print(f"{'metric':<80} {'base':>12} {'head':>12} {'change':>8}")
+    for name in sorted(base.keys() & head.keys()):
+        (old, higher_is_better), (new, _) = base[name], head[name]
+        change = (new - old) / old if old else 0.0
+        regressed = -change > args.threshold if higher_is_better else change > args.threshold
+        regressions += regressed
+        print(f"{name:<80} {old:>12.4g} {new:>12.4g} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    for name in sorted(base.keys() ^ head.keys()):
+        print(f"{name:<80} only in {'base' if name in base else 'head'}")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Concurrent in-process load test of every route of main.app against a seeded
+database (see benchmarks.seed). Requests go through the ASGI app with
+httpx.ASGITransport, so no server or network is involved.
+
+    python -m benchmarks.seed --scale small
+    python -m benchmarks.load_test [--requests 500] [--concurrency 16] [--route /coaches] [--output load.json]
+
+Results (p50/p95/p99 latency, req/s and status counts per route) are written
+as JSON together with the git commit; compare two runs with
+`python -m benchmarks.compare base.json head.json`. Routes that have no
+request recipe below are listed under "skipped" so new endpoints get noticed.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from benchmarks.report import SEEDED_DATABASE_URL, environment, write_json
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class Fixtures:
+    """Ids and names sampled from the seeded database, plus sessions and jobs the recipes need."""
+
+    def __init__(self, main, requests):
+        from sqlalchemy import func, select
+        from auth import sessions
+        from job_queue import submit
+        from models import Coach, Exercise, User, WorkoutPlan
+
+        with main.SessionLocal() as db:
+            self.users = db.scalar(select(func.max(User.id))) or 1
+            self.coaches = db.scalar(select(func.max(Coach.id))) or 1
+            self.plan_users = [user_id for (user_id,) in db.execute(select(WorkoutPlan.user_id).limit(1000))] or [1]
+            self.coached = [tuple(row) for row in db.execute(
+                select(User.coach_id, User.id).where(User.coach_id.is_not(None)).limit(1000)
+            )] or [(1, 1)]
+            self.exercises = list(db.scalars(select(Exercise.exercise_name))) or ["Gogus 0"]
+            self.jobs = [submit(db, "export_workout_plan", {"user_id": user_id}) for user_id in self.plan_users[:10]]
+        self.tokens = [sessions.create(user_id, "user") for user_id in range(1, requests + 1)]
+
+
+def user_data(rng, days=None):
+    return {"age": rng.randint(18, 70), "weight": rng.randint(50, 120), "height": rng.randint(150, 200),
+            "days": days or rng.randint(2, 7)}
+
+
+def fitness_entries(rng, fixtures, count=5):
+    # Her kayıt yeni bir idempotency anahtarı alır; tekrar çalıştırmalar da tekrar sayılmaz
+    day = (date.today() - timedelta(days=rng.randrange(30))).isoformat()
+    return [
+        {"user_id": rng.randint(1, fixtures.users), "date": day, "exercise_name": rng.choice(fixtures.exercises),
+         "weight": rng.randint(0, 150), "sets": rng.randint(1, 6), "reps": rng.randint(5, 20),
+         "idempotency_key": uuid.uuid4().hex}
+        for _ in range(count)
+    ]
+
+
+# (method, route) -> recipe(rng, fixtures) -> request kwargs for httpx
+RECIPES = {
+    ("GET", "/export_workout_plan/{user_id}"): lambda rng, f: {"url": f"/export_workout_plan/{rng.choice(f.plan_users)}"},
+    ("GET", "/coach/{coach_id}/export_workout_plans"): lambda rng, f: {
+        "url": f"/coach/{rng.choice(f.coached)[0]}/export_workout_plans", "params": {"format": "csv"}},
+    ("POST", "/generate_workout_plan/{user_id}"): lambda rng, f: {
+        "url": f"/generate_workout_plan/{rng.randint(1, f.users)}", "json": user_data(rng)},
+    ("POST", "/coach/{coach_id}/generate_workout_plans"): lambda rng, f: {
+        "url": f"/coach/{rng.choice(f.coached)[0]}/generate_workout_plans", "json": {"days": 3}},
+    ("GET", "/user_fitness_data/{user_id}/exercise/{exercise_name}"): lambda rng, f: {
+        "url": f"/user_fitness_data/{rng.randint(1, f.users)}/exercise/{rng.choice(f.exercises)}"},
+    ("GET", "/user_fitness_data/{user_id}/exercise/{exercise_name}/analytics"): lambda rng, f: {
+        "url": f"/user_fitness_data/{rng.randint(1, f.users)}/exercise/{rng.choice(f.exercises)}/analytics"},
+    ("POST", "/user_fitness_data/log"): lambda rng, f: {"url": "/user_fitness_data/log", "json": fitness_entries(rng, f)},
+    ("GET", "/fitness_log/metrics"): lambda rng, f: {"url": "/fitness_log/metrics"},
+    ("PUT", "/update_user_data/{user_id}"): lambda rng, f: {
+        "url": f"/update_user_data/{rng.randint(1, f.users)}", "json": user_data(rng)},
+    ("GET", "/metrics"): lambda rng, f: {"url": "/metrics"},
+    ("GET", "/plan_pool/metrics"): lambda rng, f: {"url": "/plan_pool/metrics"},
+    ("GET", "/workout_plans/{user_id}"): lambda rng, f: {"url": f"/workout_plans/{rng.choice(f.plan_users)}"},
+    ("GET", "/workout_plans/{user_id}/days/{day_number}"): lambda rng, f: {
+        "url": f"/workout_plans/{rng.choice(f.plan_users)}/days/{rng.randint(1, 2)}"},
+    ("GET", "/workout_plans/{user_id}/history"): lambda rng, f: {"url": f"/workout_plans/{rng.choice(f.plan_users)}/history"},
+    ("PATCH", "/workout_plans/{user_id}/days/{day_number}/exercises/{position}"): lambda rng, f: {
+        "url": f"/workout_plans/{rng.choice(f.plan_users)}/days/1/exercises/0", "json": {"tekrar_sayisi": rng.randint(5, 20)}},
+    ("POST", "/jobs/generate_workout_plan/{user_id}"): lambda rng, f: {
+        "url": f"/jobs/generate_workout_plan/{rng.randint(1, f.users)}", "json": user_data(rng)},
+    ("POST", "/jobs/export_workout_plan/{user_id}"): lambda rng, f: {
+        "url": f"/jobs/export_workout_plan/{rng.choice(f.plan_users)}"},
+    ("GET", "/jobs/{job_id}"): lambda rng, f: {"url": f"/jobs/{rng.choice(f.jobs)}"},
+    ("GET", "/jobs/{job_id}/result"): lambda rng, f: {"url": f"/jobs/{rng.choice(f.jobs)}/result"},
+    ("POST", "/login"): lambda rng, f: {"json": {"name": f"user{rng.randint(1, f.users)}", "password": "1234"}, "url": "/login"},
+    ("GET", "/session"): lambda rng, f: {"url": "/session", "headers": {"Authorization": f"Bearer {f.tokens[0]}"}},
+    # Her çıkış kendi oturumunu kapatır
+    ("POST", "/logout"): lambda rng, f: {"url": "/logout", "headers": {"Authorization": f"Bearer {f.tokens.pop()}"}},
+    ("GET", "/coach/{coach_id}/students"): lambda rng, f: {"url": f"/coach/{rng.choice(f.coached)[0]}/students"},
+    ("GET", "/coach/{coach_id}/dashboard"): lambda rng, f: {"url": f"/coach/{rng.choice(f.coached)[0]}/dashboard"},
+    ("GET", "/user_info/{user_id}"): lambda rng, f: {"url": f"/user_info/{rng.randint(1, f.users)}"},
+    ("GET", "/coaches"): lambda rng, f: {"url": "/coaches"},
+    ("POST", "/select_coach"): lambda rng, f: {
+        "url": "/select_coach", "json": {"user_id": rng.randint(1, f.users), "coach_id": rng.randint(1, f.coaches)}},
+}
+
+
+def app_routes(app):
+    for route in app.routes:
+        if not getattr(route, "include_in_schema", False):
+            continue  # /docs, /openapi.json
+        for method in sorted(route.methods - {"HEAD"}):
+            yield method, route.path
+
+
+async def load(client, method, recipe, fixtures, requests, concurrency, seed):
+    rng = random.Random(seed)
+    calls = [recipe(rng, fixtures) for _ in range(requests)]
+    latencies, statuses = [], Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(kwargs):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, **kwargs)
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(kwargs) for kwargs in calls))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "rps": requests / elapsed,
+        "status": dict(statuses),
+        "errors": sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500),
+    }
+
+
+async def run(main, args):
+    import httpx
+    from startup import ensure_started
+
+    ensure_started()  # ASGITransport lifespan çalıştırmaz; açılış işi ölçülen isteklere karışmasın
+    fixtures = Fixtures(main, args.requests)
+    results, skipped = [], []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for method, route in app_routes(main.app):
+            if args.route and route not in args.route:
+                continue
+            recipe = RECIPES.get((method, route))
+            if recipe is None:
+                skipped.append(f"{method} {route}")
+                continue
+            result = await load(client, method, recipe, fixtures, args.requests, args.concurrency, args.seed)
+            results.append({"method": method, "route": route, **result})
+            print(f"{method:<6} {route:<66} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['rps']:>8.0f} {result['errors']:>6}")
+    await main.async_engine.dispose()
+    return results, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=SEEDED_DATABASE_URL)
+    parser.add_argument("--requests", type=int, default=500, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--route", action="append", help="only load this route template (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmarks/data/load_test.json")
+    args = parser.parse_args()
+
+    # database.py bağlantı adresini import anında okuyor
+    os.environ["DATABASE_URL"] = args.database_url
+    import main as app_module
+
+    print(f"{'method':<6} {'route':<66} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errors':>6}")
+    results, skipped = asyncio.run(run(app_module, args))
+    write_json(args.output, {
+        "kind": "load_test",
+        "environment": environment(),
+        "database_url": args.database_url,
+        "results": results,
+        "skipped": skipped,
+    })
+    if skipped:
+        print(f"no recipe for: {', '.join(skipped)}")
+
+
+if __name__ == "__main__":
+    main()
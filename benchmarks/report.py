@@ -0,0 +1,39 @@
+"""
+JSON result files of the benchmark suite, tagged with the commit they were
+measured on. Imports nothing from the app, so scripts can point
+DATABASE_URL at the seeded database before importing it.
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+# benchmarks.seed buraya yazar, benchmarks.load_test buradan okur
+SEEDED_DATABASE_URL = "sqlite:///benchmarks/data/fitness.db"
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"results written to {path}")
@@ -0,0 +1,186 @@
+"""
+Seeds a synthetic fitness database for the benchmarks and the load test.
+
+    python -m benchmarks.seed [--scale small|medium|large] [--coaches N] [--users N]
+                              [--fitness-rows N] [--plan-users N] [--database-url URL]
+
+`large` is 10k coaches, 1M users and 50M UserFitnessData rows. Data is
+generated from a fixed seed, so two runs at the same scale produce the same
+database. Every account's password is "1234".
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+from sqlalchemy import insert
+from auth import hash_password
+from catalog import ExerciseCatalog
+from database import create_db_engine
+from migrations import run_migrations
+from models import Base, Coach, Exercise, User, UserFitnessData, WorkoutPlan
+from plan_engine import plan_engine
+from plan_store import _catalog_resolver, insert_plan_table_rows, plan_table_rows
+from sqlalchemy.orm import Session
+from benchmarks.common import EQUIPMENT, REGIONS
+from benchmarks.report import SEEDED_DATABASE_URL
+
+PASSWORD = "1234"
+
+# (coaches, users, fitness rows, users with a workout plan)
+SCALES = {
+    "small": (100, 10_000, 500_000, 1_000),
+    "medium": (1_000, 100_000, 5_000_000, 10_000),
+    "large": (10_000, 1_000_000, 50_000_000, 100_000),
+}
+CHUNK_ROWS = 50_000
+PLAN_CHUNK = 1_000  # Plan başına ~50 egzersiz satırı
+PLAN_DAYS = 7
+HISTORY_DAYS = 365
+GOALS = ["Muscle Gain", "Weight Loss", "Endurance"]
+SPECIALIZATIONS = ["Strength", "Cardio", "Mobility", "Bodybuilding"]
+
+
+def chunks(rows, size=CHUNK_ROWS):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def insert_rows(connection, table, rows):
+    total = 0
+    for chunk in chunks(rows):
+        connection.execute(insert(table), chunk)
+        total += len(chunk)
+    return total
+
+
+def coach_rows(rng, count, password):
+    for i in range(1, count + 1):
+        yield {
+            "id": i, "name": f"coach{i}", "specialization": rng.choice(SPECIALIZATIONS),
+            "age": rng.randint(22, 60), "weight": round(rng.uniform(55, 100), 1),
+            "height": round(rng.uniform(155, 200), 1), "experience_level": rng.randint(1, 10),
+            "password": password,
+        }
+
+
+def user_rows(rng, count, coaches, password):
+    for i in range(1, count + 1):
+        weight, height = round(rng.uniform(50, 120), 1), round(rng.uniform(150, 200), 1)
+        yield {
+            "id": i, "name": f"user{i}", "age": rng.randint(16, 75), "weight": weight, "height": height,
+            "fitness_level": rng.randint(1, 3), "bmi": round(weight / (height / 100) ** 2, 1),
+            "coach_id": rng.randint(1, coaches) if coaches else None,
+            "daily_calories": rng.randint(1600, 3500), "goal": rng.choice(GOALS), "password": password,
+        }
+
+
+def fitness_rows(rng, count, users, exercises):
+    # Kullanıcılara sırayla dağıtılıyor; her kullanıcının satırları art arda gelir (indeks dostu)
+    today = date.today()
+    per_user, extra = divmod(count, users)
+    for user_id in range(1, users + 1):
+        for n in range(per_user + (user_id <= extra)):
+            exercise = rng.choice(exercises)
+            yield {
+                "user_id": user_id, "date": today - timedelta(days=rng.randrange(HISTORY_DAYS)),
+                "exercise_name": exercise.exercise_name, "weight": round(rng.uniform(0, 150), 1),
+                # fitness.db'deki gibi tekrarlar metin olarak saklanıyor
+                "sets": rng.randint(1, 6), "reps": str(rng.randint(5, 20)),
+                "idempotency_key": f"seed-{n}",  # Kaydedilmiş antrenman (fitness_store.logged_workout)
+            }
+
+
+def seed(database_url, coaches, users, fitness_row_count, plan_users, exercises_per_region=10, log=print):
+    """Creates the schema at `database_url` and fills it; returns the row counts written."""
+    if database_url.startswith("sqlite:///"):
+        path = database_url[len("sqlite:///"):]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+    engine = create_db_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    # İndeksi yükleme bitince bir kerede kurmak satır satır güncellemekten hızlı
+    # Benzersiz idempotency indeksi kalır; sadece sorgu indeksi sonradan kurulur
+    fitness_index = next(index for index in UserFitnessData.__table__.indexes if index.name == "ix_UserFitnessData_user_exercise_date")
+    fitness_index.drop(bind=engine)
+
+    rng = random.Random(0)
+    password = hash_password(PASSWORD)  # Tüm hesaplar aynı hash'i paylaşıyor (PBKDF2 pahalı)
+    counts = {}
+    with engine.begin() as connection:
+        if engine.dialect.name == "sqlite":
+            connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        exercises = [
+            {"exercise_name": f"{region} {i}", "body_part": region, "sets": rng.randint(2, 5),
+             "reps": rng.randint(6, 15), "equipment": EQUIPMENT[i % len(EQUIPMENT)]}
+            for region in REGIONS for i in range(exercises_per_region)
+        ]
+        counts["exercises"] = insert_rows(connection, Exercise.__table__, exercises)
+        counts["coaches"] = insert_rows(connection, Coach.__table__, coach_rows(rng, coaches, password))
+        counts["users"] = insert_rows(connection, User.__table__, user_rows(rng, users, coaches, password))
+        log(f"accounts: {counts}")
+
+    with Session(engine) as db:
+        catalog = ExerciseCatalog().get(db)
+        resolve = _catalog_resolver(catalog)
+        plan_count = 0
+        for user_ids in chunks(range(1, min(plan_users, users) + 1), PLAN_CHUNK):
+            # Plan id'si kullanıcı id'siyle aynı
+            db.execute(insert(WorkoutPlan.__table__), [{"id": user_id, "user_id": user_id, "version": 1} for user_id in user_ids])
+            days, exercise_rows = [], []
+            for user_id in user_ids:
+                plan_days, plan_exercises = plan_table_rows(user_id, plan_engine.build(PLAN_DAYS, catalog, user_id), resolve)
+                days.extend(plan_days)
+                exercise_rows.extend(plan_exercises)
+            insert_plan_table_rows(db, days, exercise_rows)
+            db.commit()
+            plan_count += len(user_ids)
+        counts["workout_plans"] = plan_count
+        log(f"workout plans: {plan_count}")
+
+        started = time.perf_counter()
+        connection = db.connection()
+        if engine.dialect.name == "sqlite":
+            connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        counts["fitness_rows"] = insert_rows(
+            connection, UserFitnessData.__table__, fitness_rows(rng, fitness_row_count, users, catalog.exercises)
+        ) if users else 0
+        db.commit()
+        log(f"fitness rows: {counts['fitness_rows']} in {time.perf_counter() - started:.1f}s")
+
+    run_migrations(engine)  # İndeksler ve görünümler
+    engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--coaches", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--fitness-rows", type=int)
+    parser.add_argument("--plan-users", type=int, help="users that get a 7-day workout plan")
+    parser.add_argument("--exercises-per-region", type=int, default=10)
+    parser.add_argument("--database-url", default=SEEDED_DATABASE_URL)
+    args = parser.parse_args()
+
+    coaches, users, fitness_row_count, plan_users = SCALES[args.scale]
+    seed(
+        args.database_url,
+        args.coaches if args.coaches is not None else coaches,
+        args.users if args.users is not None else users,
+        args.fitness_rows if args.fitness_rows is not None else fitness_row_count,
+        args.plan_users if args.plan_users is not None else plan_users,
+        args.exercises_per_region,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with an optional time-to-live.
+
+    Args:
+    - maxsize (int): Maximum number of entries kept; the least recently used is evicted first.
+    - ttl (float): Seconds an entry stays valid, or None to keep it until evicted.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache:
+    """
+    Same interface as LRUCache, backed by a Redis server (or a Redis-compatible
+    local stand-in) so several API workers share entries and invalidations.
+    Values must be bytes. Requires the optional `redis` package.
+
+    Args:
+    - url (str): Connection URL, e.g. redis://localhost:6379/0.
+    - ttl (float): Seconds an entry stays valid, or None to keep it until deleted.
+    - prefix (str): Namespace prepended to every key.
+    """
+
+    def __init__(self, url: str, ttl: Optional[float] = None, prefix: str = "fitness:"):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._client.get(f"{self.prefix}{key}")
+        return default if value is None else value
+
+    def set(self, key: Hashable, value: Any):
+        px = int(self.ttl * 1000) if self.ttl is not None else None
+        self._client.set(f"{self.prefix}{key}", value, px=px)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        value = self._client.getdel(f"{self.prefix}{key}")
+        return default if value is None else value
+
+    def clear(self):
+        keys = list(self._client.scan_iter(f"{self.prefix}*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+def make_cache(url: Optional[str] = None, maxsize: int = 128, ttl: Optional[float] = None):
+    """Returns a RedisCache for redis:// URLs, otherwise an in-process LRUCache."""
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url, ttl=ttl)
+    return LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+def invalidate(cache, *keys: Hashable):
+    """Drops `keys` from `cache`; missing keys are ignored."""
+    for key in keys:
+        cache.pop(key)
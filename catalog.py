@@ -0,0 +1,181 @@
+import hashlib
+import os
+import threading
+import time
+import weakref
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from models import Exercise, ExerciseCatalogVersion
+
+# Diğer süreçlerin katalog değişiklikleri için ExerciseCatalogVersion en fazla bu sıklıkla (saniye) okunur
+CATALOG_CHECK_INTERVAL = float(os.getenv("CATALOG_CHECK_INTERVAL", "1"))
+
+
+class CatalogExercise(NamedTuple):
+    id: int
+    exercise_name: str
+    body_part: str
+    sets: int
+    reps: int
+    equipment: Optional[str]
+
+
+class CatalogSnapshot(NamedTuple):
+    """
+    One immutable load of the Exercises table, bucketed by body_part and
+    equipment. `ExerciseCatalog.get` returns the current snapshot, so a
+    caller keeps a consistent view even if the catalog reloads meanwhile.
+    """
+    exercises: Tuple[CatalogExercise, ...]
+    by_body_part: Dict[str, Tuple[CatalogExercise, ...]]
+    by_equipment: Dict[str, Tuple[CatalogExercise, ...]]
+    by_id: Dict[int, CatalogExercise]
+    by_name: Dict[Tuple[str, str], CatalogExercise]
+    digest: str  # İçerik özeti; aynı katalog her süreçte aynı değeri verir (ETag ve önbellek anahtarları)
+
+    @classmethod
+    def load(cls, rows) -> "CatalogSnapshot":
+        exercises = tuple(
+            CatalogExercise(e.id, e.exercise_name, e.body_part, e.sets, e.reps, e.equipment)
+            for e in rows
+        )
+        by_body_part: Dict[str, List[CatalogExercise]] = {}
+        by_equipment: Dict[str, List[CatalogExercise]] = {}
+        by_name: Dict[Tuple[str, str], CatalogExercise] = {}
+        for exercise in exercises:
+            by_body_part.setdefault(exercise.body_part, []).append(exercise)
+            by_equipment.setdefault(exercise.equipment or "None", []).append(exercise)
+            # Aynı isimde birden fazla hareket varsa ilki kullanılır
+            by_name.setdefault((exercise.body_part, exercise.exercise_name), exercise)
+        return cls(
+            exercises,
+            {k: tuple(v) for k, v in by_body_part.items()},
+            {k: tuple(v) for k, v in by_equipment.items()},
+            {exercise.id: exercise for exercise in exercises},
+            by_name,
+            hashlib.blake2b(repr(exercises).encode(), digest_size=6).hexdigest(),
+        )
+
+    def region(self, body_part: str) -> Tuple[CatalogExercise, ...]:
+        return self.by_body_part.get(body_part, ())
+
+    def with_equipment(self, equipment: str) -> Tuple[CatalogExercise, ...]:
+        return self.by_equipment.get(equipment, ())
+
+    def find(self, body_part: str, exercise_name: str) -> Optional[CatalogExercise]:
+        """Looks an exercise up by the (bolge, hareket_adi) pair stored in workout plans."""
+        return self.by_name.get((body_part, exercise_name))
+
+
+EMPTY_SNAPSHOT = CatalogSnapshot.load(())
+
+
+class _LoadedSnapshot(NamedTuple):
+    snapshot: CatalogSnapshot
+    version: int  # ExerciseCatalog.version at load time
+    db_version: Optional[int]  # ExerciseCatalogVersion.version at load time
+    checked_at: float
+
+
+class ExerciseCatalog:
+    """
+    Process-wide, read-only snapshot of the Exercises table.
+
+    Rows are loaded per database bind into a CatalogSnapshot, so plan
+    generation can sample from pre-built tuples instead of querying and
+    rescanning the table. ORM writes to Exercise mark their session; when
+    it commits the version is bumped through `invalidate` and the next `get`
+    reloads. A session with uncommitted Exercise changes reads its own,
+    uncached snapshot, and a rollback just drops the mark. Changes made
+    outside this process bump ExerciseCatalogVersion through a trigger,
+    which `get` reads at most every `check_interval` seconds.
+    """
+
+    def __init__(self, check_interval: float = None):
+        self.check_interval = CATALOG_CHECK_INTERVAL if check_interval is None else check_interval
+        self._lock = threading.Lock()
+        self._version = 0
+        self._loaded = weakref.WeakKeyDictionary()  # bind -> _LoadedSnapshot
+        self._snapshot = EMPTY_SNAPSHOT
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self):
+        """Marks the snapshot stale; the next `get` reloads it from the database."""
+        with self._lock:
+            self._version += 1
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        if _DIRTY in db.info:
+            return CatalogSnapshot.load(db.query(Exercise).all())
+        bind = db.get_bind()
+        loaded = self._loaded.get(bind)
+        if self._is_fresh(loaded):
+            return loaded.snapshot
+        with self._lock:
+            loaded = self._loaded.get(bind)
+            if self._is_fresh(loaded):
+                return loaded.snapshot
+            # Sürümler yüklemeden önce okunur: yükleme sırasında gelen bir değişiklik sonraki kontrolde yeniden yükletir
+            version = self._version
+            db_version = db.scalar(select(ExerciseCatalogVersion.version).limit(1))
+            if loaded is not None and (loaded.version, loaded.db_version) == (version, db_version):
+                snapshot = loaded.snapshot
+            else:
+                snapshot = CatalogSnapshot.load(db.query(Exercise).all())
+            self._loaded[bind] = _LoadedSnapshot(snapshot, version, db_version, time.monotonic())
+            self._snapshot = snapshot
+        return snapshot
+
+    def _is_fresh(self, loaded: Optional[_LoadedSnapshot]) -> bool:
+        return (
+            loaded is not None and loaded.version == self._version
+            and time.monotonic() - loaded.checked_at < self.check_interval
+        )
+
+    # Son yüklenen anlık görüntüye kısayollar
+    @property
+    def exercises(self) -> Tuple[CatalogExercise, ...]:
+        return self._snapshot.exercises
+
+    @property
+    def by_id(self) -> Dict[int, CatalogExercise]:
+        return self._snapshot.by_id
+
+    def region(self, body_part: str) -> Tuple[CatalogExercise, ...]:
+        return self._snapshot.region(body_part)
+
+    def with_equipment(self, equipment: str) -> Tuple[CatalogExercise, ...]:
+        return self._snapshot.with_equipment(equipment)
+
+    def find(self, body_part: str, exercise_name: str) -> Optional[CatalogExercise]:
+        return self._snapshot.find(body_part, exercise_name)
+
+
+exercise_catalog = ExerciseCatalog()
+
+_DIRTY = "exercise_catalog_dirty"
+
+
+@event.listens_for(Exercise, "after_insert")
+@event.listens_for(Exercise, "after_update")
+@event.listens_for(Exercise, "after_delete")
+def _mark_exercise_catalog_dirty(mapper, connection, target):
+    # Flush anında başka oturumlar değişikliği henüz göremez; sürüm commit'te artırılır
+    session = object_session(target)
+    if session is not None:
+        session.info[_DIRTY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_exercise_catalog(session):
+    if session.info.pop(_DIRTY, False):
+        exercise_catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_exercise_catalog_changes(session):
+    session.info.pop(_DIRTY, None)
@@ -0,0 +1,107 @@
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Üretimde DATABASE_URL ile Postgres'e yönlendirilebilir (ör. postgresql+psycopg://...)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./fitness.db")
+
+# SQLITE_TUNING=0 eski davranışa döner: pragma yok, SQLAlchemy'nin varsayılan havuzu
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") != "0"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # Okuyucular yazıcıyı beklemez
+    "synchronous": "NORMAL",  # WAL ile güvenli; her commit'te fsync yapmaz
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # Negatif değer KiB cinsinden (64 MiB)
+}
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _engine_options(url: str) -> dict:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_pre_ping": True,
+        }
+    if not SQLITE_TUNING:
+        return {}
+    if parsed.database in (None, "", ":memory:"):
+        # Bellekteki veritabanı tek bağlantıda yaşar
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    return {
+        "connect_args": {"check_same_thread": False},
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+
+def _tune(engine: Engine) -> Engine:
+    if engine.dialect.name == "sqlite" and SQLITE_TUNING:
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+def create_db_engine(url: str = DATABASE_URL, **overrides) -> Engine:
+    """
+    Creates the synchronous engine for `url` with the pool/pragma profile of its backend.
+
+    SQLite files get WAL journaling, synchronous=NORMAL, a busy timeout and
+    larger mmap/page caches on every new connection, plus a sized QueuePool;
+    other backends get a sized, pre-pinged pool. Keyword arguments override
+    the computed create_engine options.
+    """
+    return _tune(create_engine(url, **{**_engine_options(url), **overrides}))
+
+
+def async_url(url: str) -> str:
+    """Maps a sync database URL to the matching asyncio driver."""
+    parsed = make_url(url)
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+    return parsed.set(drivername=drivers.get(parsed.get_backend_name(), parsed.drivername)).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str = None, **overrides):
+    """Async counterpart of `create_db_engine`, defaulting to ASYNC_DATABASE_URL or the async form of DATABASE_URL."""
+    url = url or os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+    engine = create_async_engine(url, **{**_engine_options(url), **overrides})
+    _tune(engine.sync_engine)
+    return engine
+
+
+engine = create_db_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Read endpoints use the async engine so they run on the event loop instead of the threadpool
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+# Dependency
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
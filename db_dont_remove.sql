@@ -29,6 +29,7 @@ CREATE TABLE IF NOT EXISTS WorkoutPlans (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER,
     workout_data TEXT,
+    version INTEGER NOT NULL DEFAULT 1,
     FOREIGN KEY (user_id) REFERENCES Users(id)
 );
 
@@ -41,6 +42,7 @@ CREATE TABLE IF NOT EXISTS UserFitnessData (
     weight REAL,
     sets INTEGER,
     reps INTEGER,
+    idempotency_key TEXT,
     FOREIGN KEY (user_id) REFERENCES Users(id)
 );
 
@@ -54,4 +56,75 @@ CREATE TABLE IF NOT EXISTS Exercises (
     equipment TEXT
 );
 
+-- Creating the WorkoutPlanDays table
+CREATE TABLE IF NOT EXISTS WorkoutPlanDays (
+    plan_id INTEGER NOT NULL,
+    day_number INTEGER NOT NULL,
+    message TEXT,
+    PRIMARY KEY (plan_id, day_number),
+    FOREIGN KEY (plan_id) REFERENCES WorkoutPlans(id)
+);
+
+-- Creating the WorkoutPlanExercises table
+CREATE TABLE IF NOT EXISTS WorkoutPlanExercises (
+    plan_id INTEGER NOT NULL,
+    day_number INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    exercise_id INTEGER NOT NULL,
+    sets INTEGER,
+    reps INTEGER,
+    PRIMARY KEY (plan_id, day_number, position),
+    FOREIGN KEY (plan_id, day_number) REFERENCES WorkoutPlanDays(plan_id, day_number),
+    FOREIGN KEY (exercise_id) REFERENCES Exercises(id)
+);
+
+-- Creating the WorkoutPlanHistory table
+CREATE TABLE IF NOT EXISTS WorkoutPlanHistory (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    plan_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    workout_data TEXT,
+    created_at DATETIME,
+    FOREIGN KEY (plan_id) REFERENCES WorkoutPlans(id)
+);
+
+-- Creating the Jobs table (background job queue, see job_queue.py)
+CREATE TABLE IF NOT EXISTS Jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    available_at DATETIME,
+    locked_until DATETIME,
+    result BLOB,
+    media_type TEXT,
+    error TEXT,
+    created_at DATETIME,
+    updated_at DATETIME
+);
+
+-- Creating the StudentSummaries table (per-student dashboard numbers, kept up to date by student_summary.py)
+CREATE TABLE IF NOT EXISTS StudentSummaries (
+    user_id INTEGER PRIMARY KEY,
+    plan_id INTEGER,
+    plan_version INTEGER,
+    plan_days INTEGER,
+    last_workout_date DATE,
+    week_start DATE,
+    week_volume FLOAT,
+    week_sets INTEGER,
+    updated_at DATETIME,
+    FOREIGN KEY (user_id) REFERENCES Users(id)
+);
 
+-- Indexes for the lookups done by the API (also created on startup by migrations.py)
+CREATE INDEX IF NOT EXISTS ix_Coaches_name ON Coaches (name);
+CREATE INDEX IF NOT EXISTS ix_Users_name ON Users (name);
+CREATE INDEX IF NOT EXISTS ix_Users_coach_id ON Users (coach_id);
+CREATE INDEX IF NOT EXISTS ix_WorkoutPlans_user_id ON WorkoutPlans (user_id);
+CREATE INDEX IF NOT EXISTS ix_UserFitnessData_user_exercise_date ON UserFitnessData (user_id, exercise_name, date);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_UserFitnessData_user_idempotency_key ON UserFitnessData (user_id, idempotency_key);
+CREATE INDEX IF NOT EXISTS ix_WorkoutPlanHistory_plan_version ON WorkoutPlanHistory (plan_id, version);
+CREATE INDEX IF NOT EXISTS ix_Jobs_status_available_at ON Jobs (status, available_at);
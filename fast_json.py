@@ -0,0 +1,48 @@
+"""
+Opt-in fast path for list endpoints: columns are selected with Core and the
+row tuples are encoded with orjson, without building ORM objects or
+validating every row through the response model.
+
+Enabled with FAST_JSON_LISTS=1. The wire format matches the Pydantic path:
+fields come in model field order, and every column is cast in SQL to the
+field's type, so legacy values (e.g. numeric text) come out the same way the
+model would coerce them.
+"""
+import os
+from datetime import date
+from operator import attrgetter
+from typing import Iterable, List, Sequence, Type
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import Float, Integer, String, cast
+
+FAST_JSON_LISTS = os.getenv("FAST_JSON_LISTS", "0") == "1"
+
+_SQL_TYPES = {int: Integer, float: Float, str: String}
+
+
+def response_columns(model: Type[BaseModel], entity) -> List:
+    """The columns of `entity` named like the fields of `model`, in field order and cast to the field types."""
+    columns = []
+    for name, field in model.model_fields.items():
+        column = getattr(entity, name)
+        # Date sütunları olduğu gibi: SQLite'ta CAST(... AS DATE) sayıya çevirir
+        if field.annotation is not date:
+            column = cast(column, _SQL_TYPES[field.annotation])
+        columns.append(column.label(name))
+    return columns
+
+
+def rows_to_json(names: Sequence[str], rows: Iterable) -> bytes:
+    """Encodes rows (Core rows or any objects with these attributes) as a JSON array of objects."""
+    values = attrgetter(*names)
+    return orjson.dumps([dict(zip(names, values(row))) for row in rows])
+
+
+class ORJSONRowsResponse(Response):
+    """A JSON array response rendered by rows_to_json."""
+    media_type = "application/json"
+
+    def __init__(self, names: Sequence[str], rows: Iterable, **kwargs):
+        super().__init__(content=rows_to_json(names, rows), **kwargs)
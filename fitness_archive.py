@@ -0,0 +1,198 @@
+"""
+Cold archive of old UserFitnessData rows in per-user Arrow IPC files.
+
+    python fitness_archive.py [--months 6] [--user-id 1 ...]
+
+Rows dated before the first day of the month FITNESS_ARCHIVE_AFTER_MONTHS
+months ago are moved out of the database into
+FITNESS_ARCHIVE_DIR/<user_id % 1000>/user_<user_id>.arrow, sorted by
+(exercise_name, date, id), and deleted from UserFitnessData. The files are
+uncompressed so readers memory-map them and only touch the pages of the
+columns and rows they filter; history and analytics merge them with the live
+rows (see fitness_store.exercise_history and analytics.exercise_progress).
+Writing the archive requires pyarrow; reading it only when a user has a file.
+"""
+import argparse
+import logging
+import os
+from datetime import date
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from models import UserFitnessData
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv("FITNESS_ARCHIVE_DIR", "fitness_archive")
+# Veritabanında kalan ay sayısı (personalization.HISTORY_DAYS'ten uzun olmalı)
+ARCHIVE_AFTER_MONTHS = int(os.getenv("FITNESS_ARCHIVE_AFTER_MONTHS", "6"))
+
+COLUMNS = ("id", "date", "exercise_name", "weight", "sets", "reps", "idempotency_key")
+DELETE_CHUNK = 900  # SQLite parametre sınırının altında
+
+
+class ArchivedRow(NamedTuple):
+    """An archived UserFitnessData row; has the attributes the API reads from the ORM rows."""
+    id: int
+    date: date
+    exercise_name: str
+    weight: Optional[float]
+    sets: Optional[int]
+    reps: Optional[str]
+    idempotency_key: Optional[str]  # None: plan yer tutucu satırı (fitness_store.logged_workout)
+
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("exercise_name", pa.string()),
+        ("weight", pa.float64()),
+        ("sets", pa.int64()),
+        ("reps", pa.string()),  # Eski kayıtlarda reps metin; API'ye olduğu gibi döner
+        ("idempotency_key", pa.string()),
+    ])
+
+
+def user_path(user_id: int, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or ARCHIVE_DIR, f"{user_id % 1000:03d}", f"user_{user_id}.arrow")
+
+
+def archive_cutoff(today: date = None, months: int = None) -> date:
+    """First day of the month `months` months before `today`; older rows are archived."""
+    today = today or date.today()
+    month = today.year * 12 + today.month - 1 - (ARCHIVE_AFTER_MONTHS if months is None else months)
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def read_user_archive(user_id: int, directory: Optional[str] = None):
+    """The user's archived rows as a memory-mapped pyarrow Table, or None if there are none."""
+    path = user_path(user_id, directory)
+    if not os.path.exists(path):
+        return None
+    import pyarrow as pa
+    # Tablo sayfaları dosyadan okunur, kopyalanmaz; map tablo yaşadıkça açık kalır
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def archived_exercise_table(user_id: int, exercise_name: str, logged_only: bool = False, directory: Optional[str] = None):
+    """
+    The user's archived rows of one exercise as a pyarrow Table (still backed
+    by the memory map), or None if the user has no archive. With
+    `logged_only`, plan placeholder rows (no idempotency_key) are dropped.
+    """
+    table = read_user_archive(user_id, directory)
+    if table is None:
+        return None
+    import pyarrow.compute as pc
+
+    mask = pc.equal(table["exercise_name"], exercise_name)
+    if logged_only:
+        mask = pc.and_(mask, pc.is_valid(table["idempotency_key"]))
+    return table.filter(mask)
+
+
+def archived_exercise_rows(
+    user_id: int,
+    exercise_name: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after: Optional[Tuple[date, int]] = None,
+    directory: Optional[str] = None,
+) -> List[ArchivedRow]:
+    """Archived rows of one user and exercise in (date, id) order, with the same filters as exercise_history_query."""
+    table = archived_exercise_table(user_id, exercise_name, directory=directory)
+    if table is None:
+        return []
+    import pyarrow.compute as pc
+
+    conditions = []
+    if date_from is not None:
+        conditions.append(pc.greater_equal(table["date"], date_from))
+    if date_to is not None:
+        conditions.append(pc.less_equal(table["date"], date_to))
+    if after is not None:
+        after_date, after_id = after
+        conditions.append(pc.or_(
+            pc.greater(table["date"], after_date),
+            pc.and_(pc.equal(table["date"], after_date), pc.greater(table["id"], after_id)),
+        ))
+    if conditions:
+        mask = conditions[0]
+        for condition in conditions[1:]:
+            mask = pc.and_(mask, condition)
+        table = table.filter(mask)
+    return [ArchivedRow(*values) for values in zip(*(table[column].to_pylist() for column in COLUMNS))]
+
+
+def _write_user_archive(user_id: int, rows: List[Tuple], directory: Optional[str]):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    schema = _schema()
+    table = pa.Table.from_arrays([pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)], schema=schema)
+    existing = read_user_archive(user_id, directory)
+    if existing is not None:
+        # Yarıda kalan bir önceki arşivlemenin kopyaları (dosyaya yazılmış ama silinmemiş satırlar) atılır
+        existing = existing.filter(pc.invert(pc.is_in(existing["id"], value_set=table["id"])))
+        table = pa.concat_tables([existing, table])
+    table = table.sort_by([("exercise_name", "ascending"), ("date", "ascending"), ("id", "ascending")])
+
+    path = user_path(user_id, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with pa.OSFile(path + ".tmp", "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        writer.write_table(table)
+    os.replace(path + ".tmp", path)
+
+
+def archive_fitness_data(
+    db: Session, before: date, user_ids: Optional[Iterable[int]] = None, directory: Optional[str] = None
+) -> int:
+    """
+    Moves the rows dated before `before` to the users' archive files, one
+    user per transaction; returns the number of rows moved.
+
+    A user's file is replaced before their rows are deleted, so a crash in
+    between leaves rows in both places: history reads skip such duplicates
+    and the next run drops them from the file. Archived rows no longer take
+    part in idempotency-key deduplication of POST /user_fitness_data/log.
+    """
+    candidates = select(UserFitnessData.user_id).where(UserFitnessData.date < before, UserFitnessData.user_id.is_not(None))
+    if user_ids is not None:
+        candidates = candidates.where(UserFitnessData.user_id.in_(list(user_ids)))
+    archived = 0
+    for user_id in db.scalars(candidates.distinct().order_by(UserFitnessData.user_id)).all():
+        rows = db.execute(
+            select(*(getattr(UserFitnessData, column) for column in COLUMNS))
+            .where(UserFitnessData.user_id == user_id, UserFitnessData.date < before)
+        ).all()
+        _write_user_archive(
+            user_id, [(*row[:5], None if row.reps is None else str(row.reps), row.idempotency_key) for row in rows], directory
+        )
+        ids = [row.id for row in rows]
+        for start in range(0, len(ids), DELETE_CHUNK):
+            db.execute(delete(UserFitnessData).where(UserFitnessData.id.in_(ids[start:start + DELETE_CHUNK])))
+        db.commit()
+        archived += len(rows)
+        logger.info("Archived %s fitness rows of user %s", len(rows), user_id)
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS, help="months kept in the database")
+    parser.add_argument("--user-id", type=int, action="append", help="only archive this user (repeatable)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from database import SessionLocal
+
+    before = archive_cutoff(months=args.months)
+    with SessionLocal() as db:
+        archived = archive_fitness_data(db, before, args.user_id)
+    print(f"Archived {archived} rows dated before {before} to {ARCHIVE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
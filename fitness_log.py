@@ -0,0 +1,229 @@
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError, TimeoutError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker
+from database import SessionLocal
+from models import UserFitnessData
+from student_summary import record_workouts, workout_totals
+
+logger = logging.getLogger(__name__)
+
+# Bekleyen satır sayısı bu eşiğe ulaşınca ya da FITNESS_FLUSH_INTERVAL saniyede bir yazılır
+FITNESS_BUFFER_SIZE = int(os.getenv("FITNESS_BUFFER_SIZE", "5000"))
+FITNESS_FLUSH_INTERVAL = float(os.getenv("FITNESS_FLUSH_INTERVAL", "0.5"))
+# Yazılamayan satırlar birikirse yeni kayıtlar reddedilir (503)
+FITNESS_BUFFER_MAX = int(os.getenv("FITNESS_BUFFER_MAX", "200000"))
+# Kalıcı hatayla (bütünlük, veri) yazılamayan son satırlar incelemek için bellekte tutulur
+FITNESS_DEAD_LETTER_MAX = int(os.getenv("FITNESS_DEAD_LETTER_MAX", "1000"))
+
+
+_table = UserFitnessData.__table__
+SUMMARY_COLUMNS = (_table.c.user_id, _table.c.date, _table.c.weight, _table.c.sets, _table.c.reps)
+
+
+class BufferFull(Exception):
+    pass
+
+
+def is_transient(error: Exception) -> bool:
+    """Errors a later retry can fix (lost connection, locked database, pool timeout) rather than bad rows."""
+    return isinstance(error, (OperationalError, InterfaceError, DisconnectionError, TimeoutError))
+
+
+def insert_ignoring_duplicates(db: Session):
+    """INSERT that skips rows whose (user_id, idempotency_key) already exists."""
+    table = UserFitnessData.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    return insert(table)
+
+
+class FitnessLogBuffer:
+    """
+    Coalesces logged sets from many requests into one executemany per flush.
+
+    Rows are flushed by a background thread once FITNESS_BUFFER_SIZE rows are
+    pending or every FITNESS_FLUSH_INTERVAL seconds, in a single transaction.
+    Retries are deduplicated on (user_id, idempotency_key): in the buffer
+    when the earlier copy is still pending, otherwise by the unique index.
+    The same transaction folds the inserted rows into StudentSummaries.
+    A flush that fails with a transient error puts its rows back and is
+    retried on the next tick; any other error splits the batch until the
+    offending rows are isolated, and those are dropped into `dead_letters`.
+    Rows still pending when the process exits are flushed by an atexit hook.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        size: int = FITNESS_BUFFER_SIZE,
+        interval: float = FITNESS_FLUSH_INTERVAL,
+        max_pending: int = FITNESS_BUFFER_MAX,
+    ):
+        self.session_factory = session_factory
+        self.size = size
+        self.interval = interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Flush'lar sırayla çalışır
+        self._rows: List[Dict] = []
+        self._in_flight = 0  # Yazılmakta olan satırlar; başarısız olursa geri konacakları için sınıra dahil
+        self._keys = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.dead_letters: Deque[Tuple[Dict, str]] = deque(maxlen=FITNESS_DEAD_LETTER_MAX)
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.flush_seconds_total = 0.0
+
+    def add(self, rows: Iterable[Dict]) -> Tuple[int, int]:
+        """Queues rows for the next flush; returns (accepted, duplicates). Raises BufferFull."""
+        accepted, duplicates = [], 0
+        with self._lock:
+            for row in rows:
+                key = row.get("idempotency_key")
+                if key is None:
+                    # Anahtarsız kayıtlar da anahtar alır; anahtar satırı gerçek antrenman olarak işaretler (fitness_store.logged_workout)
+                    row = {**row, "idempotency_key": f"auto-{uuid.uuid4().hex}"}
+                elif (row["user_id"], key) in self._keys:
+                    duplicates += 1
+                    continue
+                else:
+                    self._keys.add((row["user_id"], key))
+                accepted.append(row)
+            if len(self._rows) + self._in_flight + len(accepted) > self.max_pending:
+                self._forget(accepted)
+                raise BufferFull(f"{len(self._rows)} rows are waiting to be written")
+            self._rows.extend(accepted)
+            self.duplicates += duplicates
+            pending = len(self._rows)
+        self.start()
+        if pending >= self.size:
+            self._wake.set()
+        return len(accepted), duplicates
+
+    def _forget(self, rows: List[Dict]):
+        for row in rows:
+            if row.get("idempotency_key") is not None:
+                self._keys.discard((row["user_id"], row["idempotency_key"]))
+
+    def pending(self) -> int:
+        return len(self._rows)
+
+    def flush(self) -> int:
+        """Writes the pending rows, in one transaction unless some fail; returns the rows inserted."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                self._in_flight = len(rows)
+            if not rows:
+                return 0
+            start = time.perf_counter()
+            written, inserted, rejected = [], 0, []
+            batches = [rows]
+            try:
+                while batches:
+                    batch = batches.pop()
+                    try:
+                        inserted += self._write(batch)
+                        written.extend(batch)
+                    except Exception as e:
+                        if is_transient(e):
+                            raise
+                        if len(batch) == 1:
+                            logger.warning("Dropping fitness row %s: %s", batch[0], e)
+                            rejected.append((batch[0], repr(e)))
+                        else:
+                            # Hatalı satırları bulmak için parti ikiye bölünür; sıra korunur
+                            middle = len(batch) // 2
+                            batches += [batch[middle:], batch[:middle]]
+            except Exception:
+                # Yazılmamış satırlar geri konur, sonraki turda tekrar denenir
+                unwritten = batch + [row for pending in reversed(batches) for row in pending]
+                with self._lock:
+                    self._rows[:0] = unwritten
+                    self._in_flight = 0
+                    self.failed_flushes += 1
+                self._finish(written, inserted, rejected)
+                raise
+            self._finish(written, inserted, rejected)
+            with self._lock:
+                self.flushes += 1
+                self.flush_seconds_total += time.perf_counter() - start
+            return inserted
+
+    def _write(self, rows: List[Dict]) -> int:
+        with self.session_factory() as db:
+            # RETURNING sadece gerçekten eklenen satırları verir; özetlere tekrarlar sayılmaz
+            inserted_rows = db.execute(insert_ignoring_duplicates(db).returning(*SUMMARY_COLUMNS), rows).mappings().all()
+            record_workouts(db, workout_totals(inserted_rows))
+            db.commit()
+        return len(inserted_rows)
+
+    def _finish(self, written: List[Dict], inserted: int, rejected: List[Tuple[Dict, str]]):
+        with self._lock:
+            # Reddedilen satırların anahtarları da bırakılır; istemci düzeltip tekrar gönderebilir
+            self._forget(written + [row for row, _ in rejected])
+            self.rows_written += inserted
+            self.duplicates += len(written) - inserted
+            self.rows_rejected += len(rejected)
+            self.dead_letters.extend(rejected)
+            self._in_flight = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="fitness-log-flush", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Stops the flush thread and writes what is left."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join()
+        self.flush()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing %s fitness rows failed; retrying", self.pending())
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "pending": len(self._rows),
+                "rows_written": self.rows_written,
+                "rows_rejected": self.rows_rejected,
+                "duplicates": self.duplicates,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "flush_latency_avg_ms": self.flush_seconds_total / self.flushes * 1000 if self.flushes else 0.0,
+            }
+
+
+fitness_log = FitnessLogBuffer()
+atexit.register(fitness_log.close)
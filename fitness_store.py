@@ -0,0 +1,133 @@
+import base64
+import heapq
+from itertools import islice
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import insert, tuple_
+from sqlalchemy.orm import Query, Session
+from models import UserFitnessData
+from fitness_archive import archived_exercise_rows
+
+# Gerçek antrenman kayıtları: POST /user_fitness_data/log her satıra bir anahtar verir.
+# Plan üretiminin yazdığı yer tutucu satırların (fitness_data_rows) anahtarı yoktur.
+logged_workout = UserFitnessData.idempotency_key.is_not(None)
+
+
+def fitness_data_rows(user_id: int, workout_plan: Dict[str, List[Dict]], day: date = None) -> List[Dict]:
+    """
+    Converts a generated workout plan to UserFitnessData row dicts.
+
+    Args:
+    - user_id (int): Owner of the rows.
+    - workout_plan (dict): The workout plan dictionary, with days as keys and plans as values.
+    - day (date): Date stamped on every row, defaults to today.
+    """
+    day = day or date.today()
+    return [
+        {
+            "user_id": user_id,
+            "date": day,
+            "exercise_name": exercise.get("hareket_adi", "Unknown"),
+            "weight": 0,  # Başlangıçta ağırlık verisi yoksa 0 olarak kaydedebiliriz
+            "sets": exercise.get("set_sayisi", 0),
+            "reps": exercise.get("tekrar_sayisi", 0)
+        }
+        for exercises in workout_plan.values()
+        for exercise in exercises
+    ]
+
+
+def bulk_insert_fitness_data(db: Session, rows: Iterable[Dict]) -> int:
+    """
+    Inserts UserFitnessData rows with a single Core executemany.
+
+    Rows bypass the ORM unit of work (no identity map entries, no per-object
+    flush), so the caller's session only sees them after it commits.
+    Returns the number of rows written.
+    """
+    rows = list(rows)
+    if rows:
+        db.execute(insert(UserFitnessData.__table__), rows)
+    return len(rows)
+
+
+def encode_cursor(row: UserFitnessData) -> str:
+    """Returns an opaque keyset cursor pointing just after `row` in (date, id) order."""
+    return base64.urlsafe_b64encode(f"{row.date.isoformat()}:{row.id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """Inverse of `encode_cursor`; raises ValueError for malformed cursors."""
+    try:
+        day, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return date.fromisoformat(day), int(row_id)
+    except (UnicodeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def exercise_history_query(
+    db: Session,
+    user_id: int,
+    exercise_name: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after: Optional[Tuple[date, int]] = None,
+    columns: Optional[Sequence] = None,
+) -> Query:
+    """
+    Builds the (date, id) ordered history query for one user and exercise.
+
+    Served by the (user_id, exercise_name, date) index; the implicit rowid at
+    the end of that index keeps the id tiebreak and the keyset seek indexed.
+
+    Args:
+    - date_from / date_to (date): Inclusive date bounds.
+    - after (tuple): (date, id) of the last row already returned, from `decode_cursor`.
+    - columns (list): Columns to select instead of UserFitnessData objects; must include date and id.
+    """
+    query = db.query(*(columns or (UserFitnessData,))).filter(
+        UserFitnessData.user_id == user_id,
+        UserFitnessData.exercise_name == exercise_name
+    )
+    if date_from is not None:
+        query = query.filter(UserFitnessData.date >= date_from)
+    if date_to is not None:
+        query = query.filter(UserFitnessData.date <= date_to)
+    if after is not None:
+        query = query.filter(tuple_(UserFitnessData.date, UserFitnessData.id) > tuple_(*after))
+    return query.order_by(UserFitnessData.date, UserFitnessData.id)
+
+
+def exercise_history(
+    db: Session,
+    user_id: int,
+    exercise_name: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after: Optional[Tuple[date, int]] = None,
+    limit: Optional[int] = None,
+    columns: Optional[Sequence] = None,
+) -> Iterator:
+    """
+    The (date, id) ordered history of `exercise_history_query` merged with the
+    user's archived rows (see fitness_archive). Live rows are streamed from
+    the database; at most `limit` rows are produced.
+    """
+    query = exercise_history_query(db, user_id, exercise_name, date_from, date_to, after, columns)
+    if limit is not None:
+        query = query.limit(limit)
+    live = query.yield_per(500)
+    archived = archived_exercise_rows(user_id, exercise_name, date_from, date_to, after)
+    if not archived:
+        return iter(live)
+    rows = _skip_duplicates(heapq.merge(archived[:limit], live, key=lambda row: (row.date, row.id)))
+    return islice(rows, limit)
+
+
+def _skip_duplicates(rows):
+    # Yarıda kalan arşivlemeden sonra aynı satır hem arşivde hem veritabanında olabilir
+    last = None
+    for row in rows:
+        if (row.date, row.id) != last:
+            yield row
+        last = (row.date, row.id)
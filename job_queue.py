@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+from database import SessionLocal
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+# Web sürecindeki worker thread sayısı; 0 ise işler sadece `python worker.py` ile çalışır
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "1"))  # Saniye; her denemede iki katına çıkar
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+# Bitmiş (done/failed) işler sonuçlarıyla birlikte bu kadar saniye sonra silinir; 0 ise hiç silinmez
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "86400"))
+JOB_PURGE_INTERVAL = float(os.getenv("JOB_PURGE_INTERVAL", "60"))
+
+jobs = Job.__table__
+
+# kind -> handler(db, payload) -> (result bytes, media type)
+handlers: Dict[str, Callable[[Session, Dict], Tuple[bytes, str]]] = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for failures that retrying cannot fix (e.g. unknown user)."""
+
+
+def job_handler(kind: str):
+    def register(func):
+        handlers[kind] = func
+        return func
+    return register
+
+
+def submit(db: Session, kind: str, payload: Dict, max_attempts: int = None) -> int:
+    """Queues a job and returns its id; the caller's session is committed."""
+    now = datetime.utcnow()
+    job_id = db.execute(insert(jobs).returning(jobs.c.id), {
+        "kind": kind,
+        "payload": json.dumps(payload),
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts or JOB_MAX_ATTEMPTS,
+        "available_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }).scalar_one()
+    db.commit()
+    workers.notify()
+    return job_id
+
+
+def _claimable(now):
+    # Bekleyen ve zamanı gelmiş işler, ya da kirası dolmuş (worker'ı ölmüş) çalışan işler
+    return or_(
+        and_(jobs.c.status == "queued", jobs.c.available_at <= now),
+        and_(jobs.c.status == "running", jobs.c.locked_until < now),
+    )
+
+
+def claim(db: Session):
+    """
+    Atomically marks the oldest claimable job as running and returns it, or None.
+
+    The candidate is re-checked in the UPDATE itself, so two workers racing
+    for the same row cannot both claim it.
+    """
+    now = datetime.utcnow()
+    candidate = select(jobs.c.id).where(_claimable(now)).order_by(jobs.c.id).limit(1).scalar_subquery()
+    job = db.execute(
+        update(jobs)
+        .where(jobs.c.id == candidate, _claimable(now))
+        .values(
+            status="running",
+            attempts=jobs.c.attempts + 1,
+            locked_until=now + timedelta(seconds=JOB_LEASE_SECONDS),
+            updated_at=now,
+        )
+        .returning(jobs.c.id, jobs.c.kind, jobs.c.payload, jobs.c.attempts, jobs.c.max_attempts)
+    ).first()
+    db.commit()
+    return job
+
+
+def _finish(db: Session, job_id: int, **values):
+    db.execute(update(jobs).where(jobs.c.id == job_id).values(locked_until=None, updated_at=datetime.utcnow(), **values))
+    db.commit()
+
+
+def run_job(db: Session, job):
+    """Runs a claimed job and records its result, a retry or the final failure."""
+    try:
+        handler = handlers.get(job.kind)
+        if handler is None:
+            raise PermanentJobError(f"Unknown job kind: {job.kind}")
+        result, media_type = handler(db, json.loads(job.payload or "{}"))
+    except PermanentJobError as e:
+        db.rollback()
+        _finish(db, job.id, status="failed", error=str(e))
+    except Exception as e:
+        db.rollback()
+        logger.exception("Job %s (%s) failed on attempt %s", job.id, job.kind, job.attempts)
+        if job.attempts >= job.max_attempts:
+            _finish(db, job.id, status="failed", error=repr(e))
+        else:
+            delay = JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            _finish(db, job.id, status="queued", error=repr(e),
+                    available_at=datetime.utcnow() + timedelta(seconds=delay))
+    else:
+        _finish(db, job.id, status="done", result=result, media_type=media_type, error=None)
+
+
+def get_job(db: Session, job_id: int) -> Optional[Job]:
+    return db.get(Job, job_id)
+
+
+def purge_finished_jobs(db: Session, ttl: float = None) -> int:
+    """Deletes done and failed jobs not updated for `ttl` seconds (JOB_RESULT_TTL); returns how many."""
+    ttl = JOB_RESULT_TTL if ttl is None else ttl
+    if ttl <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    deleted = db.execute(delete(jobs).where(jobs.c.status.in_(("done", "failed")), jobs.c.updated_at < cutoff)).rowcount
+    db.commit()
+    return deleted
+
+
+class JobWorkers:
+    """
+    Worker threads that poll the Jobs table. Several processes (see worker.py)
+    can consume the same queue since jobs are claimed in the database.
+    """
+
+    def __init__(self, count: int = JOB_WORKERS, session_factory: sessionmaker = SessionLocal):
+        self.count = count
+        self.session_factory = session_factory
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._purged_at = None
+
+    def notify(self):
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        """Starts the threads once; safe to call repeatedly."""
+        with self._lock:
+            if self._threads or self.count <= 0:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.count)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        self._stop.set()
+        self._wake.set()
+        for thread in threads:
+            thread.join()
+
+    def run_once(self) -> bool:
+        """Claims and runs one job; returns False if there was nothing to do."""
+        with self.session_factory() as db:
+            job = claim(db)
+            if job is None:
+                return False
+            run_job(db, job)
+            return True
+
+    def purge_if_due(self) -> int:
+        """Runs purge_finished_jobs at most every JOB_PURGE_INTERVAL seconds across this pool's threads."""
+        now = time.monotonic()
+        with self._lock:
+            if self._purged_at is not None and now - self._purged_at < JOB_PURGE_INTERVAL:
+                return 0
+            self._purged_at = now
+        with self.session_factory() as db:
+            return purge_finished_jobs(db)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+                self.purge_if_due()  # Kuyruk boşken eski sonuçlar temizlenir
+            except Exception:
+                logger.exception("Job worker error")
+            self._wake.wait(JOB_POLL_INTERVAL)
+            self._wake.clear()
+
+
+workers = JobWorkers()
@@ -1,7 +1,9 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, Header
+from fastapi.exceptions import RequestValidationError
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import (
-    Base, 
     User, 
     WorkoutPlan, 
     UserFitnessData, 
@@ -13,63 +15,207 @@ from models import (
     StudentResponse, 
     UserResponse,
     CoachResponse,
-    CoachSelectionRequest)
-from algorithms import generate_workout_plan
+    CoachSelectionRequest,
+    BatchWorkoutPlanRequest,
+    UserWorkoutPlanResponse,
+    ExerciseAnalyticsResponse,
+    WorkoutPlanExerciseUpdate,
+    WorkoutPlanHistoryResponse,
+    JobResponse,
+    FitnessLogEntry,
+    FitnessLogResponse,
+    CoachDashboardEntry,
+    credentials_view)
+from algorithms import generate_workout_plan, build_workout_plans, rebuild_changed_days
+from personalization import history_counts, load_profiles, profile_from_user
+from plan_pool import plan_pool
+from catalog import exercise_catalog
+from analytics import exercise_progress
+from fitness_store import (
+    fitness_data_rows,
+    bulk_insert_fitness_data,
+    exercise_history,
+    encode_cursor,
+    decode_cursor)
+from plan_store import (
+    day_key,
+    replace_workout_plans,
+    replace_workout_plan_days,
+    load_plan_structure,
+    load_plan_history,
+    plan_versions,
+    load_workout_plans,
+    load_workout_plan_day,
+    update_workout_plan_exercise)
 from pydantic import BaseModel
 from datetime import date
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from typing import List
+from sqlalchemy import select, update
+from typing import List, Literal, Optional
 from datetime import datetime
-from algorithms import save_workout_plan_to_excel
-from fastapi.responses import FileResponse
+from algorithms import (
+    save_workout_plan_to_excel,
+    save_roster_workout_plans_to_excel,
+    save_roster_workout_plans_to_zip,
+    save_roster_workout_plans_to_parquet,
+    iter_roster_workout_plans_csv)
+from cache import LRUCache, make_cache, invalidate
+from startup import StartupMiddleware, lifespan
+from fast_json import FAST_JSON_LISTS, ORJSONRowsResponse, response_columns, rows_to_json
+from auth import verify_password, hash_password, needs_rehash, dummy_password_hash, sessions
+from database import engine, async_engine, SessionLocal, get_db, get_async_db
+from metrics import MetricsMiddleware, instrument_engine, render as render_metrics
+from job_queue import PermanentJobError, job_handler, submit, get_job
+from fitness_log import BufferFull, fitness_log
+from student_summary import coach_dashboard_query, dashboard_entry
+from fastapi.responses import StreamingResponse, JSONResponse
+from pydantic import TypeAdapter, ValidationError
+from io import BytesIO
 import os, json
 
 
-app = FastAPI()
+# Tablo oluşturma, migration'lar ve katalog ısıtması import yerine açılışta (startup.py)
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(StartupMiddleware)
 
-DATABASE_URL = "sqlite:///./fitness.db"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# İstek başına gecikme ve SQL sayısı/süresi; /metrics ile Prometheus formatında okunur
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
 
-Base.metadata.create_all(bind=engine)
+XLSX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+EXPORT_CHUNK_SIZE = 64 * 1024
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Rendered workbooks keyed by (user_id, plan id, plan version, catalog digest); every change to a plan bumps
+# its version, and exercise names/equipment are read from the catalog when rendering
+export_cache = LRUCache(maxsize=int(os.getenv("EXPORT_CACHE_SIZE", "256")))
 
-def remove_file(filename: str):
-    os.remove(filename)
+# Pre-serialized JSON bodies of the read endpoints, keyed by entity. Write endpoints
+# drop the affected keys after committing; the TTL bounds staleness across workers
+# when the in-process LRU is used instead of RESPONSE_CACHE_URL (redis://...).
+response_cache = make_cache(
+    os.getenv("RESPONSE_CACHE_URL"),
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+)
 
-@app.get("/export_workout_plan/{user_id}")
-def export_workout_plan(user_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def user_info_key(user_id): return f"user_info:{user_id}"
+def coach_students_key(coach_id): return f"coach_students:{coach_id}"
+def workout_plans_key(user_id, etag): return f"workout_plans:{user_id}:{etag}"  # Sürüm değişince anahtar da değişir
+COACHES_KEY = "coaches"
+
+coach_list_adapter = TypeAdapter(List[CoachResponse])
+student_list_adapter = TypeAdapter(List[StudentResponse])
+user_adapter = TypeAdapter(UserResponse)
+
+# FAST_JSON_LISTS=1: liste uçları sadece yanıt sütunlarını Core ile seçip orjson ile yazar (fast_json.py)
+coach_fields, coach_columns = list(CoachResponse.model_fields), response_columns(CoachResponse, Coach)
+student_fields, student_columns = list(StudentResponse.model_fields), response_columns(StudentResponse, User)
+fitness_data_fields = list(UserFitnessDataResponse.model_fields)
+fitness_data_columns = response_columns(UserFitnessDataResponse, UserFitnessData) + [UserFitnessData.id]  # id: imleç ve arşiv birleştirme
+
+def to_json_bytes(adapter: TypeAdapter, value) -> bytes:
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+def json_bytes_response(content: bytes) -> Response:
+    return Response(content=content, media_type="application/json")
+
+def plan_etag(versions, catalog_digest: str) -> str:
+    # Plan yanıtları egzersiz adını ve ekipmanı katalogdan okuyor; katalog değişince ETag da değişmeli
+    return '"' + "-".join(f"{plan_id}.{version}" for plan_id, version in versions) + f'-{catalog_digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+def iter_chunks(content: bytes, chunk_size: int = EXPORT_CHUNK_SIZE):
+    for start in range(0, len(content), chunk_size):
+        yield content[start:start + chunk_size]
+
+def render_workout_plan_export(db: Session, user_id: int) -> bytes:
     # Fetch the user
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Fetch the workout plan
-    workout_plan_record = db.query(WorkoutPlan).filter(WorkoutPlan.user_id == user_id).first()
-    if not workout_plan_record:
+    # Fetch only the plan id and version first; the plan rows are loaded on a cache miss
+    plan = db.query(WorkoutPlan.id, WorkoutPlan.version).filter(WorkoutPlan.user_id == user_id).order_by(WorkoutPlan.id).first()
+    if plan is None:
         raise HTTPException(status_code=404, detail="Workout plan not found")
 
-    # Parse the workout data
-    workout_plan = json.loads(workout_plan_record.workout_data)
+    cache_key = (user_id, plan.id, plan.version, exercise_catalog.get(db).digest)
+    content = export_cache.get(cache_key)
+    if content is None:
+        workout_plan = load_workout_plans(db, [plan.id])[plan.id]
+
+        # Build the workbook in memory, no temporary file on disk
+        buffer = BytesIO()
+        save_workout_plan_to_excel(workout_plan, buffer)
+        content = buffer.getvalue()
+        export_cache.set(cache_key, content)
+    return content
 
-    # Define filename
+@app.get("/export_workout_plan/{user_id}")
+def export_workout_plan(user_id: int, db: Session = Depends(get_db)):
+    content = render_workout_plan_export(db, user_id)
     filename = f"workout_plan_user_{user_id}.xlsx"
+    return StreamingResponse(
+        iter_chunks(content),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Content-Length": str(len(content))}
+    )
+
+# format -> (writer, media type) for roster exports rendered into a buffer
+ROSTER_EXPORTS = {
+    "xlsx": (save_roster_workout_plans_to_excel, XLSX_MEDIA_TYPE),
+    "zip": (save_roster_workout_plans_to_zip, "application/zip"),
+    "parquet": (save_roster_workout_plans_to_parquet, "application/vnd.apache.parquet"),
+}
+
+ROSTER_BATCH_SIZE = 100
+
+def iter_roster_workout_plans(db: Session, coach_id: int):
+    # Planlar ROSTER_BATCH_SIZE kullanıcılık gruplar halinde, grup başına iki sorguyla okunuyor
+    rows = db.query(User.id, User.name, WorkoutPlan.id).join(
+        WorkoutPlan, WorkoutPlan.user_id == User.id
+    ).filter(User.coach_id == coach_id).order_by(User.id).all()
+    for start in range(0, len(rows), ROSTER_BATCH_SIZE):
+        batch = rows[start:start + ROSTER_BATCH_SIZE]
+        plans = load_workout_plans(db, [plan_id for _, _, plan_id in batch])
+        for user_id, name, plan_id in batch:
+            yield user_id, name, plans[plan_id]
+
+def stream_roster_workout_plans_csv(coach_id: int):
+    # The request session is closed before a streamed body is sent, so the stream uses its own
+    with SessionLocal() as db:
+        yield from iter_roster_workout_plans_csv(iter_roster_workout_plans(db, coach_id))
+
+@app.get("/coach/{coach_id}/export_workout_plans")
+def export_roster_workout_plans(coach_id: int, format: Literal["xlsx", "zip", "csv", "parquet"] = "xlsx", db: Session = Depends(get_db)):
+    coach = db.query(Coach).filter(Coach.id == coach_id).first()
+    if not coach:
+        raise HTTPException(status_code=404, detail="Coach not found")
 
-    # Save the workout plan to an Excel file
-    save_workout_plan_to_excel(workout_plan, filename)
+    filename = f"workout_plans_coach_{coach_id}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
 
-    # Ensure the file is properly deleted after being served
-    background_tasks.add_task(remove_file, filename)
+    if format == "csv":
+        return StreamingResponse(stream_roster_workout_plans_csv(coach_id), media_type="text/csv", headers=headers)
+
+    writer, media_type = ROSTER_EXPORTS[format]
+    buffer = BytesIO()
+    try:
+        writer(iter_roster_workout_plans(db, coach_id), buffer)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    content = buffer.getvalue()
 
-    return FileResponse(filename, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', filename=filename)
+    headers["Content-Length"] = str(len(content))
+    return StreamingResponse(iter_chunks(content), media_type=media_type, headers=headers)
 
 
 
@@ -89,32 +235,56 @@ BELOW IS SAME
 
 
 @app.post("/generate_workout_plan/{user_id}", response_model=List[WorkoutPlanResponse])  # response_model kullanarak cevap modelini belirtiyoruz
-def generate_workout_plan_for_user(user_id: int, user_data: UpdateUserData, db: Session = Depends(get_db)):
+def generate_workout_plan_for_user(user_id: int, user_data: UpdateUserData, incremental: bool = False, db: Session = Depends(get_db)):
     # Kullanıcıyı veritabanından alıyoruz
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Delete any existing workout plan for the user
-    existing_workout_plan = db.query(WorkoutPlan).filter(WorkoutPlan.user_id == user_id).first()
-    if existing_workout_plan:
-        db.delete(existing_workout_plan)
-        db.commit()
-    
-    print(user_data.age)
     # Kullanıcıyı veritabanında güncellenmiş verilerle güncelliyoruz
     user.age = user_data.age
     user.weight = user_data.weight
     user.height = user_data.height
     db.commit()  # Veritabanında güncelleme yapıyoruz
 
-    # Workout planını oluşturuyoruz
-    workout_plan = generate_workout_plan(user_id, user_data.days, db)  # 7 gün için plan oluşturuyoruz
+    # incremental=true: mevcut planın sadece gün sayısı veya katalogdaki değişikliklerden etkilenen günleri yeniden oluşturuluyor
+    plan_id = db.query(WorkoutPlan.id).filter(WorkoutPlan.user_id == user_id).order_by(WorkoutPlan.id).limit(1).scalar() if incremental else None
+    structure = load_plan_structure(db, plan_id) if plan_id is not None else {}
+    if structure:
+        catalog = exercise_catalog.get(db)
+        profile = profile_from_user(user, history_counts(db, [user_id]).get(user_id), user_data.equipment)
+        changed_days, removed_days = rebuild_changed_days(structure, user_data.days or max(structure), catalog, user_id, profile)
+        replace_workout_plan_days(db, plan_id, changed_days, removed_days, catalog)
+        bulk_insert_fitness_data(db, fitness_data_rows(user.id, changed_days))
+        db.commit()
+        workout_plan = load_workout_plans(db, [plan_id])[plan_id]
+    else:
+        # PLAN_POOL_SIZE ayarlıysa hazır havuzdan bir plan alınıyor (ekipman kısıtı yoksa)
+        workout_plan = None
+        if plan_pool.enabled and user_data.equipment is None and user_data.days:
+            workout_plan = plan_pool.take(user_data.days, user.goal, user.fitness_level, exercise_catalog.get(db))
+        if workout_plan is None:
+            # Workout planını oluşturuyoruz
+            workout_plan = generate_workout_plan(user_id, user_data.days, db, user_data.equipment)  # 7 gün için plan oluşturuyoruz
+
+        # Workout planındaki her egzersizi UserFitnessData tablosuna toplu olarak kaydediyoruz
+        bulk_insert_fitness_data(db, fitness_data_rows(user.id, workout_plan))
+
+        # Workout planının yeni sürümünü gün ve egzersiz satırları olarak kaydediyoruz (eskisi geçmişe alınır)
+        replace_workout_plans(db, {user.id: workout_plan}, exercise_catalog.get(db))
+        db.commit()
 
     # Workout planını dönüştürerek response modeline uygun hale getiriyoruz
-    workout_plan_response = []
-    for day, exercises in workout_plan.items():
-        day_data = {
+    workout_plan_response = to_workout_plan_response(workout_plan)
+    invalidate(response_cache, user_info_key(user_id), coach_students_key(user.coach_id))
+    
+    # Endpoint cevap olarak workout planı döndürüyor
+    return workout_plan_response
+
+
+def to_workout_plan_response(workout_plan):
+    return [
+        {
             "day": day,
             "exercises": [
                 {
@@ -127,45 +297,176 @@ def generate_workout_plan_for_user(user_id: int, user_data: UpdateUserData, db:
                 for exercise in exercises
             ]
         }
-        workout_plan_response.append(day_data)
-    
-        # Workout planındaki her egzersizi UserFitnessData tablosuna kaydediyoruz
-        for exercise in exercises:
-            new_fitness_data = UserFitnessData(
-                user_id=user.id,
-                date=datetime.today(),
-                exercise_name=exercise.get("hareket_adi", "Unknown"),
-                weight=0,  # Başlangıçta ağırlık verisi yoksa 0 olarak kaydedebiliriz
-                sets=exercise.get("tekrar_sayisi", 0),
-                reps=exercise.get("ekipman", "None")
-            )
-            db.add(new_fitness_data)
-
-    # Workout planını veritabanına kaydediyoruz
-    new_workout_plan = WorkoutPlan(user_id=user.id, workout_data=json.dumps(workout_plan))  # JSON formatında kaydediyoruz
-    db.add(new_workout_plan)
+        for day, exercises in workout_plan.items()
+    ]
+
+
+@app.post("/coach/{coach_id}/generate_workout_plans", response_model=List[UserWorkoutPlanResponse])
+def generate_workout_plans_for_coach(coach_id: int, request: BatchWorkoutPlanRequest, db: Session = Depends(get_db)):
+    coach = db.query(Coach).filter(Coach.id == coach_id).first()
+    if not coach:
+        raise HTTPException(status_code=404, detail="Coach not found")
+
+    # Koçun öğrencilerini tek sorguda alıyoruz
+    query = db.query(User.id).filter(User.coach_id == coach_id)
+    if request.user_ids is not None:
+        query = query.filter(User.id.in_(request.user_ids))
+    user_ids = [user_id for (user_id,) in query.order_by(User.id).all()]
+    if request.user_ids is not None and len(user_ids) != len(set(request.user_ids)):
+        raise HTTPException(status_code=404, detail="User not found")
+    if not user_ids:
+        return []
+
+    # Katalog ve profiller bir kez yükleniyor, tüm planlar tek bir vektörel adımda kişiselleştirilerek oluşturuluyor
+    catalog = exercise_catalog.get(db)
+    today = date.today()
+    profiles = load_profiles(db, user_ids, request.equipment)
+    built = build_workout_plans(request.days, catalog, profiles)
+    plans = {user_id: built[user_id] for user_id in user_ids}
+
+    # Planların yeni sürümleri toplu olarak tek transaction içinde yazılıyor
+    replace_workout_plans(db, plans, catalog)
+    bulk_insert_fitness_data(db, (
+        row
+        for user_id, workout_plan in plans.items()
+        for row in fitness_data_rows(user_id, workout_plan, today)
+    ))
     db.commit()
-    
-    # Endpoint cevap olarak workout planı döndürüyor
-    return workout_plan_response
+
+    return [
+        {"user_id": user_id, "workout_plan": to_workout_plan_response(workout_plan)}
+        for user_id, workout_plan in plans.items()
+    ]
 
 
 # Endpoint: Kullanıcının belirli bir egzersiziyle ilgili gelişim verilerini çekme
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def stream_exercise_data_ndjson(user_id, exercise_name, date_from, date_to, after, limit):
+    # The request session is closed before a streamed body is sent, so the stream uses its own
+    with SessionLocal() as db:
+        for row in exercise_history(db, user_id, exercise_name, date_from, date_to, after, limit):
+            yield UserFitnessDataResponse.model_validate(row).model_dump_json().encode() + b"\n"
+
 @app.get("/user_fitness_data/{user_id}/exercise/{exercise_name}", response_model=List[UserFitnessDataResponse])
-def get_user_exercise_data(user_id: int, exercise_name: str, db: Session = Depends(get_db)):
-    # Kullanıcı ve egzersiz adıyla eşleşen verileri sorguluyoruz
-    user_fitness_data = db.query(UserFitnessData).filter(
-        UserFitnessData.user_id == user_id,
-        UserFitnessData.exercise_name == exercise_name
-    ).order_by(UserFitnessData.date).all()
+def get_user_exercise_data(
+    user_id: int,
+    exercise_name: str,
+    response: Response,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    db: Session = Depends(get_db)
+):
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if format == "ndjson":
+        # Eğer veri bulunmazsa 404 hatası döndürüyoruz
+        if cursor is None and next(exercise_history(db, user_id, exercise_name, date_from, date_to, limit=1), None) is None:
+            raise HTTPException(status_code=404, detail="No data found for the given user and exercise")
+        return StreamingResponse(
+            stream_exercise_data_ndjson(user_id, exercise_name, date_from, date_to, after, limit),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+
+    # Kullanıcı ve egzersiz adıyla eşleşen veriler (date, id) sırasıyla; eski aylar arşivden okunur
+    # Bir fazla satır çekerek sonraki sayfanın olup olmadığını anlıyoruz
+    page_size = limit or DEFAULT_PAGE_SIZE
+    columns = fitness_data_columns if FAST_JSON_LISTS else None
+    user_fitness_data = list(exercise_history(db, user_id, exercise_name, date_from, date_to, after, page_size + 1, columns))
 
     # Eğer veri bulunmazsa 404 hatası döndürüyoruz
-    if not user_fitness_data:
+    if not user_fitness_data and cursor is None:
         raise HTTPException(status_code=404, detail="No data found for the given user and exercise")
 
+    if len(user_fitness_data) > page_size:
+        user_fitness_data = user_fitness_data[:page_size]
+        response.headers["X-Next-Cursor"] = encode_cursor(user_fitness_data[-1])
+
     # Kullanıcı fitness verilerini döndürüyoruz
+    if FAST_JSON_LISTS:
+        return ORJSONRowsResponse(fitness_data_fields, user_fitness_data, headers=dict(response.headers))
     return user_fitness_data
 
+@app.get("/user_fitness_data/{user_id}/exercise/{exercise_name}/analytics", response_model=ExerciseAnalyticsResponse)
+def get_user_exercise_analytics(user_id: int, exercise_name: str, db: Session = Depends(get_db)):
+    # Haftalık/aylık hacim, kişisel rekorlar ve hareketli ortalamalar SQL tarafında hesaplanıyor
+    analytics = exercise_progress(db, user_id, exercise_name)
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="No data found for the given user and exercise")
+
+    return analytics
+
+# Endpoint: Cihazlardan tamamlanan setlerin toplu kaydı (JSON dizisi veya NDJSON)
+FITNESS_LOG_MAX_BATCH = int(os.getenv("FITNESS_LOG_MAX_BATCH", "10000"))
+fitness_log_adapter = TypeAdapter(List[FitnessLogEntry])
+
+async def read_fitness_log_entries(request: Request) -> List[FitnessLogEntry]:
+    if not request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        try:
+            return fitness_log_adapter.validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError(e.errors(include_url=False))
+
+    # NDJSON gövdesi geldikçe satır satır doğrulanıyor; hatalar satır numarasıyla dönüyor
+    entries, errors = [], []
+
+    def parse(line: bytes, line_number: int):
+        try:
+            entries.append(FitnessLogEntry.model_validate_json(line))
+        except ValidationError as e:
+            errors.extend({**error, "loc": ("body", line_number, *error["loc"])} for error in e.errors(include_url=False))
+
+    pending, line_number = b"", 0
+    async for chunk in request.stream():
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            if line.strip():
+                parse(line, line_number)
+            line_number += 1
+        if len(entries) > FITNESS_LOG_MAX_BATCH:
+            return entries
+    if pending.strip():
+        parse(pending, line_number)
+    if errors:
+        raise RequestValidationError(errors)
+    return entries
+
+@app.post("/user_fitness_data/log", response_model=FitnessLogResponse, status_code=202)
+async def log_fitness_data(request: Request, wait: bool = False, db: AsyncSession = Depends(get_async_db)):
+    entries = await read_fitness_log_entries(request)
+    if len(entries) > FITNESS_LOG_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {FITNESS_LOG_MAX_BATCH} entries per request")
+
+    # Yazma arka planda yapıldığı için kullanıcılar burada tek sorguyla kontrol ediliyor
+    user_ids = {entry.user_id for entry in entries}
+    known = set((await db.scalars(select(User.id).where(User.id.in_(user_ids)))).all()) if user_ids else set()
+    if user_ids - known:
+        raise HTTPException(status_code=404, detail=f"User not found: {', '.join(map(str, sorted(user_ids - known)))}")
+
+    try:
+        accepted, duplicates = fitness_log.add(entry.model_dump() for entry in entries)
+    except BufferFull:
+        raise HTTPException(status_code=503, detail="Too many pending fitness records", headers={"Retry-After": "1"})
+    if wait:
+        # Kayıtlar yazılana kadar bekleniyor (200); aksi halde 202 ile kuyruğa alınmış olarak döner
+        await run_in_threadpool(fitness_log.flush)
+        return JSONResponse(content={"accepted": accepted, "duplicates": duplicates})
+    return {"accepted": accepted, "duplicates": duplicates}
+
+@app.get("/fitness_log/metrics")
+def get_fitness_log_metrics():
+    return fitness_log.metrics()
+
 @app.put("/update_user_data/{user_id}")
 def update_user_data(user_id: int, user_data: UpdateUserData, db: Session = Depends(get_db)):
     # Kullanıcıyı veritabanından alıyoruz
@@ -179,61 +480,256 @@ def update_user_data(user_id: int, user_data: UpdateUserData, db: Session = Depe
     user.height = user_data.height
     
     db.commit()  # Veritabanında güncelleme yapıyoruz
+    invalidate(response_cache, user_info_key(user_id), coach_students_key(user.coach_id))
     
     return {"message": "User data updated successfully"}
 
+@app.get("/metrics")
+def get_metrics():
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/plan_pool/metrics")
+def get_plan_pool_metrics():
+    return plan_pool.metrics()
+
 @app.get("/workout_plans/{user_id}")
-def get_workout_plans(user_id: int, db: Session = Depends(get_db)):
-    workout_plans = db.query(WorkoutPlan).filter(WorkoutPlan.user_id == user_id).all()
-    if not workout_plans:
+async def get_workout_plans(user_id: int, if_none_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_async_db)):
+    # Önce sadece plan sürümleri okunuyor; değişmemiş plan için gövde hiç oluşturulmuyor
+    versions = await db.run_sync(plan_versions, user_id)
+    if not versions:
         raise HTTPException(status_code=404, detail="Workout plans not found")
+    catalog = await db.run_sync(exercise_catalog.get)
+    etag = plan_etag(versions, catalog.digest)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    content = response_cache.get(workout_plans_key(user_id, etag))
+    if content is None:
+        # workout_data eski yanıtla aynı şekilde JSON metni olarak dönüyor
+        plans = await db.run_sync(load_workout_plans, [plan_id for plan_id, _ in versions])
+        content = JSONResponse([
+            {"id": plan_id, "user_id": user_id, "workout_data": json.dumps(plans[plan_id])}
+            for plan_id, _ in versions
+        ]).body
+        response_cache.set(workout_plans_key(user_id, etag), content)
     
-    return workout_plans
+    response = json_bytes_response(content)
+    response.headers["ETag"] = etag
+    return response
+
+@app.get("/workout_plans/{user_id}/days/{day_number}", response_model=WorkoutPlanResponse)
+async def get_workout_plan_day(user_id: int, day_number: int, response: Response, if_none_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_async_db)):
+    versions = await db.run_sync(plan_versions, user_id)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Workout plans not found")
+    plan_id, version = versions[0]
+    catalog = await db.run_sync(exercise_catalog.get)
+    etag = plan_etag([(plan_id, version)], catalog.digest)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    # Sadece istenen günün satırları okunuyor
+    exercises = await db.run_sync(load_workout_plan_day, plan_id, day_number)
+    if exercises is None:
+        raise HTTPException(status_code=404, detail="Day not found")
+    response.headers["ETag"] = etag
+    return to_workout_plan_response({day_key(day_number): exercises})[0]
+
+@app.get("/workout_plans/{user_id}/history", response_model=List[WorkoutPlanHistoryResponse])
+async def get_workout_plan_history(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    versions = await db.run_sync(plan_versions, user_id)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Workout plans not found")
+    return await db.run_sync(load_plan_history, versions[0][0])
+
+@app.patch("/workout_plans/{user_id}/days/{day_number}/exercises/{position}", response_model=WorkoutPlanResponse)
+def update_workout_plan_exercise_for_user(
+    user_id: int,
+    day_number: int,
+    position: int,
+    changes: WorkoutPlanExerciseUpdate,
+    db: Session = Depends(get_db)
+):
+    plan_id = db.query(WorkoutPlan.id).filter(WorkoutPlan.user_id == user_id).order_by(WorkoutPlan.id).limit(1).scalar()
+    if plan_id is None:
+        raise HTTPException(status_code=404, detail="Workout plans not found")
 
+    values = {}
+    if changes.exercise_id is not None:
+        if changes.exercise_id not in exercise_catalog.get(db).by_id:
+            raise HTTPException(status_code=404, detail="Exercise not found")
+        values["exercise_id"] = changes.exercise_id
+    if changes.set_sayisi is not None:
+        values["sets"] = changes.set_sayisi
+    if changes.tekrar_sayisi is not None:
+        values["reps"] = changes.tekrar_sayisi
+
+    # Planın geri kalanına dokunmadan tek satır güncelleniyor
+    if not update_workout_plan_exercise(db, plan_id, day_number, position, values):
+        raise HTTPException(status_code=404, detail="Exercise not found in workout plan")
+    db.commit()
 
-@app.post("/login")
-def login(credentials: LoginRequest, db: Session = Depends(get_db)):
-    # Önce Users tablosunda kontrol edelim
-    user = db.query(User).filter(User.name == credentials.name, User.password == credentials.password).first()
-    if user:
-        return {"id": user.id, "role": "user"}  # Kullanıcı bulundu
+    return to_workout_plan_response({day_key(day_number): load_workout_plan_day(db, plan_id, day_number)})[0]
 
-    # Eğer Users tablosunda bulunmazsa Coaches tablosunda arayalım
-    coach = db.query(Coach).filter(Coach.name == credentials.name, Coach.password == credentials.password).first()
-    if coach:
-        return {"id": coach.id, "role": "coach"}  # Koç bulundu
+
+ACCOUNT_TABLES = {"user": User, "coach": Coach}
+
+# Arka plan işleri: plan oluşturma ve Excel dışa aktarma kuyruğa alınır, sonucu /jobs/{job_id} ile sorgulanır
+workout_plan_list_adapter = TypeAdapter(List[WorkoutPlanResponse])
+
+def permanent_job_error(e: HTTPException) -> Exception:
+    # 4xx hataları tekrar denemeyle düzelmez
+    return PermanentJobError(e.detail) if e.status_code < 500 else e
+
+@job_handler("generate_workout_plan")
+def run_generate_workout_plan_job(db: Session, payload: dict):
+    try:
+        workout_plan = generate_workout_plan_for_user(
+            payload["user_id"], UpdateUserData(**payload["user_data"]), payload.get("incremental", False), db
+        )
+    except HTTPException as e:
+        raise permanent_job_error(e)
+    return to_json_bytes(workout_plan_list_adapter, workout_plan), "application/json"
+
+@job_handler("export_workout_plan")
+def run_export_workout_plan_job(db: Session, payload: dict):
+    try:
+        return render_workout_plan_export(db, payload["user_id"]), XLSX_MEDIA_TYPE
+    except HTTPException as e:
+        raise permanent_job_error(e)
+
+def job_accepted(job_id: int) -> JSONResponse:
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"}, headers={"Location": f"/jobs/{job_id}"})
+
+@app.post("/jobs/generate_workout_plan/{user_id}", status_code=202)
+def submit_generate_workout_plan_job(user_id: int, user_data: UpdateUserData, incremental: bool = False, db: Session = Depends(get_db)):
+    return job_accepted(submit(db, "generate_workout_plan", {
+        "user_id": user_id, "user_data": user_data.model_dump(), "incremental": incremental
+    }))
+
+@app.post("/jobs/export_workout_plan/{user_id}", status_code=202)
+def submit_export_workout_plan_job(user_id: int, db: Session = Depends(get_db)):
+    return job_accepted(submit(db, "export_workout_plan", {"user_id": user_id}))
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job_status(job_id: int, db: Session = Depends(get_db)):
+    job = get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: int, db: Session = Depends(get_db)):
+    job = get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=409, detail=job.error or "Job failed")
+    if job.status != "done":
+        # Henüz bitmedi; istemci tekrar sorar
+        return JSONResponse(status_code=202, content={"job_id": job.id, "status": job.status})
+    headers = {}
+    if job.media_type == XLSX_MEDIA_TYPE:
+        user_id = json.loads(job.payload)["user_id"]
+        headers["Content-Disposition"] = f'attachment; filename="workout_plan_user_{user_id}.xlsx"'
+    return Response(content=job.result, media_type=job.media_type, headers=headers)
+
+@app.post("/login")
+async def login(credentials: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    # Kullanıcılar ve koçlar tek bir indeksli sorguyla aranıyor (önce kullanıcılar)
+    candidates = (await db.execute(
+        select(credentials_view).where(credentials_view.c.name == credentials.name)
+    )).all()
+    candidates.sort(key=lambda account: account.role != "user")
+
+    # KDF event loop'u bloklamasın diye threadpool'da çalışıyor
+    for account in candidates:
+        if await run_in_threadpool(verify_password, credentials.password, account.password):
+            if needs_rehash(account.password):
+                # Eski iterasyon sayısıyla hash'lenmiş parolayı güncel ayarla yeniden hash'liyoruz
+                table = ACCOUNT_TABLES[account.role]
+                new_hash = await run_in_threadpool(hash_password, credentials.password)
+                await db.execute(update(table).where(table.id == account.id).values(password=new_hash))
+                await db.commit()
+            token = sessions.create(account.id, account.role)
+            return {"id": account.id, "role": account.role, "token": token}
+
+    if not candidates:
+        # Hesap yokken de aynı süreyi harcıyoruz ki isimler yanıt süresinden anlaşılmasın
+        await run_in_threadpool(verify_password, credentials.password, dummy_password_hash())
 
     # Her iki tabloda da eşleşme yoksa hata döndürelim
     raise HTTPException(status_code=401, detail="Invalid username or password")
 
+# Dependency
+def get_current_session(authorization: Optional[str] = Header(None)):
+    scheme, _, token = (authorization or "").partition(" ")
+    session = sessions.get(token) if scheme.lower() == "bearer" and token else None
+    if session is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    return {**session, "token": token}
+
+@app.get("/session")
+def get_session(session: dict = Depends(get_current_session)):
+    return {"id": session["id"], "role": session["role"]}
+
+@app.post("/logout")
+def logout(session: dict = Depends(get_current_session)):
+    sessions.revoke(session["token"])
+    return {"message": "Logged out successfully"}
+
 @app.get("/coach/{coach_id}/students", response_model=List[StudentResponse])
-def get_students_by_coach(coach_id: int, db: Session = Depends(get_db)):
-    # Koçu kontrol et
-    coach = db.query(Coach).filter(Coach.id == coach_id).first()
-    if not coach:
+async def get_students_by_coach(coach_id: int, db: AsyncSession = Depends(get_async_db)):
+    content = response_cache.get(coach_students_key(coach_id))
+    if content is None:
+        # Koçu kontrol et
+        coach = await db.get(Coach, coach_id)
+        if not coach:
+            raise HTTPException(status_code=404, detail="Coach not found")
+
+        # Koça bağlı tüm öğrencileri getir (öğrenci yoksa boş liste)
+        if FAST_JSON_LISTS:
+            rows = (await db.execute(select(*student_columns).where(User.coach_id == coach_id))).all()
+            content = rows_to_json(student_fields, rows)
+        else:
+            students = (await db.scalars(select(User).where(User.coach_id == coach_id))).all()
+            content = to_json_bytes(student_list_adapter, students)
+        response_cache.set(coach_students_key(coach_id), content)
+
+    return json_bytes_response(content)
+
+@app.get("/coach/{coach_id}/dashboard", response_model=List[CoachDashboardEntry])
+async def get_coach_dashboard(coach_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Tüm öğrenciler ve özetleri tek sorguda (StudentSummaries, yazma anında güncellenir)
+    rows = (await db.execute(coach_dashboard_query(coach_id))).all()
+    if not rows and not await db.get(Coach, coach_id):
         raise HTTPException(status_code=404, detail="Coach not found")
-
-    # Koça bağlı tüm öğrencileri getir
-    students = db.query(User).filter(User.coach_id == coach_id).all()
-
-    # Eğer öğrenci bulunmazsa boş liste dönebiliriz
-    if not students:
-        return []
-
-    return students
+    return [dashboard_entry(row) for row in rows]
 
 @app.get("/user_info/{user_id}", response_model=UserResponse)
-def get_user_info(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def get_user_info(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    content = response_cache.get(user_info_key(user_id))
+    if content is None:
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        content = to_json_bytes(user_adapter, user)
+        response_cache.set(user_info_key(user_id), content)
     
-    return user
+    return json_bytes_response(content)
 
 @app.get("/coaches", response_model=List[CoachResponse])
-def get_all_coaches(db: Session = Depends(get_db)):
-    coaches = db.query(Coach).all()
-    return coaches
+async def get_all_coaches(db: AsyncSession = Depends(get_async_db)):
+    content = response_cache.get(COACHES_KEY)
+    if content is None:
+        if FAST_JSON_LISTS:
+            content = rows_to_json(coach_fields, (await db.execute(select(*coach_columns))).all())
+        else:
+            coaches = (await db.scalars(select(Coach))).all()
+            content = to_json_bytes(coach_list_adapter, coaches)
+        response_cache.set(COACHES_KEY, content)
+    return json_bytes_response(content)
 
 
 @app.post("/select_coach")
@@ -246,7 +742,14 @@ def select_coach(request: CoachSelectionRequest, db: Session = Depends(get_db)):
     if not coach:
         raise HTTPException(status_code=404, detail="Coach not found")
     
+    previous_coach_id = user.coach_id
     user.coach_id = request.coach_id
     db.commit()
+    invalidate(
+        response_cache,
+        user_info_key(user.id),
+        coach_students_key(previous_coach_id),
+        coach_students_key(request.coach_id)
+    )
     return {"message": "Coach selected successfully"}
 
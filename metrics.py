@@ -0,0 +1,211 @@
+import functools
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("metrics.slow_query")
+
+# Bu süreyi (ms) aşan SQL ifadeleri loglanır; ayarlanmazsa kapalı
+SLOW_QUERY_MS = float(os.environ["SLOW_QUERY_MS"]) if os.getenv("SLOW_QUERY_MS") else None
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, list] = {}  # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def _bucket_line(self, labels: Labels, bound, count: int) -> str:
+        le = 'le="%s"' % bound
+        return f"{self.name}_bucket{_label_text(self.labels, labels, le)} {count}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(self._bucket_line(labels, bound, cumulative))
+                lines.append(self._bucket_line(labels, "+Inf", count))
+                lines.append(f"{self.name}_sum{_label_text(self.labels, labels)} {total}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, labels)} {count}")
+        return lines
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status"))
+request_db_statements = Histogram(
+    "http_request_db_statements", "SQL statements executed per request", ("method", "route"), COUNT_BUCKETS)
+request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request", ("method", "route"))
+db_statements = Counter("db_statements_total", "SQL statements executed, including background jobs")
+db_seconds = Counter("db_statement_seconds_total", "Time spent in SQL statements, including background jobs")
+slow_queries = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS")
+function_latency = Histogram(
+    "function_duration_seconds", "Time spent in instrumented functions", ("function",))
+
+REGISTRY = [request_latency, request_db_statements, request_db_seconds, db_statements, db_seconds, slow_queries, function_latency]
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# İstek başına SQL sayacı; threadpool ve greenlet'ler context'i kopyaladığı için aynı nesne paylaşılır
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    db_statements.inc()
+    db_seconds.inc(amount=elapsed)
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+    if SLOW_QUERY_MS is not None and elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_queries.inc()
+        logger.warning("slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split()))
+
+
+def _handle_error(exception_context):
+    # Hata veren ifadenin başlangıç zamanı yığında kalmasın
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine):
+    """Counts and times every statement of `engine` (pass `async_engine.sync_engine` for async engines)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def timed(name: str):
+    """Decorator recording the call duration in function_duration_seconds{function=name}."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                function_latency.observe(time.perf_counter() - start, name)
+        return wrapper
+    return decorate
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and SQL statement count/time per route.
+
+    Routes are labelled with their path template (/workout_plans/{user_id}),
+    so label cardinality stays bounded; unmatched paths are labelled "unmatched".
+    Streaming responses are measured until the last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _query_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            request_latency.observe(elapsed, method, path, status)
+            request_db_statements.observe(stats.count, method, path)
+            request_db_seconds.observe(stats.seconds, method, path)
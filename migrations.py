@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import insert, inspect, literal, select, text, union_all, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from auth import PASSWORD_HASH_ALGORITHM, hash_password
+from models import Base, Coach, Exercise, ExerciseCatalogVersion, StudentSummary, User, WorkoutPlan, WorkoutPlanDay, credentials_view
+from plan_store import insert_plan_table_rows, plan_table_rows
+from student_summary import rebuild_student_summaries
+
+logger = logging.getLogger(__name__)
+
+
+def add_column_sql(dialect, table, column) -> str:
+    """ALTER TABLE statement adding `column` to `table`, with identifiers quoted for `dialect`."""
+    preparer = dialect.identifier_preparer
+    ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect)}"
+    if column.server_default is not None:
+        ddl += f" NOT NULL DEFAULT {column.server_default.arg}" if not column.nullable else f" DEFAULT {column.server_default.arg}"
+    return ddl
+
+
+def add_missing_columns(engine: Engine):
+    """
+    Adds columns declared on the ORM models that an existing table lacks.
+
+    Only columns that are nullable or have a server default can be added
+    this way (e.g. WorkoutPlans.version). Safe to run on every start.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                connection.execute(text(add_column_sql(engine.dialect, table, column)))
+
+
+def create_missing_indexes(engine: Engine):
+    """
+    Creates the indexes declared on the ORM models that an existing database lacks.
+
+    `Base.metadata.create_all` only creates indexes together with new tables,
+    so databases created before an index was declared (e.g. fitness.db)
+    need this step. Safe to run on every start.
+    """
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
+
+def credentials_view_sql(dialect) -> str:
+    """
+    CREATE VIEW statement of models.credentials_view for `dialect`.
+
+    Built from the Users/Coaches tables so identifiers are quoted the way the
+    ORM quotes them (on PostgreSQL bare mixed-case names fold to lowercase).
+    Filters on name are pushed into both branches, so lookups use
+    ix_Users_name / ix_Coaches_name.
+    """
+    query = union_all(*(
+        select(table.c.name, literal(role).label("role"), table.c.id, table.c.password)
+        for role, table in (("user", User.__table__), ("coach", Coach.__table__))
+    ))
+    create = "CREATE VIEW IF NOT EXISTS" if dialect.name == "sqlite" else "CREATE OR REPLACE VIEW"
+    name = dialect.identifier_preparer.format_table(credentials_view)
+    return f"{create} {name} AS\n{query.compile(dialect=dialect, compile_kwargs={'literal_binds': True})}"
+
+
+def create_views(engine: Engine):
+    with engine.begin() as connection:
+        connection.execute(text(credentials_view_sql(engine.dialect)))
+
+
+def create_catalog_version_triggers(engine: Engine):
+    """
+    Creates the ExerciseCatalogVersion row and the triggers that bump it on
+    every change to Exercises, whoever makes it (another process, an admin
+    tool, plain SQL). ExerciseCatalog compares it to reload its snapshot.
+    """
+    preparer = engine.dialect.identifier_preparer
+    exercises = preparer.format_table(Exercise.__table__)
+    bump = f"UPDATE {preparer.format_table(ExerciseCatalogVersion.__table__)} SET version = version + 1"
+    with engine.begin() as connection:
+        if connection.scalar(select(ExerciseCatalogVersion.id).limit(1)) is None:
+            connection.execute(insert(ExerciseCatalogVersion), {"id": 1, "version": 0})
+        if engine.dialect.name == "sqlite":
+            # SQLite tetikleyicileri satır başına çalışır
+            for operation in ("INSERT", "UPDATE", "DELETE"):
+                connection.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS exercises_catalog_version_{operation.lower()} "
+                    f"AFTER {operation} ON {exercises} BEGIN {bump}; END"
+                ))
+        else:
+            connection.execute(text(
+                "CREATE OR REPLACE FUNCTION bump_exercise_catalog_version() RETURNS trigger AS $$ "
+                f"BEGIN {bump}; RETURN NULL; END $$ LANGUAGE plpgsql"
+            ))
+            connection.execute(text(
+                "CREATE OR REPLACE TRIGGER exercises_catalog_version "
+                f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {exercises} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION bump_exercise_catalog_version()"
+            ))
+
+
+def migrate_workout_plan_blobs(engine: Engine) -> int:
+    """
+    Moves workout plans stored as JSON in WorkoutPlans.workout_data into
+    WorkoutPlanDays/WorkoutPlanExercises rows and clears the JSON column.
+
+    Exercises are matched to the Exercises table by (body_part, exercise_name).
+    Plans that reference an exercise no longer in the table are left as JSON
+    and keep being read from it. Safe to run on every start; returns the
+    number of migrated plans.
+    """
+    migrated = 0
+    with Session(engine) as db, db.begin():
+        legacy = db.execute(
+            select(WorkoutPlan.id, WorkoutPlan.workout_data)
+            .where(WorkoutPlan.workout_data.is_not(None))
+            .where(~select(WorkoutPlanDay.plan_id).where(WorkoutPlanDay.plan_id == WorkoutPlan.id).exists())
+        ).all()
+        if not legacy:
+            return 0
+
+        exercise_ids = {}
+        for exercise_id, body_part, exercise_name in db.execute(
+            select(Exercise.id, Exercise.body_part, Exercise.exercise_name).order_by(Exercise.id)
+        ):
+            exercise_ids.setdefault((body_part, exercise_name), exercise_id)
+
+        def resolve(body_part, exercise_name):
+            return exercise_ids.get((body_part, exercise_name))
+
+        for plan_id, workout_data in legacy:
+            try:
+                days, exercises = plan_table_rows(plan_id, json.loads(workout_data), resolve)
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning("Workout plan %s left as JSON: %s", plan_id, e)
+                continue
+            insert_plan_table_rows(db, days, exercises)
+            db.execute(update(WorkoutPlan).where(WorkoutPlan.id == plan_id).values(workout_data=None))
+            migrated += 1
+    return migrated
+
+
+def hash_plaintext_passwords(engine: Engine) -> int:
+    """
+    Replaces passwords stored before hashing was added (anything not in the
+    auth.hash_password format) with their hash, so accounts that never log
+    in do not keep a cleartext password at rest. Safe to run on every
+    start; returns the number of accounts updated.
+    """
+    updated = 0
+    with Session(engine) as db, db.begin():
+        for model in (User, Coach):
+            rows = db.execute(
+                select(model.id, model.password)
+                .where(~model.password.startswith(PASSWORD_HASH_ALGORITHM + "$", autoescape=True), model.password != "")
+            ).all()
+            if not rows:
+                continue
+            # pbkdf2_hmac GIL'i bıraktığı için hash'ler çekirdek sayısı kadar paralel hesaplanır
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+                hashes = list(pool.map(hash_password, [row.password for row in rows]))
+            db.execute(update(model), [{"id": row.id, "password": new_hash} for row, new_hash in zip(rows, hashes)])
+            updated += len(rows)
+            logger.info("Hashed %s plaintext passwords in %s", len(rows), model.__tablename__)
+    return updated
+
+
+def backfill_student_summaries(engine: Engine) -> bool:
+    """
+    Builds StudentSummaries from the existing plans and fitness data when the
+    table is empty (first start after it was added). Afterwards the writers
+    keep it up to date. Returns whether a rebuild ran.
+    """
+    with Session(engine) as db, db.begin():
+        if db.scalar(select(StudentSummary.user_id).limit(1)) is not None:
+            return False
+        rebuild_student_summaries(db)
+    return True
+
+
+def run_migrations(engine: Engine):
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    create_views(engine)
+    create_catalog_version_triggers(engine)
+    hash_plaintext_passwords(engine)
+    migrate_workout_plan_blobs(engine)
+    backfill_student_summaries(engine)
@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, ForeignKeyConstraint, Date, DateTime, Index, LargeBinary, MetaData, Table
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
-from pydantic import BaseModel
-from typing import List
-from datetime import date
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date, datetime
 
 Base = declarative_base()
 
@@ -11,7 +11,7 @@ class Coach(Base):
     __tablename__ = 'Coaches'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)  # /login
     specialization = Column(String)
     age = Column(Integer)
     weight = Column(Float)
@@ -23,13 +23,13 @@ class User(Base):
     __tablename__ = 'Users'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)  # /login
     age = Column(Integer)
     weight = Column(Float)
     height = Column(Float)
     fitness_level = Column(Integer)
     bmi = Column(Float)
-    coach_id = Column(Integer, ForeignKey('Coaches.id'))
+    coach_id = Column(Integer, ForeignKey('Coaches.id'), index=True)
     daily_calories = Column(Integer)
     goal = Column(String)
     password = Column(String, nullable=False) 
@@ -40,13 +40,54 @@ class WorkoutPlan(Base):
     __tablename__ = 'WorkoutPlans'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('Users.id'))
-    workout_data = Column(String)  # JSON format for workout plan
+    user_id = Column(Integer, ForeignKey('Users.id'), index=True)
+    workout_data = Column(String)  # Eski JSON formatı; yeni planlar WorkoutPlanDays/WorkoutPlanExercises tablolarında
+    version = Column(Integer, nullable=False, default=1, server_default='1')  # Plan her değiştiğinde artar (ETag)
     
     user = relationship('User', backref='workout_plans')
 
+class WorkoutPlanHistory(Base):
+    __tablename__ = 'WorkoutPlanHistory'
+    __table_args__ = (
+        Index('ix_WorkoutPlanHistory_plan_version', 'plan_id', 'version'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    plan_id = Column(Integer, ForeignKey('WorkoutPlans.id'), nullable=False)
+    version = Column(Integer, nullable=False)  # Yerine yenisi yazılan sürüm
+    workout_data = Column(String)  # O sürümün JSON kopyası
+    created_at = Column(DateTime)  # Sürümün geçmişe alındığı zaman
+
+class WorkoutPlanDay(Base):
+    __tablename__ = 'WorkoutPlanDays'
+    
+    plan_id = Column(Integer, ForeignKey('WorkoutPlans.id'), primary_key=True)
+    day_number = Column(Integer, primary_key=True)  # "Day 1" -> 1
+    message = Column(String)  # Dinlenme günü mesajı, egzersiz günlerinde boş
+
+class WorkoutPlanExercise(Base):
+    __tablename__ = 'WorkoutPlanExercises'
+    __table_args__ = (
+        ForeignKeyConstraint(['plan_id', 'day_number'], ['WorkoutPlanDays.plan_id', 'WorkoutPlanDays.day_number']),
+    )
+    
+    plan_id = Column(Integer, primary_key=True)
+    day_number = Column(Integer, primary_key=True)
+    position = Column(Integer, primary_key=True)  # Gün içindeki sıra, 0'dan başlar
+    exercise_id = Column(Integer, ForeignKey('Exercises.id'), nullable=False)
+    sets = Column(Integer)  # Plana özel set sayısı (katalogdakinden farklı olabilir)
+    reps = Column(Integer)
+    
+    exercise = relationship('Exercise')
+
 class UserFitnessData(Base):
     __tablename__ = 'UserFitnessData'
+    __table_args__ = (
+        # get_user_exercise_data: WHERE user_id = ? AND exercise_name = ? ORDER BY date
+        Index('ix_UserFitnessData_user_exercise_date', 'user_id', 'exercise_name', 'date'),
+        # POST /user_fitness_data/log: tekrar gönderilen kayıtlar eklenmez (anahtarsız kayıtlar NULL, çakışmaz)
+        Index('ix_UserFitnessData_user_idempotency_key', 'user_id', 'idempotency_key', unique=True),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('Users.id'))
@@ -55,6 +96,7 @@ class UserFitnessData(Base):
     weight = Column(Float)
     sets = Column(Integer)
     reps = Column(Integer)
+    idempotency_key = Column(String)  # İstemcinin kayda verdiği benzersiz anahtar
     
     user = relationship('User', backref='fitness_data')
 
@@ -68,6 +110,61 @@ class Exercise(Base):
     reps = Column(Integer)
     equipment = Column(String)
 
+class ExerciseCatalogVersion(Base):
+    # Tek satır; Exercises'taki her değişiklikte tetikleyiciyle artar (migrations.create_catalog_version_triggers).
+    # Diğer süreçler (uvicorn worker'ları, worker.py, elle SQL) katalog değişikliğini buradan görür
+    __tablename__ = 'ExerciseCatalogVersion'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0, server_default='0')
+
+class StudentSummary(Base):
+    # Koç paneli için öğrenci başına özet; plan ve antrenman kayıtları yazılırken artımlı güncellenir (student_summary.py)
+    __tablename__ = 'StudentSummaries'
+    
+    user_id = Column(Integer, ForeignKey('Users.id'), primary_key=True)
+    plan_id = Column(Integer)
+    plan_version = Column(Integer)
+    plan_days = Column(Integer)
+    last_workout_date = Column(Date)
+    week_start = Column(Date)  # week_volume/week_sets'in ait olduğu haftanın pazartesi günü
+    week_volume = Column(Float)  # weight x sets x reps toplamı
+    week_sets = Column(Integer)
+    updated_at = Column(DateTime)
+
+class Job(Base):
+    __tablename__ = 'Jobs'
+    __table_args__ = (
+        # job_queue.claim: WHERE status = ? AND available_at <= ? ORDER BY id
+        Index('ix_Jobs_status_available_at', 'status', 'available_at'),
+        # job_queue.purge_finished_jobs: WHERE status IN ('done', 'failed') AND updated_at < ?
+        Index('ix_Jobs_status_updated_at', 'status', 'updated_at'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)  # job_queue.handlers anahtarı
+    payload = Column(String)  # JSON
+    status = Column(String, nullable=False, default='queued')  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    available_at = Column(DateTime)  # Tekrar denemeler bu zamana kadar bekler
+    locked_until = Column(DateTime)  # Çalışan işin kirası; süresi dolarsa başka bir worker alır
+    result = Column(LargeBinary)
+    media_type = Column(String)
+    error = Column(String)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+# Read-only view: name -> (role, id, password hash) over Users and Coaches.
+# Kept out of Base.metadata so create_all doesn't create it as a table; migrations.py creates the view.
+credentials_view = Table(
+    'Credentials', MetaData(),
+    Column('name', String),
+    Column('role', String),
+    Column('id', Integer),
+    Column('password', String),
+)
+
 # Pydantic models
 class ExerciseResponse(BaseModel):
     bolge: str  # Kas grubu
@@ -80,6 +177,15 @@ class WorkoutPlanResponse(BaseModel):
     day: str  # Gün numarası (DAY1, DAY2, ...)
     exercises: List[ExerciseResponse]  # Günün egzersizleri
 
+class BatchWorkoutPlanRequest(BaseModel):
+    days: int = Field(ge=1, le=7)
+    user_ids: Optional[List[int]] = None  # Verilmezse koçun tüm öğrencileri için plan oluşturulur
+    equipment: Optional[List[str]] = None  # Mevcut ekipmanlar; verilmezse hepsi var sayılır
+
+class UserWorkoutPlanResponse(BaseModel):
+    user_id: int
+    workout_plan: List[WorkoutPlanResponse]
+
 class UserFitnessDataResponse(BaseModel):
     date: date
     exercise_name: str
@@ -88,12 +194,82 @@ class UserFitnessDataResponse(BaseModel):
 
     class Config:
         from_attributes = True  # ORM modelinden veri alabilmesini sağlıyor
+        coerce_numbers_to_str = True  # Eski kayıtlarda reps metin, yenilerinde sayı
+
+class FitnessLogEntry(BaseModel):
+    user_id: int = Field(gt=0)
+    date: date
+    exercise_name: str = Field(min_length=1, max_length=100)
+    weight: float = Field(ge=0, le=1000)
+    sets: int = Field(ge=1, le=100)
+    reps: int = Field(ge=1, le=1000)
+    idempotency_key: Optional[str] = Field(None, max_length=128)  # Aynı anahtarla tekrar gönderilen kayıt yok sayılır
+
+class FitnessLogResponse(BaseModel):
+    accepted: int
+    duplicates: int  # Henüz yazılmamış bir kayıtla aynı anahtarı taşıyanlar; yazılmışların tekrarı sessizce atlanır
+
+class VolumePoint(BaseModel):
+    period: str  # Haftalık için haftanın pazartesi günü (YYYY-MM-DD), aylık için YYYY-MM
+    volume: float  # weight x sets x reps toplamı
+    sets: int
+    moving_average: float
+
+class PersonalRecord(BaseModel):
+    value: float
+    date: date
+
+class ExerciseAnalyticsResponse(BaseModel):
+    exercise_name: str
+    sessions: int
+    first_date: date
+    last_date: date
+    max_weight: Optional[PersonalRecord]
+    max_volume: Optional[PersonalRecord]
+    estimated_1rm: Optional[PersonalRecord]  # Epley formülüyle tahmini 1RM
+    weekly: List[VolumePoint]
+    monthly: List[VolumePoint]
+
+class WorkoutPlanHistoryResponse(BaseModel):
+    version: int
+    created_at: datetime
+    workout_data: str  # /workout_plans ile aynı JSON metni
+
+class CoachDashboardEntry(BaseModel):
+    user_id: int
+    name: str
+    goal: Optional[str] = None
+    fitness_level: Optional[int] = None
+    plan_id: Optional[int] = None
+    plan_version: Optional[int] = None
+    plan_days: Optional[int] = None
+    last_workout_date: Optional[date] = None
+    weekly_volume: float  # Bu haftanın (pazartesiden itibaren) hacmi
+    weekly_sets: int
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class WorkoutPlanExerciseUpdate(BaseModel):
+    exercise_id: Optional[int] = Field(None, gt=0)  # Verilirse hareket katalogdaki başka bir hareketle değiştirilir
+    set_sayisi: Optional[int] = Field(None, ge=1, le=100)
+    tekrar_sayisi: Optional[int] = Field(None, ge=1, le=1000)
 
 class UpdateUserData(BaseModel):
     age: int
     weight: float
     height: float
     days: int = None  # Bu parametre isteğe bağlıdır; workout planı oluşturulacaksa sağlanmalıdır
+    equipment: Optional[List[str]] = None  # Plan oluşturulurken mevcut ekipmanlar; verilmezse hepsi var sayılır
 
 class LoginRequest(BaseModel):
     name: str
@@ -0,0 +1,212 @@
+from datetime import date, timedelta
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from catalog import CatalogSnapshot
+from models import User, UserFitnessData
+from fitness_store import logged_workout
+
+EQUIPMENT_TYPES = ["Barbell", "Dumbbell", "Bodyweight", "Cable", "Machine", "Plate"]
+ALWAYS_AVAILABLE = frozenset({"Bodyweight"})
+
+# Hedefe göre ekipman ağırlıkları (EQUIPMENT_TYPES sırasıyla); bilinmeyen hedefler nötr
+GOAL_EQUIPMENT_WEIGHTS = {
+    "Muscle Gain": [1.5, 1.4, 0.8, 1.0, 1.1, 1.0],
+    "Weight Loss": [0.8, 1.0, 1.5, 1.2, 1.1, 0.9],
+    "Endurance": [0.7, 1.0, 1.5, 1.3, 1.0, 0.8],
+}
+# Seviyeye göre ekipman ağırlıkları (1: başlangıç, 3: ileri)
+LEVEL_EQUIPMENT_WEIGHTS = {
+    1: [0.6, 0.9, 1.2, 1.2, 1.4, 0.9],
+    2: [1.0, 1.0, 1.0, 1.0, 1.0, 1.0],
+    3: [1.3, 1.1, 0.9, 1.0, 0.9, 1.1],
+}
+# Yüksek BMI veya ileri yaşta eklemleri zorlayan serbest ağırlıklar daha az seçilir
+HIGH_LOAD_WEIGHTS = [0.6, 0.9, 1.0, 1.1, 1.3, 0.6]
+HIGH_LOAD_BMI = 30
+HIGH_LOAD_AGE = 60
+
+# (set çarpanı, tekrar çarpanı)
+GOAL_VOLUME = {"Muscle Gain": (1.0, 0.8), "Weight Loss": (1.0, 1.25), "Endurance": (0.9, 1.5)}
+LEVEL_SETS = {1: 0.75, 2: 1.0, 3: 1.25}
+MIN_SETS, MAX_SETS = 1, 6
+MIN_REPS, MAX_REPS = 5, 30
+
+HISTORY_DAYS = 14  # Skoru etkileyen geçmiş
+HISTORY_DECAY = 0.6  # Son HISTORY_DAYS günde yapılan her seans için skor çarpanı
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+class UserProfile(NamedTuple):
+    fitness_level: int
+    goal: Optional[str]
+    age: Optional[int]
+    bmi: Optional[float]
+    equipment: Optional[FrozenSet[str]]  # None: tüm ekipmanlar var; vücut ağırlığı her zaman var
+    history: Tuple[Tuple[str, int], ...]  # (exercise_name, son HISTORY_DAYS gündeki seans sayısı)
+
+
+def profile_from_user(user, history: Dict[str, int] = None, equipment: Iterable[str] = None) -> UserProfile:
+    return UserProfile(
+        fitness_level=user.fitness_level if user.fitness_level in LEVEL_SETS else 2,
+        goal=user.goal,
+        age=user.age,
+        bmi=user.bmi,
+        equipment=frozenset(equipment) if equipment is not None else None,
+        history=tuple(sorted((history or {}).items())),
+    )
+
+
+def history_counts(db: Session, user_ids: Iterable[int], today: date = None) -> Dict[int, Dict[str, int]]:
+    """Per-user counts of logged sets per exercise in the last HISTORY_DAYS days, in one grouped query."""
+    since = (today or date.today()) - timedelta(days=HISTORY_DAYS)
+    counts: Dict[int, Dict[str, int]] = {}
+    rows = db.execute(
+        select(UserFitnessData.user_id, UserFitnessData.exercise_name, func.count())
+        # Plan üretiminin yazdığı yer tutucu satırlar sayılmaz; yoksa her yeniden üretim önceki planı cezalandırır
+        .where(UserFitnessData.user_id.in_(list(user_ids)), UserFitnessData.date >= since, logged_workout)
+        .group_by(UserFitnessData.user_id, UserFitnessData.exercise_name)
+    )
+    for user_id, exercise_name, count in rows:
+        counts.setdefault(user_id, {})[exercise_name] = count
+    return counts
+
+
+def load_profiles(db: Session, user_ids: Iterable[int], equipment: Iterable[str] = None) -> Dict[int, UserProfile]:
+    """Builds the profiles of several users with two queries."""
+    user_ids = list(user_ids)
+    history = history_counts(db, user_ids)
+    users = db.execute(
+        select(User.id, User.fitness_level, User.goal, User.age, User.bmi).where(User.id.in_(user_ids))
+    )
+    return {user.id: profile_from_user(user, history.get(user.id), equipment) for user in users}
+
+
+def _equipment_types(equipment: Optional[str]) -> List[str]:
+    # "Barbell or Dumbbell" gibi değerler birden fazla türe sayılır
+    types = [part.strip() for part in (equipment or "Bodyweight").split(" or ")]
+    return [t for t in types if t in EQUIPMENT_TYPES] or ["Bodyweight"]
+
+
+class CatalogMatrix:
+    """
+    Column arrays of a catalog snapshot, ordered by body part so every region is a contiguous slice.
+    """
+
+    def __init__(self, catalog: CatalogSnapshot):
+        exercises = sorted(catalog.exercises, key=lambda e: (e.body_part, e.id))
+        self.source = catalog.exercises
+        self.ids = np.array([int(e.id) for e in exercises], dtype=np.uint64)
+        self.equipment = np.zeros((len(exercises), len(EQUIPMENT_TYPES)), dtype=bool)
+        for row, exercise in enumerate(exercises):
+            for t in _equipment_types(exercise.equipment):
+                self.equipment[row, EQUIPMENT_TYPES.index(t)] = True
+        self.sets = np.array([max(1, e.sets or 0) for e in exercises], dtype=float)
+        self.reps = np.array([max(5, e.reps or 0) for e in exercises], dtype=float)
+        self.names = {}
+        for row, exercise in enumerate(exercises):
+            self.names.setdefault(exercise.exercise_name, []).append(row)
+        self.entries = [(e.body_part, e.exercise_name, e.equipment or "None") for e in exercises]
+        self.regions: Dict[str, Tuple[int, int]] = {}
+        for row, exercise in enumerate(exercises):
+            start, _ = self.regions.get(exercise.body_part, (row, row))
+            self.regions[exercise.body_part] = (start, row + 1)
+
+
+_matrix: Optional[CatalogMatrix] = None
+
+
+def catalog_matrix(catalog: CatalogSnapshot) -> CatalogMatrix:
+    global _matrix
+    matrix = _matrix
+    if matrix is None or matrix.source is not catalog.exercises:
+        matrix = _matrix = CatalogMatrix(catalog)
+    return matrix
+
+
+def _per_user(table: Dict, keys: Sequence, default) -> np.ndarray:
+    return np.array([table.get(key, default) for key in keys], dtype=float)
+
+
+def score_matrix(matrix: CatalogMatrix, profiles: Sequence[UserProfile]) -> np.ndarray:
+    """
+    Scores every exercise for every profile in one pass; returns a (users, exercises) weight matrix.
+
+    The score multiplies goal and fitness level weights of the exercise's best
+    equipment type, a high-load penalty for high BMI or age, a decay for
+    exercises done in the last HISTORY_DAYS days, and zero for equipment the
+    user does not have.
+    """
+    neutral = [1.0] * len(EQUIPMENT_TYPES)
+    type_weights = (
+        _per_user(GOAL_EQUIPMENT_WEIGHTS, [p.goal for p in profiles], neutral)
+        * _per_user(LEVEL_EQUIPMENT_WEIGHTS, [p.fitness_level for p in profiles], neutral)
+    )
+    high_load = np.array([
+        (p.bmi or 0) >= HIGH_LOAD_BMI or (p.age or 0) >= HIGH_LOAD_AGE for p in profiles
+    ])
+    type_weights[high_load] *= HIGH_LOAD_WEIGHTS
+
+    available = np.ones_like(type_weights, dtype=bool)
+    for row, profile in enumerate(profiles):
+        if profile.equipment is not None:
+            available[row] = [t in profile.equipment or t in ALWAYS_AVAILABLE for t in EQUIPMENT_TYPES]
+
+    # (users, 1, types) x (1, exercises, types) -> en uygun ekipman türünün ağırlığı
+    usable = matrix.equipment[None, :, :] & available[:, None, :]
+    weights = np.where(usable, type_weights[:, None, :], 0.0).max(axis=2)
+
+    counts = np.zeros_like(weights)
+    for row, profile in enumerate(profiles):
+        for exercise_name, count in profile.history:
+            counts[row, matrix.names.get(exercise_name, [])] = count
+    return weights * HISTORY_DECAY ** counts
+
+
+def allowed_exercise_ids(catalog: CatalogSnapshot, profile: UserProfile) -> FrozenSet[int]:
+    """Ids of the catalog exercises the profile can be given (nonzero score, i.e. the equipment is available)."""
+    matrix = catalog_matrix(catalog)
+    weights = score_matrix(matrix, [profile])[0]
+    return frozenset(int(exercise_id) for exercise_id in matrix.ids[weights > 0])
+
+
+def volume_matrix(matrix: CatalogMatrix, profiles: Sequence[UserProfile]) -> Tuple[np.ndarray, np.ndarray]:
+    """Scaled (sets, reps) of every exercise for every profile, as (users, exercises) int arrays."""
+    set_factor = _per_user({g: v[0] for g, v in GOAL_VOLUME.items()}, [p.goal for p in profiles], 1.0)
+    set_factor *= _per_user(LEVEL_SETS, [p.fitness_level for p in profiles], 1.0)
+    rep_factor = _per_user({g: v[1] for g, v in GOAL_VOLUME.items()}, [p.goal for p in profiles], 1.0)
+    sets = np.clip(np.rint(matrix.sets[None, :] * set_factor[:, None]), MIN_SETS, MAX_SETS).astype(int)
+    reps = np.clip(np.rint(matrix.reps[None, :] * rep_factor[:, None]), MIN_REPS, MAX_REPS).astype(int)
+    return sets, reps
+
+
+def uniform_keys(seed: int, user_ids: Sequence[int], days: Sequence[int], exercise_ids: np.ndarray) -> np.ndarray:
+    """
+    Deterministic uniforms in (0, 1) of shape (users, days, exercises).
+
+    Each value is a splitmix64 hash of (seed, user, day, exercise id), so a
+    day's draw does not depend on the other days or on other exercises being
+    added to the catalog.
+    """
+    x = (
+        np.uint64(seed)
+        ^ (np.asarray(user_ids, dtype=np.uint64)[:, None, None] * np.uint64(0xD1B54A32D192ED03))
+        ^ (np.asarray(days, dtype=np.uint64)[None, :, None] * np.uint64(0xABC98388FB8FAC03))
+        ^ (exercise_ids[None, None, :] * np.uint64(0x8CB92BA72F3D8DD7))
+    )
+    z = x + _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return ((z >> np.uint64(11)).astype(float) + 0.5) * 2.0 ** -53
+
+
+def weighted_sample_keys(uniforms: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Efraimidis-Spirakis keys: taking the k largest keys of a region is a
+    weighted sample of k exercises without replacement. Zero weights give -inf.
+    """
+    with np.errstate(divide="ignore"):
+        return np.log(uniforms) / weights[:, None, :]
@@ -0,0 +1,218 @@
+import json
+import os
+import random
+import zlib
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from cache import LRUCache
+from catalog import CatalogExercise, CatalogSnapshot
+from personalization import (
+    UserProfile,
+    catalog_matrix,
+    score_matrix,
+    volume_matrix,
+    uniform_keys,
+    weighted_sample_keys)
+
+# Gün numarası -> (bölge, egzersiz sayısı) kuralları; tabloda olmayan günler boş kalır
+DEFAULT_DAY_TEMPLATES = {
+    1: [("Gogus", 2), ("Omuz", 2), ("Biceps", 1), ("On Kol", 1), ("Arka Kol", 1), ("Sirt", 2), ("Bacak", 2)],
+    2: [("Gogus", 2), ("Omuz", 2), ("Biceps", 1), ("On Kol", 1), ("Arka Kol", 1), ("Sirt", 2)],
+    3: [("Gogus", 3), ("Omuz", 3), ("Arka Kol", 2)],
+    4: [("Bacak", 5)],
+    6: [("Arka Kol", 3), ("Biceps", 3), ("On Kol", 3)],
+    7: [("Bacak", 4), ("Arka Kol", 3), ("Biceps", 3)],
+}
+# Plandaki gün sayısı -> dinlenme günleri
+DEFAULT_REST_DAYS = {7: [5]}
+REST_DAY_MESSAGE = "Dinlenme Günü"
+
+# Aynı kullanıcı ve gün için hep aynı egzersizler seçilir; tuz değiştirilerek tüm planlar yenilenebilir
+PLAN_SEED_SALT = os.getenv("PLAN_SEED_SALT", "")
+PLAN_SEED = zlib.crc32(PLAN_SEED_SALT.encode())
+PLAN_MEMO_SIZE = int(os.getenv("PLAN_MEMO_SIZE", "4096"))
+
+
+class DayTemplates(NamedTuple):
+    days: Dict[int, Tuple[Tuple[str, int], ...]]
+    rest_days: Dict[int, FrozenSet[int]]
+
+    def is_rest_day(self, day: int, days: int) -> bool:
+        return day in self.rest_days.get(days, ())
+
+
+def parse_templates(config: Dict) -> DayTemplates:
+    """
+    Builds the rule table from a config dict such as
+    {"days": {"1": [["Gogus", 2], ...]}, "rest_days": {"7": [5]}}.
+    JSON object keys may be strings.
+    """
+    return DayTemplates(
+        days={int(day): tuple((region, int(count)) for region, count in rules) for day, rules in config["days"].items()},
+        rest_days={int(days): frozenset(rest) for days, rest in config.get("rest_days", {}).items()},
+    )
+
+
+@lru_cache(maxsize=None)
+def load_templates(path: Optional[str] = None) -> DayTemplates:
+    """Loads the day templates once, from `path` or PLAN_TEMPLATES_PATH (JSON) if set, else the defaults."""
+    path = path or os.getenv("PLAN_TEMPLATES_PATH")
+    if not path:
+        return parse_templates({"days": DEFAULT_DAY_TEMPLATES, "rest_days": DEFAULT_REST_DAYS})
+    with open(path, encoding="utf-8") as f:
+        return parse_templates(json.load(f))
+
+
+def plan_entry(exercise: CatalogExercise) -> Dict:
+    return {
+        "bolge": exercise.body_part,
+        "hareket_adi": exercise.exercise_name,
+        "set_sayisi": max(1, exercise.sets),
+        "tekrar_sayisi": max(5, exercise.reps),
+        "ekipman": exercise.equipment or "None"
+    }
+
+
+def day_rng(user_id: int, day: int) -> random.Random:
+    """Seeded RNG for one day of a user's plan, so a single day can be rebuilt on its own."""
+    return random.Random(f"{PLAN_SEED_SALT}:{user_id}:{day}")
+
+
+class PlanEngine:
+    """
+    Builds workout plans from a day template rule table.
+
+    Catalog exercises are pre-formatted into per-region tuples once per
+    catalog snapshot, so sampling only draws indices. Plans built for a user
+    are seeded per (user, day) and memoized until the catalog changes;
+    memoized plans are shared and must not be mutated. `build_personalized`
+    samples by per-user scores from personalization.py instead of uniformly.
+    """
+
+    def __init__(self, templates: Optional[DayTemplates] = None, memo_size: int = PLAN_MEMO_SIZE):
+        self.templates = templates or load_templates()
+        self._memo = LRUCache(maxsize=memo_size)
+        self._source = None
+        self._entries: Dict[str, Tuple[Dict, ...]] = {}
+
+    def _region_entries(self, catalog: CatalogSnapshot) -> Dict[str, Tuple[Dict, ...]]:
+        if self._source is not catalog.exercises:
+            entries = {
+                region: tuple(plan_entry(exercise) for exercise in exercises)
+                for region, exercises in catalog.by_body_part.items()
+            }
+            self._memo.clear()
+            self._entries, self._source = entries, catalog.exercises
+        return self._entries
+
+    def is_rest_day(self, day: int, days: int) -> bool:
+        return self.templates.is_rest_day(day, days)
+
+    def build_day(self, day: int, days: int, catalog: CatalogSnapshot, rng=random) -> List[Dict]:
+        if self.templates.is_rest_day(day, days):  # Dinlenme günü
+            return [{"Message": REST_DAY_MESSAGE}]
+        entries = self._region_entries(catalog)
+        day_plan = []
+        for region, count in self.templates.days.get(day, ()):
+            pool = entries.get(region, ())
+            day_plan.extend(dict(pool[i]) for i in rng.sample(range(len(pool)), min(count, len(pool))))
+        return day_plan
+
+    def build(self, days: int, catalog: CatalogSnapshot, user_id: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """
+        Builds a `days`-day plan. With a user_id the plan is deterministic and
+        memoized; without one it uses the global `random` state.
+        """
+        if user_id is None:
+            return {f"Day {day}": self.build_day(day, days, catalog) for day in range(1, days + 1)}
+
+        self._region_entries(catalog)
+        plan = self._memo.get((user_id, days))
+        if plan is None:
+            plan = {
+                f"Day {day}": self.build_day(day, days, catalog, day_rng(user_id, day))
+                for day in range(1, days + 1)
+            }
+            self._memo.set((user_id, days), plan)
+        return plan
+
+    def build_personalized(
+        self,
+        days: int,
+        catalog: CatalogSnapshot,
+        profiles: Dict[int, UserProfile],
+        day_numbers: Optional[Iterable[int]] = None,
+    ) -> Dict[int, Dict[str, List[Dict]]]:
+        """
+        Builds personalized plans for several users at once (user_id -> plan).
+
+        All users are scored, sampled and have their sets/reps scaled in a few
+        NumPy passes; only building the output dicts is per user. Pass
+        day_numbers to build just those days (incremental regeneration). Full
+        plans are memoized per (user_id, days, profile).
+        """
+        self._region_entries(catalog)
+        if day_numbers is not None:
+            return self._build_personalized(days, catalog, profiles, list(day_numbers))
+
+        plans, missing = {}, {}
+        for user_id, profile in profiles.items():
+            plan = self._memo.get((user_id, days, profile))
+            if plan is None:
+                missing[user_id] = profile
+            else:
+                plans[user_id] = plan
+        if missing:
+            built = self._build_personalized(days, catalog, missing, list(range(1, days + 1)))
+            for user_id, plan in built.items():
+                self._memo.set((user_id, days, missing[user_id]), plan)
+            plans.update(built)
+        return plans
+
+    def _build_personalized(self, days, catalog, profiles, day_numbers):
+        matrix = catalog_matrix(catalog)
+        user_ids = list(profiles)
+        weights = score_matrix(matrix, list(profiles.values()))
+        sets, reps = (values.tolist() for values in volume_matrix(matrix, list(profiles.values())))
+        keys = weighted_sample_keys(uniform_keys(PLAN_SEED, user_ids, day_numbers, matrix.ids), weights)
+
+        plans = {user_id: {} for user_id in user_ids}
+        for d, day in enumerate(day_numbers):
+            day_key = f"Day {day}"
+            if self.templates.is_rest_day(day, days):  # Dinlenme günü
+                for plan in plans.values():
+                    plan[day_key] = [{"Message": REST_DAY_MESSAGE}]
+                continue
+
+            picks = [[] for _ in user_ids]
+            for region, count in self.templates.days.get(day, ()):
+                start, end = matrix.regions.get(region, (0, 0))
+                k = min(count, end - start)
+                if k == 0:
+                    continue
+                # Her kullanıcı için bölgenin en büyük k anahtarı, büyükten küçüğe
+                region_keys = keys[:, d, start:end]
+                top = np.argpartition(-region_keys, k - 1, axis=1)[:, :k]
+                top_keys = np.take_along_axis(region_keys, top, axis=1)
+                order = np.argsort(-top_keys, axis=1)
+                top = np.take_along_axis(top, order, axis=1) + start
+                usable = np.isfinite(np.take_along_axis(top_keys, order, axis=1))
+                for row, (indices, keep) in enumerate(zip(top.tolist(), usable.tolist())):
+                    picks[row].extend(index for index, ok in zip(indices, keep) if ok)
+
+            for row, user_id in enumerate(user_ids):
+                plans[user_id][day_key] = [
+                    {
+                        "bolge": matrix.entries[index][0],
+                        "hareket_adi": matrix.entries[index][1],
+                        "set_sayisi": sets[row][index],
+                        "tekrar_sayisi": reps[row][index],
+                        "ekipman": matrix.entries[index][2]
+                    }
+                    for index in picks[row]
+                ]
+        return plans
+
+
+plan_engine = PlanEngine()
@@ -0,0 +1,129 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Tuple
+from catalog import CatalogSnapshot
+from personalization import UserProfile
+from plan_engine import PlanEngine, plan_engine
+
+# Kova başına hazır tutulan plan sayısı; 0 havuzu kapatır
+PLAN_POOL_SIZE = int(os.getenv("PLAN_POOL_SIZE", "0"))
+# Havuz bu orana düşünce arka planda doldurulur
+PLAN_POOL_LOW_WATER = float(os.getenv("PLAN_POOL_LOW_WATER", "0.5"))
+
+# Aday planlar gerçek kullanıcı id'leriyle çakışmayan tohumlarla üretiliyor
+CANDIDATE_SEED_OFFSET = 1 << 40
+
+Bucket = Tuple[int, Optional[str], Optional[int]]  # (days, goal, fitness_level)
+
+
+def bucket_profile(goal: Optional[str], fitness_level: Optional[int]) -> UserProfile:
+    # Havuzdaki planlar sadece hedef ve seviyeye göre kişiselleştirilir (geçmiş, yaş/BMI ve ekipman hariç)
+    return UserProfile(fitness_level=fitness_level or 2, goal=goal, age=None, bmi=None, equipment=None, history=())
+
+
+class PlanPool:
+    """
+    Ready-made candidate plans per (days, goal, fitness_level) bucket.
+
+    `take` pops a plan in O(1) and, once a bucket falls below the low-water
+    mark, schedules a refill on a single background worker that builds the
+    missing plans in one vectorized batch. Buckets filled from an older
+    catalog snapshot are discarded. Hit rate and refill latency are exposed
+    through `metrics`.
+    """
+
+    def __init__(self, size: int = PLAN_POOL_SIZE, engine: PlanEngine = plan_engine, low_water: float = PLAN_POOL_LOW_WATER):
+        self.size = size
+        self.engine = engine
+        self.low_water = max(0, min(size - 1, int(size * low_water)))
+        self._lock = threading.Lock()
+        self._pools: Dict[Bucket, Deque[Dict]] = {}
+        self._sources: Dict[Bucket, tuple] = {}
+        self._pending: Dict[Bucket, Future] = {}
+        self._seeds = itertools.count(CANDIDATE_SEED_OFFSET)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plan-pool") if size > 0 else None
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_seconds_total = 0.0
+        self.refill_seconds_max = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def take(self, days: int, goal: Optional[str], fitness_level: Optional[int], catalog: CatalogSnapshot) -> Optional[Dict]:
+        """Returns a pooled plan for the bucket, or None on a miss (the caller generates one)."""
+        if not self.enabled:
+            return None
+        bucket = (days, goal, fitness_level)
+        with self._lock:
+            pool = self._pools.get(bucket)
+            if pool is not None and self._sources.get(bucket) is not catalog.exercises:
+                pool.clear()  # Katalog değişti
+            plan = pool.popleft() if pool else None
+            if plan is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if len(pool or ()) <= self.low_water and bucket not in self._pending:
+                self._pending[bucket] = self._executor.submit(self.refill, bucket, catalog)
+        return plan
+
+    def refill(self, bucket: Bucket, catalog: CatalogSnapshot):
+        """Tops the bucket up to `size` plans; runs on the pool's worker thread."""
+        start = time.perf_counter()
+        try:
+            days, goal, fitness_level = bucket
+            with self._lock:
+                pool = self._pools.setdefault(bucket, deque())
+                if self._sources.get(bucket) is not catalog.exercises:
+                    pool.clear()
+                missing = self.size - len(pool)
+                seeds = [next(self._seeds) for _ in range(missing)]
+            if missing <= 0:
+                return
+            profile = bucket_profile(goal, fitness_level)
+            plans = self.engine.build_personalized(
+                days, catalog, {seed: profile for seed in seeds}, range(1, days + 1)
+            )
+            with self._lock:
+                pool.extend(plans[seed] for seed in seeds)
+                self._sources[bucket] = catalog.exercises
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._pending.pop(bucket, None)
+                self.refills += 1
+                self.refill_seconds_total += elapsed
+                self.refill_seconds_max = max(self.refill_seconds_max, elapsed)
+
+    def wait(self):
+        """Blocks until the scheduled refills are done."""
+        with self._lock:
+            pending: List[Future] = list(self._pending.values())
+        for future in pending:
+            future.result()
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "refills": self.refills,
+                "refill_latency_avg_ms": self.refill_seconds_total / self.refills * 1000 if self.refills else 0.0,
+                "refill_latency_max_ms": self.refill_seconds_max * 1000,
+                "pending_refills": len(self._pending),
+                "pooled_plans": sum(len(pool) for pool in self._pools.values()),
+            }
+
+
+plan_pool = PlanPool()
@@ -0,0 +1,313 @@
+import json
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from catalog import CatalogSnapshot
+from models import Exercise, WorkoutPlan, WorkoutPlanDay, WorkoutPlanExercise, WorkoutPlanHistory
+from student_summary import refresh_plan_summaries
+
+DAY_PREFIX = "Day "
+
+
+def day_key(day_number: int) -> str:
+    return f"{DAY_PREFIX}{day_number}"
+
+
+def day_number(day_key: str) -> int:
+    """Inverse of `day_key`; raises ValueError for keys that are not "Day <n>"."""
+    if not day_key.startswith(DAY_PREFIX):
+        raise ValueError(f"Invalid day key: {day_key}")
+    return int(day_key[len(DAY_PREFIX):])
+
+
+def plan_table_rows(
+    plan_id: int,
+    workout_plan: Dict[str, List[Dict]],
+    resolve: Callable[[str, str], Optional[int]],
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Converts a workout plan dict to WorkoutPlanDays and WorkoutPlanExercises row dicts.
+
+    Args:
+    - plan_id (int): Id of the owning WorkoutPlan row.
+    - workout_plan (dict): The workout plan dictionary, with days as keys and plans as values.
+    - resolve (callable): Maps (bolge, hareket_adi) to an Exercise id, or None if unknown.
+
+    Raises ValueError if a day key or an exercise cannot be mapped.
+    """
+    days, exercises = [], []
+    for key, day_exercises in workout_plan.items():
+        number = day_number(key)
+        message = next((exercise["Message"] for exercise in day_exercises if "Message" in exercise), None)
+        days.append({"plan_id": plan_id, "day_number": number, "message": message})
+        if message is not None:
+            continue
+        for position, exercise in enumerate(day_exercises):
+            exercise_id = resolve(exercise.get("bolge"), exercise.get("hareket_adi"))
+            if exercise_id is None:
+                raise ValueError(f"Unknown exercise: {exercise.get('hareket_adi')}")
+            exercises.append({
+                "plan_id": plan_id,
+                "day_number": number,
+                "position": position,
+                "exercise_id": exercise_id,
+                "sets": exercise.get("set_sayisi"),
+                "reps": exercise.get("tekrar_sayisi"),
+            })
+    return days, exercises
+
+
+def insert_plan_table_rows(db: Session, days: List[Dict], exercises: List[Dict]):
+    if days:
+        db.execute(insert(WorkoutPlanDay.__table__), days)
+    if exercises:
+        db.execute(insert(WorkoutPlanExercise.__table__), exercises)
+
+
+def snapshot_workout_plans(db: Session, plan_ids: Iterable[int]):
+    """Copies the current version of each plan to WorkoutPlanHistory as JSON."""
+    plan_ids = list(plan_ids)
+    if not plan_ids:
+        return
+    plans = load_workout_plans(db, plan_ids)
+    versions = db.execute(select(WorkoutPlan.id, WorkoutPlan.version).where(WorkoutPlan.id.in_(plan_ids)))
+    now = datetime.utcnow()
+    db.execute(insert(WorkoutPlanHistory.__table__), [
+        {"plan_id": plan_id, "version": version, "workout_data": json.dumps(plans[plan_id]), "created_at": now}
+        for plan_id, version in versions
+    ])
+
+
+def _bump_versions(db: Session, plan_ids: Iterable[int]):
+    plan_ids = list(plan_ids)
+    db.execute(update(WorkoutPlan).where(WorkoutPlan.id.in_(plan_ids)).values(version=WorkoutPlan.version + 1))
+    refresh_plan_summaries(db, plan_ids)
+
+
+def _delete_plan_rows(db: Session, plan_ids, day_numbers: Optional[Iterable[int]] = None):
+    exercise_where = [WorkoutPlanExercise.plan_id.in_(plan_ids)]
+    day_where = [WorkoutPlanDay.plan_id.in_(plan_ids)]
+    if day_numbers is not None:
+        exercise_where.append(WorkoutPlanExercise.day_number.in_(list(day_numbers)))
+        day_where.append(WorkoutPlanDay.day_number.in_(list(day_numbers)))
+    db.execute(delete(WorkoutPlanExercise).where(*exercise_where))
+    db.execute(delete(WorkoutPlanDay).where(*day_where))
+
+
+def _catalog_resolver(catalog: CatalogSnapshot):
+    def resolve(body_part, exercise_name):
+        exercise = catalog.find(body_part, exercise_name)
+        return exercise.id if exercise else None
+    return resolve
+
+
+def replace_workout_plans(db: Session, plans: Dict[int, Dict[str, List[Dict]]], catalog: CatalogSnapshot) -> Dict[int, int]:
+    """
+    Stores a new version of each user's plan (user_id -> workout_plan) with a few executemany statements.
+
+    Users that already have a plan keep its id: the current version is copied
+    to the history table, the day rows are replaced and the version is bumped.
+    Other users get a new plan at version 1. The caller commits.
+    Returns user_id -> plan id.
+    """
+    if not plans:
+        return {}
+    plan_ids = {}
+    extra_plan_ids = []
+    for plan_id, user_id in db.execute(
+        select(WorkoutPlan.id, WorkoutPlan.user_id).where(WorkoutPlan.user_id.in_(list(plans))).order_by(WorkoutPlan.id)
+    ):
+        if user_id in plan_ids:
+            extra_plan_ids.append(plan_id)  # Eski kodun bıraktığı fazladan planlar
+        else:
+            plan_ids[user_id] = plan_id
+
+    if extra_plan_ids:
+        db.execute(delete(WorkoutPlanHistory).where(WorkoutPlanHistory.plan_id.in_(extra_plan_ids)))
+        _delete_plan_rows(db, extra_plan_ids)
+        db.execute(delete(WorkoutPlan).where(WorkoutPlan.id.in_(extra_plan_ids)))
+
+    if plan_ids:
+        existing = list(plan_ids.values())
+        snapshot_workout_plans(db, existing)
+        _delete_plan_rows(db, existing)
+        db.execute(update(WorkoutPlan).where(WorkoutPlan.id.in_(existing)).values(
+            version=WorkoutPlan.version + 1, workout_data=None
+        ))
+
+    new_users = [user_id for user_id in plans if user_id not in plan_ids]
+    if new_users:
+        created = db.execute(
+            insert(WorkoutPlan.__table__).returning(WorkoutPlan.__table__.c.user_id, WorkoutPlan.__table__.c.id),
+            [{"user_id": user_id, "workout_data": None, "version": 1} for user_id in new_users]
+        ).all()
+        plan_ids.update({user_id: plan_id for user_id, plan_id in created})
+
+    resolve = _catalog_resolver(catalog)
+    days, exercises = [], []
+    for user_id, workout_plan in plans.items():
+        plan_days, plan_exercises = plan_table_rows(plan_ids[user_id], workout_plan, resolve)
+        days.extend(plan_days)
+        exercises.extend(plan_exercises)
+    insert_plan_table_rows(db, days, exercises)
+    refresh_plan_summaries(db, plan_ids.values())
+    return plan_ids
+
+
+def replace_workout_plan_days(
+    db: Session,
+    plan_id: int,
+    changed_days: Dict[str, List[Dict]],
+    removed_days: Iterable[int],
+    catalog: CatalogSnapshot,
+):
+    """
+    Stores a new version of a plan that only differs in `changed_days` (rebuilt
+    days, by key) and `removed_days` (day numbers to drop).
+
+    The current version is copied to the history table first; rows of the
+    other days are left untouched. The caller commits.
+    """
+    numbers = [day_number(key) for key in changed_days] + list(removed_days)
+    if not numbers:
+        return
+    snapshot_workout_plans(db, [plan_id])
+    _delete_plan_rows(db, [plan_id], numbers)
+    insert_plan_table_rows(db, *plan_table_rows(plan_id, changed_days, _catalog_resolver(catalog)))
+    _bump_versions(db, [plan_id])
+
+
+def load_plan_structure(db: Session, plan_id: int) -> Dict[int, Tuple[bool, List[int]]]:
+    """Returns day_number -> (is rest day, exercise ids) of a plan without joining the catalog."""
+    structure = {
+        number: (message is not None, [])
+        for number, message in db.execute(
+            select(WorkoutPlanDay.day_number, WorkoutPlanDay.message).where(WorkoutPlanDay.plan_id == plan_id)
+        )
+    }
+    for number, exercise_id in db.execute(
+        select(WorkoutPlanExercise.day_number, WorkoutPlanExercise.exercise_id)
+        .where(WorkoutPlanExercise.plan_id == plan_id)
+        .order_by(WorkoutPlanExercise.day_number, WorkoutPlanExercise.position)
+    ):
+        structure[number][1].append(exercise_id)
+    return structure
+
+
+def plan_versions(db: Session, user_id: int) -> List[Tuple[int, int]]:
+    """(plan id, version) pairs of a user's plans, in id order."""
+    return [
+        tuple(row) for row in db.execute(
+            select(WorkoutPlan.id, WorkoutPlan.version).where(WorkoutPlan.user_id == user_id).order_by(WorkoutPlan.id)
+        )
+    ]
+
+
+def load_plan_history(db: Session, plan_id: int) -> List[Dict]:
+    """Previous versions of a plan, newest first."""
+    rows = db.execute(
+        select(WorkoutPlanHistory.version, WorkoutPlanHistory.created_at, WorkoutPlanHistory.workout_data)
+        .where(WorkoutPlanHistory.plan_id == plan_id)
+        .order_by(WorkoutPlanHistory.version.desc())
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+def exercise_dict(row) -> Dict:
+    # Anahtarlar eski JSON planlarıyla aynı sırada
+    return {
+        "bolge": row.body_part,
+        "hareket_adi": row.exercise_name,
+        "set_sayisi": row.sets,
+        "tekrar_sayisi": row.reps,
+        "ekipman": row.equipment or "None",
+    }
+
+
+def _exercise_rows_query(*where):
+    return (
+        select(
+            WorkoutPlanExercise.plan_id,
+            WorkoutPlanExercise.day_number,
+            Exercise.body_part,
+            Exercise.exercise_name,
+            WorkoutPlanExercise.sets,
+            WorkoutPlanExercise.reps,
+            Exercise.equipment,
+        )
+        .join(Exercise, Exercise.id == WorkoutPlanExercise.exercise_id)
+        .where(*where)
+        .order_by(WorkoutPlanExercise.plan_id, WorkoutPlanExercise.day_number, WorkoutPlanExercise.position)
+    )
+
+
+def load_workout_plans(db: Session, plan_ids: Iterable[int]) -> Dict[int, Dict[str, List[Dict]]]:
+    """
+    Rebuilds workout plan dicts (same shape as `generate_workout_plan`) for the given plan ids.
+
+    Uses one query for the days and one for the exercises regardless of the
+    number of plans. Plans not migrated from the old JSON column yet are read
+    from it instead.
+    """
+    plans = {plan_id: {} for plan_id in plan_ids}
+    if not plans:
+        return plans
+
+    days = db.execute(
+        select(WorkoutPlanDay.plan_id, WorkoutPlanDay.day_number, WorkoutPlanDay.message)
+        .where(WorkoutPlanDay.plan_id.in_(plans))
+        .order_by(WorkoutPlanDay.plan_id, WorkoutPlanDay.day_number)
+    ).all()
+    for day in days:
+        plans[day.plan_id][day_key(day.day_number)] = [{"Message": day.message}] if day.message is not None else []
+
+    for row in db.execute(_exercise_rows_query(WorkoutPlanExercise.plan_id.in_(plans))):
+        plans[row.plan_id][day_key(row.day_number)].append(exercise_dict(row))
+
+    legacy = [plan_id for plan_id, plan in plans.items() if not plan]
+    if legacy:
+        blobs = db.execute(select(WorkoutPlan.id, WorkoutPlan.workout_data).where(WorkoutPlan.id.in_(legacy)))
+        for plan_id, workout_data in blobs:
+            if workout_data:
+                plans[plan_id] = json.loads(workout_data)
+    return plans
+
+
+def load_workout_plan_day(db: Session, plan_id: int, number: int) -> Optional[List[Dict]]:
+    """Reads a single day of a plan; returns None if the plan has no such day."""
+    message = db.execute(
+        select(WorkoutPlanDay.message)
+        .where(WorkoutPlanDay.plan_id == plan_id, WorkoutPlanDay.day_number == number)
+    ).first()
+    if message is None:
+        # Taşınmamış eski planlar için tüm plan okunuyor
+        return load_workout_plans(db, [plan_id])[plan_id].get(day_key(number))
+    if message[0] is not None:
+        return [{"Message": message[0]}]
+    rows = db.execute(_exercise_rows_query(
+        WorkoutPlanExercise.plan_id == plan_id,
+        WorkoutPlanExercise.day_number == number
+    ))
+    return [exercise_dict(row) for row in rows]
+
+
+def update_workout_plan_exercise(db: Session, plan_id: int, number: int, position: int, values: Dict) -> bool:
+    """
+    Updates one exercise row of a plan in place (exercise_id, sets and/or reps)
+    and bumps the plan version. Edits are not copied to the history table;
+    only regenerations are.
+
+    Returns False if the plan has no exercise at that position.
+    """
+    where = (
+        WorkoutPlanExercise.plan_id == plan_id,
+        WorkoutPlanExercise.day_number == number,
+        WorkoutPlanExercise.position == position,
+    )
+    if not values:
+        return db.execute(select(WorkoutPlanExercise.position).where(*where)).first() is not None
+    if db.execute(update(WorkoutPlanExercise).where(*where).values(**values)).rowcount == 0:
+        return False
+    _bump_versions(db, [plan_id])
+    return True
@@ -0,0 +1,68 @@
+"""
+One-time process startup work that used to run when main.py was imported:
+creating missing tables, migrations and warming the exercise catalog, then
+starting the in-process job workers so queued jobs and jobs whose lease
+expired before a restart are picked up without waiting for a new submit.
+
+It runs from the FastAPI lifespan under uvicorn. Apps driven without a
+lifespan (TestClient outside a `with` block, httpx.ASGITransport, worker.py)
+run it before their first request through StartupMiddleware instead;
+ensure_started() is idempotent and thread-safe, so both paths are safe.
+"""
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
+from catalog import exercise_catalog
+from database import SessionLocal, engine
+from job_queue import workers
+from migrations import run_migrations
+from models import Base
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_started = False
+
+
+def ensure_started(start_workers: bool = True):
+    """
+    Creates missing tables, runs the migrations, loads the exercise catalog
+    and starts job_queue.workers, once per process. worker.py passes
+    start_workers=False since it runs its own JobWorkers.
+    """
+    global _started
+    if _started:
+        return
+    with _lock:
+        if _started:
+            return
+        start = time.perf_counter()
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        with SessionLocal() as db:
+            exercise_catalog.get(db)
+        if start_workers:
+            workers.start()
+        _started = True
+        logger.info("Startup finished in %.0f ms", (time.perf_counter() - start) * 1000)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(ensure_started)
+    yield
+    await run_in_threadpool(workers.stop)
+
+
+class StartupMiddleware:
+    """Runs ensure_started() before the first request when the lifespan did not run."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not _started and scope["type"] == "http":
+            await run_in_threadpool(ensure_started)
+        await self.app(scope, receive, send)
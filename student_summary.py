@@ -0,0 +1,159 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import Integer, case, cast, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models import StudentSummary, User, UserFitnessData, WorkoutPlan, WorkoutPlanDay
+from fitness_store import logged_workout
+
+summaries = StudentSummary.__table__
+
+# user_id -> (son antrenman, hafta başı, haftalık hacim, haftalık set)
+WorkoutTotals = Dict[int, Tuple[date, date, float, int]]
+
+
+def week_start(day: date) -> date:
+    """Monday of the week containing `day`."""
+    return day - timedelta(days=day.weekday())
+
+
+def _upsert(db: Session):
+    dialect = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    return dialect.insert(summaries)
+
+
+def _add_workout(totals: WorkoutTotals, user_id: int, day: date, volume: float, sets: int):
+    last, current_week, week_volume, week_sets = totals.get(user_id, (day, week_start(day), 0.0, 0))
+    week = week_start(day)
+    if week > current_week:
+        current_week, week_volume, week_sets = week, 0.0, 0
+    if week == current_week:
+        week_volume += volume
+        week_sets += sets
+    totals[user_id] = (max(last, day), current_week, week_volume, week_sets)
+
+
+def workout_totals(rows: Iterable[Dict]) -> WorkoutTotals:
+    """
+    Folds logged sets into per-user totals of their newest week: the last
+    workout date and the volume (weight x sets x reps) and sets of that week.
+    """
+    totals: WorkoutTotals = {}
+    for row in rows:
+        sets = row["sets"] or 0
+        _add_workout(totals, row["user_id"], row["date"], (row["weight"] or 0) * sets * int(row["reps"] or 0), sets)
+    return totals
+
+
+def record_workouts(db: Session, totals: WorkoutTotals):
+    """
+    Merges per-user workout totals into StudentSummaries with one upsert.
+
+    A newer week replaces the stored week, the same week adds to it and an
+    older week only moves the last workout date if needed. The caller commits.
+    """
+    if not totals:
+        return
+    now = datetime.utcnow()
+    stmt = _upsert(db)
+    new, old = stmt.excluded, summaries.c
+    newer_week = (old.week_start.is_(None)) | (new.week_start > old.week_start)
+    same_week = new.week_start == old.week_start
+    greatest = func.max if db.get_bind().dialect.name == "sqlite" else func.greatest
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[old.user_id],
+        set_={
+            "last_workout_date": greatest(func.coalesce(old.last_workout_date, new.last_workout_date), new.last_workout_date),
+            "week_start": case((newer_week, new.week_start), else_=old.week_start),
+            "week_volume": case((newer_week, new.week_volume), (same_week, old.week_volume + new.week_volume), else_=old.week_volume),
+            "week_sets": case((newer_week, new.week_sets), (same_week, old.week_sets + new.week_sets), else_=old.week_sets),
+            "updated_at": new.updated_at,
+        },
+    )
+    db.execute(stmt, [
+        {"user_id": user_id, "last_workout_date": last, "week_start": week, "week_volume": volume,
+         "week_sets": sets, "updated_at": now}
+        for user_id, (last, week, volume, sets) in totals.items()
+    ])
+
+
+def refresh_plan_summaries(db: Session, plan_ids: Optional[Iterable[int]] = None):
+    """
+    Copies id, version and day count of the given plans (all plans if None)
+    into their owners' summaries with one INSERT ... SELECT upsert. The caller commits.
+    """
+    plan_days = select(func.count()).where(WorkoutPlanDay.plan_id == WorkoutPlan.id).scalar_subquery()
+    source = select(
+        WorkoutPlan.user_id, WorkoutPlan.id, WorkoutPlan.version, plan_days, func.current_timestamp()
+    ).where(WorkoutPlan.user_id.is_not(None))
+    if plan_ids is not None:
+        source = source.where(WorkoutPlan.id.in_(list(plan_ids)))
+    source = source.order_by(WorkoutPlan.id.desc())  # Eski kodun bıraktığı fazladan planlarda en eskisi (API'nin okuduğu) kalır
+    stmt = _upsert(db).from_select(["user_id", "plan_id", "plan_version", "plan_days", "updated_at"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[summaries.c.user_id],
+        set_={name: stmt.excluded[name] for name in ("plan_id", "plan_version", "plan_days", "updated_at")},
+    )
+    db.execute(stmt)
+
+
+def rebuild_student_summaries(db: Session, batch_size: int = 10000):
+    """
+    Fills StudentSummaries from scratch: plans first, then logged workouts
+    (fitness_store.logged_workout, the rows the flush path records) streamed
+    as per-(user, day) sums. The caller commits.
+    """
+    reps = cast(UserFitnessData.reps, Integer)  # Eski kayıtlarda reps metin
+    refresh_plan_summaries(db)
+    daily = db.execute(
+        select(
+            UserFitnessData.user_id, UserFitnessData.date,
+            func.sum(UserFitnessData.weight * UserFitnessData.sets * reps), func.sum(UserFitnessData.sets)
+        )
+        .where(logged_workout, UserFitnessData.user_id.is_not(None), UserFitnessData.date.is_not(None))
+        .group_by(UserFitnessData.user_id, UserFitnessData.date)
+        .order_by(UserFitnessData.user_id)
+        .execution_options(yield_per=batch_size)
+    )
+    totals: WorkoutTotals = {}
+    for user_id, day, volume, sets in daily:
+        _add_workout(totals, user_id, day, float(volume or 0), int(sets or 0))
+        if len(totals) >= batch_size:
+            # Sınırda bölünen kullanıcının toplamları upsert ile birleşir
+            record_workouts(db, totals)
+            totals = {}
+    record_workouts(db, totals)
+
+
+def coach_dashboard_query(coach_id: int):
+    """
+    The roster of a coach with each student's summary in one query: the
+    Users rows come from ix_Users_coach_id and the summaries by primary key.
+    """
+    return (
+        select(
+            User.id.label("user_id"), User.name, User.goal, User.fitness_level,
+            summaries.c.plan_id, summaries.c.plan_version, summaries.c.plan_days,
+            summaries.c.last_workout_date, summaries.c.week_start, summaries.c.week_volume, summaries.c.week_sets,
+        )
+        .outerjoin(summaries, summaries.c.user_id == User.id)
+        .where(User.coach_id == coach_id)
+        .order_by(User.id)
+    )
+
+
+def dashboard_entry(row, today: date = None) -> Dict:
+    """Maps a coach_dashboard_query row to the response, zeroing a week that is not the current one."""
+    current = row.week_start is not None and row.week_start == week_start(today or date.today())
+    return {
+        "user_id": row.user_id,
+        "name": row.name,
+        "goal": row.goal,
+        "fitness_level": row.fitness_level,
+        "plan_id": row.plan_id,
+        "plan_version": row.plan_version,
+        "plan_days": row.plan_days,
+        "last_workout_date": row.last_workout_date,
+        "weekly_volume": float(row.week_volume or 0) if current else 0.0,
+        "weekly_sets": int(row.week_sets or 0) if current else 0,
+    }
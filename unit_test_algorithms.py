@@ -1,6 +1,17 @@
 import os
-from algorithms import save_workout_plan_to_excel
+from io import BytesIO
+from openpyxl import load_workbook
+from algorithms import save_roster_workout_plans_to_excel, save_workout_plan_to_excel
 from algorithms import generate_workout_plan
+from catalog import ExerciseCatalog, exercise_catalog
+from database import create_db_engine
+from models import Base, Exercise
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from migrations import create_catalog_version_triggers
+from plan_engine import PlanEngine, parse_templates
+from personalization import UserProfile, catalog_matrix, score_matrix
+from plan_pool import PlanPool
 from unittest.mock import MagicMock
 
 
@@ -34,6 +45,32 @@ def test_save_workout_plan_with_rest_days():
     # Dosyayı temizle
     os.remove(filename)
 
+def test_save_workout_plan_to_buffer():
+    workout_plan = {
+        "Day 1": [
+            {"bolge": "Bacak", "hareket_adi": "Squat", "set_sayisi": 4, "tekrar_sayisi": 12, "ekipman": "Barbell"}
+        ],
+        "Day 2": [{"Message": "Dinlenme Günü"}]
+    }
+    buffer = BytesIO()
+    save_workout_plan_to_excel(workout_plan, buffer)
+
+    # Dosya diske yazılmadan bellekte oluşturulmalı
+    workbook = load_workbook(BytesIO(buffer.getvalue()))
+    assert workbook.sheetnames == ["Day 1", "Day 2"]
+    rows = list(workbook["Day 1"].values)
+    assert rows[0] == ("bolge", "hareket_adi", "set_sayisi", "tekrar_sayisi", "ekipman")
+    assert rows[1] == ("Bacak", "Squat", 4, 12, "Barbell")
+    assert list(workbook["Day 2"].values) == [("Message",), ("Rest Day",)]
+
+def test_save_roster_workout_plans_strips_invalid_sheet_characters():
+    plan = {"Day 1": [{"Message": "Rest Day"}]}
+    buffer = BytesIO()
+    save_roster_workout_plans_to_excel([(1, "Ali/Veli [A]: *?\\", plan), (2, "Ayşe Yılmaz Uzun Bir İsim Soyisim", plan)], buffer)
+
+    workbook = load_workbook(BytesIO(buffer.getvalue()))
+    assert workbook.sheetnames == ["1 AliVeli A ", "2 Ayşe Yılmaz Uzun Bir İsim Soy"]
+
 def test_generate_workout_plan_with_no_user():
     db = MagicMock()
     db.query().filter().first.return_value = None  # Kullanıcı bulunamadı
@@ -69,3 +106,151 @@ def test_generate_workout_plan_with_high_bmi():
     workout_plan = generate_workout_plan(user_id=1, days=5, db=db)
     assert len(workout_plan) == 5  # Planın 5 günlük olduğundan emin ol
     assert all("Gogus" in [e["bolge"] for e in day] for day in workout_plan.values())
+
+def test_exercise_catalog_buckets_and_invalidation():
+    db = MagicMock()
+
+    bench = MagicMock(id=1, exercise_name="Bench Press", body_part="Gogus", sets=3, reps=8, equipment="Barbell")
+    squat = MagicMock(id=2, exercise_name="Squat", body_part="Bacak", sets=4, reps=10, equipment="Barbell")
+    db.query().all.return_value = [bench, squat]
+
+    catalog = ExerciseCatalog()
+    catalog.get(db)
+    assert [e.exercise_name for e in catalog.region("Gogus")] == ["Bench Press"]
+    assert len(catalog.with_equipment("Barbell")) == 2
+    assert catalog.region("Omuz") == ()
+
+    # Sürüm değişmedikçe katalog tekrar yüklenmez
+    db.query().all.return_value = [bench]
+    catalog.get(db)
+    assert len(catalog.exercises) == 2
+
+    # Geçersiz kılındıktan sonra yeniden yüklenir
+    catalog.invalidate()
+    catalog.get(db)
+    assert len(catalog.exercises) == 1
+
+
+def test_exercise_catalog_follows_commits_not_flushes(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/catalog.db")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    with SessionLocal() as reader, SessionLocal() as writer:
+        assert exercise_catalog.get(reader).exercises == ()
+
+        # Flush edilmiş ama commit edilmemiş değişiklik: sadece yazan oturum görür, sürüm değişmez
+        version = exercise_catalog.version
+        writer.add(Exercise(exercise_name="Squat", body_part="Bacak", sets=4, reps=10, equipment="Barbell"))
+        writer.flush()
+        assert len(exercise_catalog.get(writer).exercises) == 1
+        assert exercise_catalog.version == version
+        assert exercise_catalog.get(reader).exercises == ()
+
+        writer.commit()
+        reader.rollback()  # Okuyucunun yeni bir işlemde commit'i görmesi için
+        assert len(exercise_catalog.get(reader).exercises) == 1
+
+        # Geri alınan değişiklik önbelleğe girmez ve sürümü değiştirmez
+        version = exercise_catalog.version
+        writer.add(Exercise(exercise_name="Lunge", body_part="Bacak", sets=3, reps=12, equipment="Dumbbell"))
+        writer.flush()
+        writer.rollback()
+        assert exercise_catalog.version == version
+        assert [e.exercise_name for e in exercise_catalog.get(writer).exercises] == ["Squat"]
+    engine.dispose()
+
+
+def test_exercise_catalog_sees_changes_from_other_processes(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/catalog.db")
+    Base.metadata.create_all(bind=engine)
+    create_catalog_version_triggers(engine)
+    SessionLocal = sessionmaker(bind=engine)
+    catalog = ExerciseCatalog(check_interval=0)
+    with SessionLocal() as db:
+        assert catalog.get(db).exercises == ()
+
+    # ORM olayları olmadan (başka süreç, elle SQL) yapılan değişiklik tetikleyiciyle görünür
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO Exercises (exercise_name, body_part, sets, reps, equipment) VALUES ('Squat', 'Bacak', 4, 10, 'Barbell')"
+        ))
+    with SessionLocal() as db:
+        assert [e.exercise_name for e in catalog.get(db).exercises] == ["Squat"]
+        snapshot = catalog.get(db)
+        assert catalog.get(db) is snapshot  # Sürüm değişmedikçe yeniden yüklenmez
+    engine.dispose()
+
+
+def sample_catalog():
+    db = MagicMock()
+    db.query().all.return_value = [
+        MagicMock(id=i, exercise_name=f"{region} {i}", body_part=region, sets=3, reps=10, equipment="Barbell")
+        for i, region in enumerate(["Gogus", "Bacak"] * 5)
+    ]
+    return ExerciseCatalog().get(db)
+
+def test_plan_engine_follows_rule_table():
+    templates = parse_templates({"days": {"1": [["Gogus", 2]], "2": [["Bacak", 3]]}, "rest_days": {"3": [3]}})
+    plan = PlanEngine(templates).build(3, sample_catalog(), user_id=1)
+    assert [e["bolge"] for e in plan["Day 1"]] == ["Gogus", "Gogus"]
+    assert [e["bolge"] for e in plan["Day 2"]] == ["Bacak"] * 3
+    assert plan["Day 3"] == [{"Message": "Dinlenme Günü"}]
+
+def test_plan_engine_is_deterministic_per_user():
+    catalog = sample_catalog()
+    first = PlanEngine().build(7, catalog, user_id=1)
+    assert PlanEngine().build(7, catalog, user_id=1) == first
+    # Aynı gün, gün sayısından bağımsız olarak aynı tohumu kullanır
+    assert PlanEngine().build(4, catalog, user_id=1)["Day 4"] == first["Day 4"]
+
+def profile(**overrides):
+    values = dict(fitness_level=2, goal="Muscle Gain", age=30, bmi=24.0, equipment=None, history=())
+    values.update(overrides)
+    return UserProfile(**values)
+
+def equipment_catalog():
+    db = MagicMock()
+    db.query().all.return_value = [
+        MagicMock(id=i, exercise_name=f"Gogus {i}", body_part="Gogus", sets=3, reps=10, equipment=equipment)
+        for i, equipment in enumerate(["Barbell", "Bodyweight", "Machine", "Barbell or Dumbbell"])
+    ]
+    return ExerciseCatalog().get(db)
+
+def test_personalized_plan_respects_equipment():
+    templates = parse_templates({"days": {"1": [["Gogus", 3]]}})
+    catalog = equipment_catalog()
+    plans = PlanEngine(templates).build_personalized(1, catalog, {
+        1: profile(equipment=frozenset({"Machine"})),
+        2: profile(equipment=frozenset({"Dumbbell"})),
+    })
+    # Vücut ağırlığı her zaman mevcut; ekipmanı olmayan hareketler hiç seçilmez
+    assert sorted(e["ekipman"] for e in plans[1]["Day 1"]) == ["Bodyweight", "Machine"]
+    assert sorted(e["ekipman"] for e in plans[2]["Day 1"]) == ["Barbell or Dumbbell", "Bodyweight"]
+
+def test_personalized_scores_and_volume():
+    catalog = equipment_catalog()
+    matrix = catalog_matrix(catalog)
+    recent = profile(history=(("Gogus 0", 2),))
+    weights = score_matrix(matrix, [profile(), recent])
+    assert weights[1, matrix.names["Gogus 0"][0]] < weights[0, matrix.names["Gogus 0"][0]]
+
+    templates = parse_templates({"days": {"1": [["Gogus", 4]]}})
+    plans = PlanEngine(templates).build_personalized(1, catalog, {1: profile(goal="Endurance"), 2: profile(goal="Muscle Gain")})
+    assert {e["tekrar_sayisi"] for e in plans[1]["Day 1"]} == {15}
+    assert {e["tekrar_sayisi"] for e in plans[2]["Day 1"]} == {8}
+
+def test_plan_pool_refills_in_background():
+    catalog = sample_catalog()
+    pool = PlanPool(size=4)
+    assert pool.take(3, "Endurance", 1, catalog) is None  # İlk istek boş havuza düşer ve doldurmayı başlatır
+    pool.wait()
+
+    plan = pool.take(3, "Endurance", 1, catalog)
+    assert list(plan) == ["Day 1", "Day 2", "Day 3"]
+    metrics = pool.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["refills"]) == (1, 1, 1)
+    assert metrics["hit_rate"] == 0.5
+    assert metrics["pooled_plans"] == 3
+
+    # Katalog değişince eski adaylar kullanılmaz
+    assert pool.take(3, "Endurance", 1, sample_catalog()) is None
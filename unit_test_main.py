@@ -1,10 +1,63 @@
 from fastapi.testclient import TestClient
+import main
 from main import app
+from database import SessionLocal, create_db_engine
+import job_queue
+import metrics
+from fitness_log import FitnessLogBuffer, fitness_log
+import fitness_archive
+import startup
 import json
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+import pytest
+import migrations
+from auth import hash_password, verify_password
+from models import Base, Coach, Exercise, Job, StudentSummary, UserFitnessData, WorkoutPlan, credentials_view
+from student_summary import rebuild_student_summaries
 
 client = TestClient(app)
 
 
+'''
+STARTUP
+'''
+def test_import_does_not_load_export_stack_or_touch_database():
+    # Açılış işi (tablolar, migration'lar) ve openpyxl ilk kullanıma kadar ertelenir
+    code = "import sys, main, startup; print('openpyxl' in sys.modules, startup._started)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "False"]
+
+def test_first_request_runs_startup_without_lifespan():
+    client.get("/coaches")
+    assert startup._started
+    assert job_queue.workers._threads or job_queue.workers.count <= 0  # Bekleyen işler submit beklemeden alınır
+    startup.ensure_started()  # İkinci çağrı bir şey yapmaz
+
+def test_add_missing_columns_quotes_identifiers():
+    ddl = migrations.add_column_sql(postgresql.dialect(), WorkoutPlan.__table__, WorkoutPlan.__table__.c.version)
+    assert ddl.startswith('ALTER TABLE "WorkoutPlans" ADD COLUMN version INTEGER')
+
+def test_credentials_view_quotes_table_names():
+    # PostgreSQL'de tırnaksız Users/Coaches küçük harfe çevrilir ve bulunamaz
+    ddl = migrations.credentials_view_sql(postgresql.dialect())
+    assert 'VIEW "Credentials"' in ddl and 'FROM "Users"' in ddl and 'FROM "Coaches"' in ddl
+
+    engine = create_db_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    migrations.create_views(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Coach.__table__), {"name": "View Coach", "password": "x"})
+        assert connection.execute(select(credentials_view.c.role)).scalars().all() == ["coach"]
+
+
 '''
 GENERATE WORKOUT
 '''
@@ -20,6 +73,13 @@ def test_generate_workout_plan_for_existing_user():
     assert response.status_code == 200
     assert len(response.json()) == 7  # 7 günlük plan bekleniyor
 
+def test_regenerating_with_the_same_input_gives_the_same_plan():
+    user_data = {"age": 25, "weight": 70, "height": 175, "days": 4}
+    first = client.post("/generate_workout_plan/4", json=user_data)
+    second = client.post("/generate_workout_plan/4", json=user_data)
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+
 def test_generate_workout_plan_for_nonexistent_user():
     user_data = {
         "age": 30,
@@ -31,6 +91,23 @@ def test_generate_workout_plan_for_nonexistent_user():
     assert response.status_code == 404
     assert response.json() == {"detail": "User not found"}
 
+def test_generate_workout_plans_for_coach():
+    response = client.post("/coach/1/generate_workout_plans", json={"days": 3, "user_ids": [2, 3]})
+    assert response.status_code == 200
+    plans = response.json()
+    assert [plan["user_id"] for plan in plans] == [2, 3]
+    assert all(len(plan["workout_plan"]) == 3 for plan in plans)
+
+def test_generate_workout_plans_for_coach_invalid_days():
+    for days in (0, -1, 8):
+        response = client.post("/coach/1/generate_workout_plans", json={"days": days, "user_ids": [2]})
+        assert response.status_code == 422
+
+def test_generate_workout_plans_for_nonexistent_coach():
+    response = client.post("/coach/999/generate_workout_plans", json={"days": 3})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Coach not found"}
+
 
 '''
 EXPORT WORKOUT PLAN
@@ -40,6 +117,30 @@ def test_export_workout_plan_success():
     assert response.status_code == 200
     assert response.headers["content-type"] == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
+def test_export_workout_plan_repeat_download_is_cached():
+    first = client.get("/export_workout_plan/1")
+    second = client.get("/export_workout_plan/1")
+    assert second.status_code == 200
+    assert second.content == first.content
+
+def test_export_roster_workout_plans_csv():
+    client.post("/coach/1/generate_workout_plans", json={"days": 2, "user_ids": [2]})
+    response = client.get("/coach/1/export_workout_plans", params={"format": "csv"})
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "user_id,name,day,bolge,hareket_adi,set_sayisi,tekrar_sayisi,ekipman"
+    assert any(line.startswith("2,") for line in lines[1:])
+
+def test_export_roster_workout_plans_xlsx():
+    response = client.get("/coach/1/export_workout_plans")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def test_export_roster_workout_plans_with_invalid_coach():
+    response = client.get("/coach/999/export_workout_plans")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Coach not found"}
+
 def test_export_workout_plan_with_invalid_user():
     response = client.get("/export_workout_plan/999")
     assert response.status_code == 404
@@ -47,6 +148,191 @@ def test_export_workout_plan_with_invalid_user():
 
 
 
+'''
+WORKOUT PLAN DAYS
+'''
+def test_get_workout_plan_day():
+    client.post("/coach/1/generate_workout_plans", json={"days": 7, "user_ids": [2]})
+    response = client.get("/workout_plans/2/days/5")
+    assert response.status_code == 200
+    assert response.json()["day"] == "Day 5"
+
+    plan = json.loads(client.get("/workout_plans/2").json()[0]["workout_data"])
+    day = client.get("/workout_plans/2/days/1").json()
+    assert day["exercises"] == plan["Day 1"]
+
+def test_update_workout_plan_exercise():
+    client.post("/coach/1/generate_workout_plans", json={"days": 2, "user_ids": [2]})
+    response = client.patch("/workout_plans/2/days/2/exercises/0", json={"set_sayisi": 6, "tekrar_sayisi": 15})
+    assert response.status_code == 200
+    exercise = response.json()["exercises"][0]
+    assert (exercise["set_sayisi"], exercise["tekrar_sayisi"]) == (6, 15)
+
+    plan = json.loads(client.get("/workout_plans/2").json()[0]["workout_data"])
+    assert plan["Day 2"][0] == exercise
+
+def test_update_workout_plan_exercise_invalid_values():
+    for changes in ({"set_sayisi": -5}, {"set_sayisi": 0}, {"tekrar_sayisi": 1001}, {"exercise_id": 0}):
+        response = client.patch("/workout_plans/2/days/1/exercises/0", json=changes)
+        assert response.status_code == 422
+
+def test_update_workout_plan_exercise_not_in_plan():
+    response = client.patch("/workout_plans/2/days/1/exercises/99", json={"set_sayisi": 6})
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Exercise not found in workout plan"}
+
+
+def test_workout_plans_etag_not_modified():
+    response = client.get("/workout_plans/1")
+    etag = response.headers["ETag"]
+    not_modified = client.get("/workout_plans/1", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+def test_workout_plans_etag_follows_exercise_catalog():
+    before = client.get("/workout_plans/1")
+    export_before = client.get("/export_workout_plan/1").content
+    planned = next(
+        exercise for day in json.loads(before.json()[0]["workout_data"]).values() for exercise in day if "bolge" in exercise
+    )
+    with SessionLocal() as db:
+        exercise = db.query(Exercise).filter(
+            Exercise.body_part == planned["bolge"], Exercise.exercise_name == planned["hareket_adi"]
+        ).order_by(Exercise.id).first()
+        name = exercise.exercise_name
+        exercise.exercise_name = name + " (renamed)"
+        db.commit()
+        try:
+            # Plan değişmedi ama yanıttaki egzersiz adı değişti: eski ETag 304 almamalı
+            after = client.get("/workout_plans/1", headers={"If-None-Match": before.headers["ETag"]})
+            assert after.status_code == 200
+            assert name + " (renamed)" in after.json()[0]["workout_data"]
+            assert client.get("/export_workout_plan/1").content != export_before
+        finally:
+            exercise.exercise_name = name
+            db.commit()
+    assert client.get("/workout_plans/1").headers["ETag"] == before.headers["ETag"]
+
+def test_incremental_regeneration_only_rebuilds_affected_days():
+    user_data = {"age": 25, "weight": 70, "height": 175, "days": 7}
+    client.post("/generate_workout_plan/3", json=user_data)
+    before = client.get("/workout_plans/3")
+    plan = json.loads(before.json()[0]["workout_data"])
+
+    # 7 günden 6 güne inince sadece 5. gün (dinlenme günü) değişiyor, 7. gün siliniyor
+    response = client.post("/generate_workout_plan/3?incremental=true", json={**user_data, "days": 6})
+    assert response.status_code == 200
+    after = client.get("/workout_plans/3")
+    new_plan = json.loads(after.json()[0]["workout_data"])
+    assert list(new_plan) == [f"Day {day}" for day in range(1, 7)]
+    assert all(new_plan[f"Day {day}"] == plan[f"Day {day}"] for day in (1, 2, 3, 4, 6))
+    assert after.headers["ETag"] != before.headers["ETag"]
+
+    history = client.get("/workout_plans/3/history").json()
+    assert json.loads(history[0]["workout_data"]) == plan
+
+def test_incremental_regeneration_rebuilds_days_with_unavailable_equipment():
+    user_data = {"age": 25, "weight": 70, "height": 175, "days": 5}
+    client.post("/generate_workout_plan/3", json=user_data)
+    response = client.post("/generate_workout_plan/3?incremental=true", json={**user_data, "equipment": ["Machine"]})
+    assert response.status_code == 200
+    plan = json.loads(client.get("/workout_plans/3").json()[0]["workout_data"])
+    equipment = {exercise["ekipman"] for exercises in plan.values() for exercise in exercises if "ekipman" in exercise}
+    assert equipment <= {"Machine", "Machine or Dumbbell", "Bodyweight", "Bodyweight or Dumbbell", "None"}
+
+
+'''
+JOBS
+'''
+def wait_for_job(job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_generate_workout_plan_job():
+    response = client.post("/jobs/generate_workout_plan/1", json={"age": 25, "weight": 70, "height": 175, "days": 3})
+    assert response.status_code == 202
+    job = wait_for_job(response.json()["job_id"])
+    assert job["status"] == "done"
+    result = client.get(f"/jobs/{job['id']}/result")
+    assert result.status_code == 200
+    assert len(result.json()) == 3
+
+def test_export_workout_plan_job():
+    job = wait_for_job(client.post("/jobs/export_workout_plan/1").json()["job_id"])
+    assert job["status"] == "done"
+    result = client.get(f"/jobs/{job['id']}/result")
+    assert result.headers["content-type"] == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    assert result.content == client.get("/export_workout_plan/1").content
+
+def test_job_for_invalid_user_fails_without_retry():
+    job = wait_for_job(client.post("/jobs/export_workout_plan/999").json()["job_id"])
+    assert (job["status"], job["attempts"]) == ("failed", 1)
+    result = client.get(f"/jobs/{job['id']}/result")
+    assert result.status_code == 409
+    assert result.json() == {"detail": "User not found"}
+
+def test_job_is_retried_after_transient_error(monkeypatch):
+    calls = []
+
+    @job_queue.job_handler("flaky")
+    def flaky(db, payload):
+        calls.append(payload)
+        if len(calls) < 2:
+            raise RuntimeError("transient")
+        return b"ok", "text/plain"
+
+    monkeypatch.setattr(job_queue, "JOB_RETRY_DELAY", 0)
+    with SessionLocal() as db:
+        job_id = job_queue.submit(db, "flaky", {})
+    job = wait_for_job(job_id)
+    assert (job["status"], job["attempts"]) == ("done", 2)
+    assert client.get(f"/jobs/{job_id}/result").content == b"ok"
+
+def test_get_unknown_job():
+    assert client.get("/jobs/999999").status_code == 404
+
+def test_finished_jobs_are_purged_after_ttl():
+    now = datetime.utcnow()
+    old = now - timedelta(days=2)
+    with SessionLocal() as db:
+        # Bitmiş işler doğrudan yazılıyor; submit çalışan worker'ları uyandırırdı
+        jobs = [Job(kind="purge_test", status="done", attempts=1, max_attempts=1, result=b"x" * 1024, updated_at=old),
+                Job(kind="purge_test", status="failed", attempts=1, max_attempts=1, updated_at=old),
+                Job(kind="purge_test", status="done", attempts=1, max_attempts=1, updated_at=now)]
+        db.add_all(jobs)
+        db.commit()
+        ids = [job.id for job in jobs]
+        assert job_queue.purge_finished_jobs(db, ttl=86400) >= 2
+        assert [job_id for job_id in ids if job_queue.get_job(db, job_id)] == [ids[2]]
+
+
+'''
+METRICS
+'''
+def test_metrics_records_route_latency_and_sql_statements():
+    client.get("/workout_plans/1")
+    client.post("/generate_workout_plan/1", json={"age": 25, "weight": 70, "height": 175, "days": 2})
+    assert metrics.request_latency.count("GET", "/workout_plans/{user_id}", "200") > 0
+    assert metrics.request_db_statements.count("GET", "/workout_plans/{user_id}") > 0
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/workout_plans/{user_id}",status="200"}' in response.text
+    assert 'function_duration_seconds_count{function="generate_workout_plan"}' in response.text
+
+def test_slow_query_log(monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 0)
+    with caplog.at_level("WARNING", logger="metrics.slow_query"):
+        client.get("/workout_plans/1")
+    assert any("slow query" in record.getMessage() for record in caplog.records)
+
+
 '''
 UPDATE USER DATA
 '''
@@ -61,6 +347,14 @@ def test_update_user_data_success():
     assert response.status_code == 200
     assert response.json() == {"message": "User data updated successfully"}
 
+def test_update_user_data_invalidates_cached_user_info():
+    client.get("/user_info/1")  # Önbelleği doldur
+    response = client.put("/update_user_data/1", json={"age": 31, "weight": 86, "height": 176})
+    assert response.status_code == 200
+
+    user = client.get("/user_info/1").json()
+    assert (user["age"], user["weight"], user["height"]) == (31, 86, 176)
+
 def test_update_user_data_invalid_user():
     user_data = {
         "age": 40,
@@ -81,12 +375,250 @@ def test_get_user_exercise_data_with_existing_data():
     assert response.status_code == 200
     assert len(response.json()) > 0  # Veri içermelidir
 
+def test_get_user_exercise_data_pagination():
+    full = client.get("/user_fitness_data/1/exercise/Push-Up").json()
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/user_fitness_data/1/exercise/Push-Up", params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        pages += response.json()
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert pages == full
+
+def test_get_user_exercise_data_ndjson():
+    response = client.get("/user_fitness_data/1/exercise/Push-Up", params={"format": "ndjson", "limit": 2})
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == client.get("/user_fitness_data/1/exercise/Push-Up", params={"limit": 2}).json()
+
+def test_get_user_exercise_data_invalid_cursor():
+    response = client.get("/user_fitness_data/1/exercise/Push-Up", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+def test_get_user_exercise_analytics():
+    entries = [
+        {"user_id": 1, "date": day, "exercise_name": "Push-Up", "weight": 0, "sets": 3, "reps": 15,
+         "idempotency_key": uuid.uuid4().hex}
+        for day in ["2024-03-04", "2024-03-04", "2024-03-06"]
+    ]
+    client.post("/user_fitness_data/log?wait=true", json=entries)
+    response = client.get("/user_fitness_data/1/exercise/Push-Up/analytics")
+    assert response.status_code == 200
+    analytics = response.json()
+    assert analytics["exercise_name"] == "Push-Up"
+    assert analytics["sessions"] > 0
+    assert 0 < len(analytics["weekly"]) <= 12
+    assert 0 < len(analytics["monthly"]) <= 12
+
+def test_get_user_exercise_analytics_counts_logged_workout_days():
+    name = f"Analytics Test {uuid.uuid4().hex[:8]}"
+    url = f"/user_fitness_data/1/exercise/{name}/analytics"
+    # Plan yer tutucu satırı (anahtarsız) antrenman sayılmaz
+    with SessionLocal() as db:
+        db.add(UserFitnessData(user_id=1, date=date(2024, 3, 1), exercise_name=name, weight=0, sets=3, reps=10))
+        db.commit()
+    assert client.get(url).status_code == 404
+
+    entries = [
+        {"user_id": 1, "date": day, "exercise_name": name, "weight": 50, "sets": 3, "reps": 10,
+         "idempotency_key": uuid.uuid4().hex}
+        for day in ["2024-03-04", "2024-03-04", "2024-03-06"]
+    ]
+    client.post("/user_fitness_data/log?wait=true", json=entries)
+    analytics = client.get(url).json()
+    assert analytics["sessions"] == 2
+    assert analytics["first_date"] == "2024-03-04"
+
+def test_get_user_exercise_analytics_no_data():
+    response = client.get("/user_fitness_data/1/exercise/NonexistentExercise/analytics")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No data found for the given user and exercise"}
+
 def test_get_user_exercise_data_no_data():
     response = client.get("/user_fitness_data/1/exercise/NonexistentExercise")
     assert response.status_code == 404
     assert response.json() == {"detail": "No data found for the given user and exercise"}
 
 
+'''
+LOG FITNESS DATA
+'''
+def fitness_log_entry(key, reps=8):
+    return {"user_id": 1, "date": "2024-03-01", "exercise_name": "Log Test Press", "weight": 60, "sets": 3,
+            "reps": reps, "idempotency_key": key}
+
+def test_log_fitness_data_is_idempotent():
+    key = uuid.uuid4().hex
+    response = client.post("/user_fitness_data/log?wait=true", json=[fitness_log_entry(key), fitness_log_entry(key + "-2")])
+    assert response.status_code == 200
+    assert response.json() == {"accepted": 2, "duplicates": 0}
+
+    # İstemci aynı kayıtları tekrar gönderiyor
+    client.post("/user_fitness_data/log?wait=true", json=[fitness_log_entry(key)])
+    rows = client.get("/user_fitness_data/1/exercise/Log Test Press").json()
+    assert len(rows) == 2
+    assert rows[0]["reps"] == "8"
+
+def test_log_fitness_data_ndjson():
+    key = uuid.uuid4().hex
+    body = "\n".join(json.dumps(fitness_log_entry(f"{key}-{i}", reps=10)) for i in range(3)) + "\n"
+    response = client.post("/user_fitness_data/log", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 3, "duplicates": 0}
+    fitness_log.flush()
+    rows = client.get("/user_fitness_data/1/exercise/Log Test Press").json()
+    assert sum(row["reps"] == "10" for row in rows) >= 3
+
+def test_log_fitness_data_invalid_entry():
+    body = json.dumps(fitness_log_entry("a")) + "\n" + json.dumps({**fitness_log_entry("b"), "sets": 0})
+    response = client.post("/user_fitness_data/log", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 1, "sets"]
+
+def test_fitness_log_drops_bad_rows_and_retries_transient_errors(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/log.db")
+    buffer = FitnessLogBuffer(session_factory=sessionmaker(bind=engine), size=1000, interval=60)
+    rows = [{**fitness_log_entry(f"k{i}"), "date": date(2024, 3, 1)} for i in range(5)]
+    rows[2]["weight"] = object()  # Sürücünün yazamadığı değer: kalıcı hata
+    buffer.add(rows)
+
+    # Tablo yok (OperationalError): geçici hata, satırlar beklemede kalır
+    with pytest.raises(OperationalError):
+        buffer.flush()
+    assert buffer.pending() == 5
+
+    Base.metadata.create_all(bind=engine)
+    assert buffer.flush() == 4
+    assert buffer.pending() == 0
+    assert [row["idempotency_key"] for row, _ in buffer.dead_letters] == ["k2"]
+    assert buffer.metrics()["rows_rejected"] == 1
+    buffer.close()
+    engine.dispose()
+
+def test_log_fitness_data_unknown_user():
+    response = client.post("/user_fitness_data/log", json=[{**fitness_log_entry(None), "user_id": 999}])
+    assert response.status_code == 404
+
+
+'''
+FITNESS DATA ARCHIVE
+'''
+def test_archived_fitness_data_is_read_transparently(monkeypatch, tmp_path):
+    monkeypatch.setattr(fitness_archive, "ARCHIVE_DIR", str(tmp_path))
+    entries = [
+        {"user_id": 1, "date": day, "exercise_name": "Archive Test Press", "weight": 40 + i, "sets": 3, "reps": 8,
+         "idempotency_key": uuid.uuid4().hex}
+        for i, day in enumerate(["2019-05-06", "2019-05-06", "2019-06-10", "2020-11-30", "2024-02-05"])
+    ]
+    client.post("/user_fitness_data/log?wait=true", json=entries)
+    url = "/user_fitness_data/1/exercise/Archive Test Press"
+    analytics = client.get(url + "/analytics").json()
+    with SessionLocal() as db:
+        # Plan yer tutucu satırı arşive de gider ama analizde sayılmaz
+        db.add(UserFitnessData(user_id=1, date=date(2019, 5, 7), exercise_name="Archive Test Press", weight=500, sets=3, reps=8))
+        db.commit()
+    history = client.get(url).json()
+
+    with SessionLocal() as db:
+        assert fitness_archive.archive_fitness_data(db, date(2021, 1, 1), user_ids=[1]) == 5
+    assert (tmp_path / "001" / "user_1.arrow").exists()
+
+    assert client.get(url).json() == history
+    assert client.get(url + "/analytics").json() == analytics
+
+    # Yarıda kalan arşivleme: satır hem dosyada hem veritabanında, bir kez sayılır
+    archived = fitness_archive.archived_exercise_rows(1, "Archive Test Press")[-1]
+    with SessionLocal() as db:
+        db.add(UserFitnessData(user_id=1, **{**archived._asdict(), "reps": int(archived.reps)}))
+        db.commit()
+    assert client.get(url + "/analytics").json() == analytics
+    with SessionLocal() as db:
+        db.execute(delete(UserFitnessData).where(UserFitnessData.id == archived.id))
+        db.commit()
+    assert [row["date"] for row in client.get(url, params={"from": "2019-06-01", "to": "2021-01-01"}).json()] == ["2019-06-10", "2020-11-30"]
+
+    # Sayfalama arşiv ve veritabanı sınırını geçiyor
+    first = client.get(url, params={"limit": 3})
+    rest = client.get(url, params={"cursor": first.headers["X-Next-Cursor"]}).json()
+    assert first.json() + rest == history
+    lines = client.get(url, params={"format": "ndjson"}).text.splitlines()
+    assert [json.loads(line) for line in lines] == history
+
+
+'''
+COACH DASHBOARD
+'''
+def dashboard_student(coach_id, user_id):
+    response = client.get(f"/coach/{coach_id}/dashboard")
+    assert response.status_code == 200
+    return next(student for student in response.json() if student["user_id"] == user_id)
+
+def test_coach_dashboard_follows_logged_workouts():
+    before = dashboard_student(1, 2)
+    today = date.today().isoformat()
+    entry = {"user_id": 2, "date": today, "exercise_name": "Dashboard Press", "weight": 50, "sets": 3, "reps": 10,
+             "idempotency_key": uuid.uuid4().hex}
+    assert client.post("/user_fitness_data/log?wait=true", json=[entry]).status_code == 200
+
+    after = dashboard_student(1, 2)
+    assert after["last_workout_date"] == today
+    assert after["weekly_volume"] == before["weekly_volume"] + 1500
+    assert after["weekly_sets"] == before["weekly_sets"] + 3
+
+def test_coach_dashboard_rebuild_matches_incremental_updates():
+    # Ağırlıksız (vücut ağırlığı) setler de antrenman sayılır; yeniden kurulum aynı sonucu vermeli
+    entry = {"user_id": 3, "date": date.today().isoformat(), "exercise_name": "Dashboard Push-Up", "weight": 0,
+             "sets": 2, "reps": 15}
+    client.post("/user_fitness_data/log?wait=true", json=[entry])
+    incremental = client.get("/coach/1/dashboard").json()
+    assert dashboard_student(1, 3)["weekly_sets"] >= 2
+
+    with SessionLocal() as db:
+        db.execute(delete(StudentSummary))
+        rebuild_student_summaries(db)
+        db.commit()
+    assert client.get("/coach/1/dashboard").json() == incremental
+
+def test_coach_dashboard_follows_plan_changes():
+    client.post("/generate_workout_plan/2", json={"age": 25, "weight": 70, "height": 175, "days": 3})
+    before = dashboard_student(1, 2)
+    assert before["plan_days"] == 3
+    client.patch("/workout_plans/2/days/1/exercises/0", json={"tekrar_sayisi": 12})
+    assert dashboard_student(1, 2)["plan_version"] == before["plan_version"] + 1
+
+def test_coach_dashboard_unknown_coach():
+    response = client.get("/coach/999/dashboard")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Coach not found"}
+
+
+'''
+FAST JSON LISTS
+'''
+def test_fast_json_lists_keep_the_wire_format(monkeypatch):
+    urls = ["/coaches", "/coach/1/students", "/user_fitness_data/1/exercise/Dips?limit=3"]
+
+    def responses():
+        main.response_cache.clear()
+        return [client.get(url) for url in urls]
+
+    slow = responses()
+    monkeypatch.setattr(main, "FAST_JSON_LISTS", True)
+    fast = responses()
+    main.response_cache.clear()
+    for slow_response, fast_response in zip(slow, fast):
+        assert fast_response.status_code == slow_response.status_code == 200
+        assert fast_response.content == slow_response.content
+    assert fast[2].headers["X-Next-Cursor"] == slow[2].headers["X-Next-Cursor"]
+
+
 '''
 GET ALL COACHES
 '''
@@ -103,4 +635,39 @@ def test_get_all_coaches():
         assert "weight" in coach
         assert "height" in coach
         assert "experience_level" in coach
-    
\ No newline at end of file
+
+
+'''
+LOGIN
+'''
+def test_login_issues_session_token():
+    response = client.post("/login", json={"name": "Ayse Guler", "password": "1234"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["id"] == 1
+    assert body["role"] == "user"
+
+    headers = {"Authorization": f"Bearer {body['token']}"}
+    assert client.get("/session", headers=headers).json() == {"id": 1, "role": "user"}
+    assert client.post("/logout", headers=headers).status_code == 200
+    assert client.get("/session", headers=headers).status_code == 401
+
+def test_plaintext_passwords_are_hashed_by_migration(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/accounts.db")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Coach.__table__), [{"name": "Plain Coach", "password": "secret"},
+                                                     {"name": "Hashed Coach", "password": hash_password("other")}])
+    assert not verify_password("secret", "secret")  # Düz metin artık kabul edilmiyor
+
+    assert migrations.hash_plaintext_passwords(engine) == 1
+    assert migrations.hash_plaintext_passwords(engine) == 0
+    with engine.connect() as connection:
+        stored = dict(connection.execute(select(Coach.name, Coach.password)).all())
+    assert verify_password("secret", stored["Plain Coach"]) and verify_password("other", stored["Hashed Coach"])
+    engine.dispose()
+
+def test_login_invalid_credentials():
+    response = client.post("/login", json={"name": "Ayse Guler", "password": "wrong"})
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid username or password"}
@@ -0,0 +1,105 @@
+"""
+Checks that the SQL run by each endpoint in ENDPOINT_CALLS uses an index
+(EXPLAIN QUERY PLAN has no plain SCAN of a table).
+
+Exclusions: statements without a WHERE clause (listing all coaches, catalog
+warmup) read the whole table by design and are not checked, nor are scans
+of subquery results (the analytics window over per-period totals); executemany
+statements are checked with their first parameter set. Background work the
+calls trigger (job workers, the fitness log flush) is captured as well.
+"""
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from main import app, response_cache
+from database import engine, async_engine
+from models import Base
+from startup import ensure_started
+import re
+import time
+import pytest
+
+client = TestClient(app)
+ensure_started()  # Açılıştaki migration sorguları ölçülen isteklere karışmasın
+
+
+def capture_statements(calls):
+    # Endpoint çağrıları sırasında çalışan tüm SQL ifadelerini topluyoruz
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # executemany: tüm parametre kümeleri aynı plana sahip, ilki yeterli
+        statements.append((statement, parameters[0] if executemany else parameters))
+
+    engines = [engine, async_engine.sync_engine]
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        for call in calls:
+            # Önbellekten dönen cevaplar sorgu çalıştırmaz
+            response_cache.clear()
+            call()
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def full_scans(statement, parameters):
+    # WHERE içermeyen sorgular (ör. tüm koçları listelemek) tasarım gereği tüm tabloyu okur
+    if not re.search(r"\bWHERE\b", statement, re.IGNORECASE):
+        return []
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    details = [row[-1] for row in plan]
+    # Alt sorgu sonuçlarının (ör. "SCAN anon_1", "SCAN (subquery-3)") taranması sorun değil; sadece tablolar
+    return [
+        detail for detail in details
+        if detail.startswith("SCAN ") and detail.split()[1] in Base.metadata.tables
+        and "USING INDEX" not in detail and "USING COVERING INDEX" not in detail
+    ]
+
+
+ENDPOINT_CALLS = {
+    "generate_workout_plan": lambda: client.post("/generate_workout_plan/1", json={"age": 30, "weight": 85, "height": 175, "days": 3}),
+    "generate_workout_plans": lambda: client.post("/coach/1/generate_workout_plans", json={"days": 3, "user_ids": [2]}),
+    "export_workout_plan": lambda: client.get("/export_workout_plan/1"),
+    "export_workout_plans": lambda: client.get("/coach/1/export_workout_plans", params={"format": "csv"}),
+    "user_fitness_data": lambda: client.get("/user_fitness_data/1/exercise/Push-Up"),
+    "exercise_analytics": lambda: client.get("/user_fitness_data/1/exercise/Push-Up/analytics"),
+    "update_user_data": lambda: client.put("/update_user_data/1", json={"age": 30, "weight": 85, "height": 175}),
+    "workout_plans": lambda: client.get("/workout_plans/1"),
+    "login": lambda: client.post("/login", json={"name": "Nobody", "password": "wrong"}),
+    "students": lambda: client.get("/coach/1/students"),
+    "user_info": lambda: client.get("/user_info/1"),
+    "coaches": lambda: client.get("/coaches"),
+    "select_coach": lambda: client.post("/select_coach", json={"user_id": 1, "coach_id": 5}),
+    "coach_dashboard": lambda: client.get("/coach/1/dashboard"),
+    "workout_plan_day": lambda: client.get("/workout_plans/1/days/1"),
+    "workout_plan_history": lambda: client.get("/workout_plans/1/history"),
+    "update_workout_plan_exercise": lambda: client.patch("/workout_plans/1/days/1/exercises/0", json={"set_sayisi": 4}),
+    "log_fitness_data": lambda: client.post("/user_fitness_data/log?wait=true", json=[
+        {"user_id": 1, "date": "2024-03-01", "exercise_name": "Push-Up", "weight": 0, "sets": 3, "reps": 12}
+    ]),
+    "generate_workout_plan_job": lambda: wait_for_job(
+        client.post("/jobs/generate_workout_plan/1", json={"age": 30, "weight": 85, "height": 175, "days": 3})
+    ),
+    "export_workout_plan_job": lambda: wait_for_job(client.post("/jobs/export_workout_plan/1")),
+}
+
+
+def wait_for_job(response, timeout=10):
+    # İş durumu ve sonucu, iş bitene kadar sorgulanıyor
+    location = response.headers["Location"]
+    deadline = time.monotonic() + timeout
+    while client.get(location).json()["status"] not in ("done", "failed") and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return client.get(location + "/result")
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINT_CALLS)
+def test_endpoint_queries_do_not_scan_tables(endpoint):
+    statements = capture_statements([ENDPOINT_CALLS[endpoint]])
+    assert statements
+
+    scans = {statement: full_scans(statement, parameters) for statement, parameters in statements}
+    assert {statement: details for statement, details in scans.items() if details} == {}
@@ -0,0 +1,52 @@
+"""
+Runs background jobs (plan generation, Excel exports) outside the web process.
+
+    python worker.py [--processes 2] [--threads 1]
+
+Every process claims jobs from the Jobs table, so workers can be started on
+any machine that reaches the database. Set JOB_WORKERS=0 on the web process
+to leave all jobs to these workers.
+"""
+import argparse
+import logging
+import multiprocessing
+import signal
+
+
+def run(threads: int):
+    import main  # noqa: F401 - iş handler'larını kaydeder
+    from job_queue import JobWorkers
+    from startup import ensure_started
+
+    ensure_started(start_workers=False)
+
+    workers = JobWorkers(count=threads)
+    workers.start()
+    signal.signal(signal.SIGTERM, lambda *_: workers.stop())
+    try:
+        signal.pause()
+    except KeyboardInterrupt:
+        pass
+    workers.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=1, help="worker threads per process")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    processes = [multiprocessing.Process(target=run, args=(args.threads,)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()